@@ -1,19 +1,20 @@
-import random
-
 import numpy as np
 
-from marl_language_games.environment.lexicon import Lexicon
-from marl_language_games.utils.invention import make_id
+from marl_language_games.environment.lexicon import select_lexicon
+from marl_language_games.utils.invention import SymbolTable
+from marl_language_games.utils.seeding import rand_index
 
 SPEAKER = "SPEAKER"
 HEARER = "HEARER"
 
 
 class Agent:
-    def __init__(self, cfg):
+    def __init__(self, cfg, symbols=None, rng=None):
         self.cfg = cfg
-        self.id = make_id("AGENT")
-        self.lexicon = Lexicon(self.cfg)
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.id = self.symbols.make_id("AGENT")
+        self.lexicon = select_lexicon(self.cfg, self.symbols, self.rng)
 
     def reset(self, context):
         self.communicative_success = True
@@ -32,11 +33,11 @@ class Agent:
         Returns:
             sa_pair: a state/action pair from the given list of actions
         """
-        p = np.random.random()
+        p = self.rng.random()
         if p < (1 - eps):
             return max(actions, key=lambda sa_pair: sa_pair.q_value)
         else:
-            return random.sample(actions, k=1)[0]
+            return actions[rand_index(self.rng, len(actions))]
 
     def find_in_context(self, actions):
         """Returns a subset (action masking) of the given actions that is consistent with the current context."""
@@ -183,7 +184,7 @@ class Agent:
         elif new_q <= 0:
             new_q = 0
 
-        sa_pair.q_value = new_q
+        self.lexicon.set_q_value(sa_pair, new_q)
         if sa_pair.q_value <= 0:
             self.remove_sa_pair(sa_pair)
 
@@ -191,7 +192,7 @@ class Agent:
         """Updates the q-value of the given state/action pair using the interpolated update rule."""
         old_q = sa_pair.q_value
         new_q = old_q + self.cfg.LEARNING_RATE * (reward - old_q)
-        sa_pair.q_value = new_q
+        self.lexicon.set_q_value(sa_pair, new_q)
         if sa_pair.q_value < self.cfg.REWARD_FAILURE + self.cfg.EPSILON_FAILURE:
             self.remove_sa_pair(sa_pair)
 
@@ -213,4 +214,4 @@ class Agent:
                 self.update(self.applied_sa_pair, self.cfg.REWARD_FAILURE)
 
     def __str__(self):
-        return f"Agent id: {self.id}"
+        return f"Agent id: {self.symbols.name('AGENT', self.id)}"
@@ -0,0 +1,390 @@
+import numpy as np
+
+from marl_language_games.environment.lexicon import keep_value, population_coherence
+from marl_language_games.environment.schedule import BatchedScheduler
+from marl_language_games.environment.sketch import SIGNATURE_SIZE, estimate_similarity, signatures
+from marl_language_games.environment.tensor_environment import update_values
+from marl_language_games.utils.invention import SymbolTable, word_from_draws
+from marl_language_games.utils.seeding import spawn_env_rngs
+
+SYLLABLES = 3  # syllables of an invented word, see invent
+MONITORS = [
+    "communicative-success",
+    "lexicon-size",
+    "lexicon-coherence",
+    "grammar-similarity",
+    "lexicon-change",
+    "forms-per-meaning",
+    "meanings-per-form",
+    "population-coherence",
+    "population-jaccard-sketch",
+]  # in the order of Experiment.record_events
+
+
+class BatchedNamingGameEnv:
+    """Basic naming game environment that plays all trials of an experiment at once.
+
+    The lexicons of every agent of every trial are stored in arrays with the trial as leading batch dimension:
+
+        q[t, a, m, s]         the q-value of the s-th form of agent a for meaning m in trial t
+        form_ids[t, a, m, s]  the (interned) form of that pair, -1 if the slot is empty
+        stamps[t, a, m, s]    the episode in which the pair was added, used to order pairs across meanings
+        n_forms[t, a, m]      the number of used slots, the used slots of a row are always stored first
+
+    Each call of reset/step advances one episode of every trial with array operations.
+    An episode is a single game per trial or, with cfg.INTERACTION_MODE "round", a round in which the population of
+    every trial is paired into population_size // 2 disjoint games. Since no agent plays two games of a round,
+    all games of a round are played at once.
+    The state of the current episode (speakers, hearers, topics, communicative_success, ...) are (game,) arrays,
+    the games of trial t are game_trials == t.
+
+    Every trial draws from the random streams of BasicNamingGameEnv(cfg, seeds[t]) and consumes them in the same way:
+    the interactions are read from a schedule sampled in blocks of cfg.SCHEDULE_BLOCK_SIZE episodes
+    and the uniform draws of each agent are buffered per (trial, agent).
+    In game mode, a trial of the batched environment therefore plays exactly the same games as
+    the object engine with the same seed and a non-zero block size.
+    The monitors record an event per game or the average over the games of a round (cfg.MONITOR_GRANULARITY),
+    the population measures (e.g. lexicon size) are measured at the end of an episode.
+    Forms are interned in a symbol table per trial.
+    """
+
+    def __init__(self, cfg, seeds, schedules=None, initial_slots=4, buffer_size=64):
+        self.cfg = cfg
+        self.n_trials = len(seeds)
+        self.symbols = [SymbolTable() for _ in seeds]
+        for symbols in self.symbols:
+            for _ in range(self.cfg.POPULATION_SIZE):
+                symbols.make_id("AGENT")
+            for _ in range(self.cfg.WORLD_SIZE):
+                symbols.make_id("OBJECT")
+
+        env_rngs, self.agent_rngs = [], []
+        for seed in seeds:
+            _, env_rng, agent_rngs = spawn_env_rngs(seed, self.cfg.POPULATION_SIZE)
+            env_rngs.append(env_rng)
+            self.agent_rngs.append(agent_rngs)
+        block_size = self.cfg.get("SCHEDULE_BLOCK_SIZE", 0) or 1000
+        keep = self.cfg.get("SCHEDULE_SAVE", False)
+        self.scheduler = BatchedScheduler(cfg, env_rngs, block_size, schedules, keep)
+
+        # buffered uniform draws of every agent
+        self.buffers = np.array([[rng.random(buffer_size) for rng in rngs] for rngs in self.agent_rngs])
+        self.cursors = np.zeros(self.buffers.shape[:2], dtype=np.int64)
+
+        shape = (self.n_trials, self.cfg.POPULATION_SIZE, self.cfg.WORLD_SIZE, initial_slots)
+        self.q = np.zeros(shape)
+        self.form_ids = np.full(shape, -1, dtype=np.int64)
+        self.stamps = np.zeros(shape, dtype=np.int64)
+        self.n_forms = np.zeros(shape[:3], dtype=np.int64)
+
+        # per agent statistics of the (live) lexicons, see Lexicon.size/forms_per_meaning/meanings_per_form
+        self.sizes = np.zeros(shape[:2], dtype=np.int64)
+        self.forms_per_meaning = np.zeros(shape[:2])
+        self.meanings_per_form = np.zeros(shape[:2])
+
+        self.granularity = cfg.get("MONITOR_GRANULARITY", "game")
+        if self.granularity not in ("game", "round"):
+            raise ValueError(f"Given monitor granularity {self.granularity} is not valid!")
+        self.games_per_round = self.scheduler.games_per_round
+        self.n_games = self.n_trials * self.games_per_round
+        self.game_trials = np.repeat(np.arange(self.n_trials), self.games_per_round)
+
+    def grow(self):
+        """Doubles the number of form slots of every (trial, agent, meaning) row."""
+        slots = self.q.shape[3]
+        pad = [(0, 0), (0, 0), (0, 0), (0, slots)]
+        self.q = np.pad(self.q, pad)
+        self.form_ids = np.pad(self.form_ids, pad, constant_values=-1)
+        self.stamps = np.pad(self.stamps, pad)
+
+    def refill(self, trials, agents, needed):
+        """Makes sure the buffers of the given agents hold at least the given number of unread draws."""
+        buffer_size = self.buffers.shape[2]
+        low = self.cursors[trials, agents] > buffer_size - needed
+        for t, a in zip(trials[low].tolist(), agents[low].tolist()):
+            # keep the unread draws and append the next draws of the stream
+            c = self.cursors[t, a]
+            self.buffers[t, a, : buffer_size - c] = self.buffers[t, a, c:]
+            self.buffers[t, a, buffer_size - c :] = self.agent_rngs[t][a].random(c)
+            self.cursors[t, a] = 0
+
+    def draw(self, trials, agents):
+        """Returns the next uniform draw of each given (trial, agent), the trials are distinct."""
+        cursors = self.cursors[trials, agents]
+        self.cursors[trials, agents] = cursors + 1
+        return self.buffers[trials, agents, cursors]
+
+    def epsilon_greedy(self, trials, agents, q_values, n):
+        """Vectorized version of Agent.epsilon_greedy.
+
+        Args:
+            trials (np.ndarray): trial of each choice
+            agents (np.ndarray): agent that makes the choice in its trial
+            q_values (np.ndarray): (choice, action) q-values of the actions in insertion order
+            n (np.ndarray): number of actions of each choice, the first n columns of q_values
+
+        Returns:
+            np.ndarray: index of the selected action of each choice
+        """
+        p = self.draw(trials, agents)
+        valid = np.arange(q_values.shape[1]) < n[:, None]
+        choice = np.argmax(np.where(valid, q_values, -np.inf), axis=1)
+        explore = ~(p < (1 - self.cfg.EPS_GREEDY))
+        if explore.any():
+            u = self.draw(trials[explore], agents[explore])
+            choice[explore] = (u * n[explore]).astype(np.int64)
+        return choice
+
+    def add_pairs(self, trials, agents, meanings, forms, stamp):
+        """Appends the pairs (meaning, form) to the rows of the given (trial, agent), the trials are distinct."""
+        slots = self.n_forms[trials, agents, meanings]
+        while slots.size and slots.max() >= self.q.shape[3]:
+            self.grow()
+        self.q[trials, agents, meanings, slots] = self.cfg.INITIAL_Q_VALUE
+        self.form_ids[trials, agents, meanings, slots] = forms
+        self.stamps[trials, agents, meanings, slots] = stamp
+        self.n_forms[trials, agents, meanings] += 1
+
+    def reset(self):
+        """Resets every trial to its next scheduled interaction."""
+        episode = self.scheduler.next()
+        self.speakers, self.hearers, self.contexts, self.context_sizes, self.topics = (
+            arr.reshape(self.n_games, *arr.shape[2:]) for arr in episode
+        )
+        # speakers draw at most 2 * SYLLABLES (invention), hearers at most 4 (comprehension and re-entrance)
+        self.refill(self.game_trials, self.speakers, max(2 * SYLLABLES, 2))
+        self.refill(self.game_trials, self.hearers, 4)
+        self.communicative_success = np.ones(self.n_games, dtype=bool)
+        self.lexicon_change = np.zeros(self.n_games, dtype=bool)
+        self.lexicon_coherence = np.zeros(self.n_games, dtype=bool)
+
+    def produce(self, stamp):
+        """Returns the utterance and applied slot of every speaker for its topic and whether the form was invented."""
+        trials, speakers, topics = self.game_trials, self.speakers, self.topics
+        n = self.n_forms[trials, speakers, topics]
+        known = n > 0
+        utterances = np.empty(self.n_games, dtype=np.int64)
+        slots = n.copy()  # invented forms are appended
+        if known.any():
+            t, s, m = trials[known], speakers[known], topics[known]
+            slots[known] = self.epsilon_greedy(t, s, self.q[t, s, m], n[known])
+            utterances[known] = self.form_ids[t, s, m, slots[known]]
+        invented = ~known
+        for game in np.flatnonzero(invented).tolist():
+            t, s = self.game_trials[game], self.speakers[game]
+            cursor = self.cursors[t, s]
+            draws = self.buffers[t, s, cursor : cursor + 2 * SYLLABLES].tolist()
+            self.cursors[t, s] = cursor + 2 * SYLLABLES
+            utterances[game] = self.symbols[t].intern("FORM", word_from_draws(draws))
+        if invented.any():
+            self.add_pairs(trials[invented], speakers[invented], topics[invented], utterances[invented], stamp)
+        return utterances, slots, invented
+
+    def comprehend(self, utterances):
+        """Returns the interpreted meaning and applied slot of every hearer, -1 if the utterance is unknown."""
+        trials, hearers = self.game_trials, self.hearers
+        candidates = self.form_ids[trials, hearers] == utterances[:, None, None]
+        n = candidates.sum(axis=(1, 2))
+        meanings = np.full(self.n_games, -1, dtype=np.int64)
+        slots = np.full(self.n_games, -1, dtype=np.int64)
+        known = n > 0
+        if known.any():
+            t, h = trials[known], hearers[known]
+            n_slots = self.q.shape[3]
+            candidates = candidates[known].reshape(len(t), -1)
+            # candidates in insertion order
+            stamps = np.where(candidates, self.stamps[t, h].reshape(len(t), -1), np.iinfo(np.int64).max)
+            order = np.argsort(stamps, axis=1, kind="stable")[:, : n.max()]
+            q_values = np.take_along_axis(self.q[t, h].reshape(len(t), -1), order, axis=1)
+            choice = self.epsilon_greedy(t, h, q_values, n[known])
+            flat = order[np.arange(len(t)), choice]
+            meanings[known], slots[known] = flat // n_slots, flat % n_slots
+        return meanings, slots
+
+    def re_entrance_hearer(self):
+        """Returns the form every hearer would produce for the topic within the context, -1 if there is none."""
+        trials, hearers, topics = self.game_trials, self.hearers, self.topics
+        n = self.n_forms[trials, hearers, topics]
+        able = (n > 0) & (self.contexts == topics[:, None]).any(axis=1)
+        forms = np.full(self.n_games, -1, dtype=np.int64)
+        if able.any():
+            t, h, m = trials[able], hearers[able], topics[able]
+            slots = self.epsilon_greedy(t, h, self.q[t, h, m], n[able])
+            forms[able] = self.form_ids[t, h, m, slots]
+        return forms
+
+    def align(self, trials, agents, meanings, slots, success):
+        """Vectorized version of Agent.align for the applied pair (meaning, slot) of each given (trial, agent)."""
+        n = self.n_forms[trials, agents, meanings]
+        columns = np.arange(self.q.shape[3])
+        applied = columns == slots[:, None]
+        valid = columns < n[:, None]
+        success = success[:, None]
+        rewards = np.where(success, self.cfg.REWARD_SUCCESS, self.cfg.REWARD_FAILURE)
+        update = applied
+        if self.cfg.LATERAL_INHIBITION:
+            # lateral inhibition punishes the competitors of a successful pair
+            rewards = np.where(applied, rewards, self.cfg.REWARD_FAILURE)
+            update = applied | (valid & success)
+        q_values = self.q[trials, agents, meanings]
+        new_q, delete = update_values(self.cfg, q_values, rewards)
+        self.q[trials, agents, meanings] = np.where(update, new_q, q_values)
+        delete &= update
+        rows = np.flatnonzero(delete.any(axis=1))
+        if rows.size:
+            self.compact_rows(trials[rows], agents[rows], meanings[rows], valid[rows] & ~delete[rows])
+
+    def compact_rows(self, trials, agents, meanings, keep):
+        """Deletes the slots of the rows that are not kept while preserving the insertion order."""
+        order = np.argsort(~keep, axis=1, kind="stable")
+        kept = keep.sum(axis=1)
+        empty = np.arange(keep.shape[1]) >= kept[:, None]
+        for arr, value in ((self.q, 0), (self.form_ids, -1), (self.stamps, 0)):
+            rows = np.take_along_axis(arr[trials, agents, meanings], order, axis=1)
+            rows[empty] = value
+            arr[trials, agents, meanings] = rows
+        self.n_forms[trials, agents, meanings] = kept
+
+    def update_statistics(self, trials, agents):
+        """Recomputes the lexicon statistics of the given (trial, agent) pairs."""
+        width = self.used_slots(trials, agents)
+        forms = self.form_ids[trials, agents, :, :width]
+        mask = forms >= 0
+        if self.cfg.IGNORE_LOW_SA_PAIR:
+            mask &= keep_value(self.cfg, self.q[trials, agents, :, :width])
+        sizes = mask.sum(axis=(1, 2))
+        n_meanings = mask.any(axis=2).sum(axis=1)
+        forms = np.sort(np.where(mask, forms, -1).reshape(len(trials), -1), axis=1)
+        n_forms = (forms[:, 0] >= 0) + ((forms[:, 1:] != forms[:, :-1]) & (forms[:, 1:] >= 0)).sum(axis=1)
+        self.sizes[trials, agents] = sizes
+        self.forms_per_meaning[trials, agents] = np.where(n_meanings > 0, sizes / np.maximum(n_meanings, 1), 0)
+        self.meanings_per_form[trials, agents] = np.where(n_forms > 0, sizes / np.maximum(n_forms, 1), 0)
+
+    def step(self, idx):
+        """Interaction script of the basic naming game (see BasicNamingGameEnv.step) in every trial.
+
+        Args:
+            idx (int): denotes the ith interaction in the environment
+        """
+        trials, speakers, hearers, topics = self.game_trials, self.speakers, self.hearers, self.topics
+
+        # speakers choose actions ifo topics
+        utterances, speaker_slots, self.lexicon_change = self.produce(stamp=idx)
+        # hearers choose actions ifo utterances
+        interpretations, hearer_slots = self.comprehend(utterances)
+
+        hearer_utterances = self.re_entrance_hearer()  # monitoring
+        self.lexicon_coherence = hearer_utterances == utterances  # monitoring
+
+        # evaluate communicative interactions
+        failure = interpretations != topics
+        self.lexicon_change |= failure  # monitoring
+        known = (self.form_ids[trials, hearers, topics] == utterances[:, None]).any(axis=1)
+        adopt = failure & ~known
+        self.add_pairs(trials[adopt], hearers[adopt], topics[adopt], utterances[adopt], idx)
+        self.communicative_success = ~failure
+
+        # learn based on outcome
+        applied = interpretations >= 0
+        self.align(
+            np.concatenate([trials, trials[applied]]),
+            np.concatenate([speakers, hearers[applied]]),
+            np.concatenate([topics, interpretations[applied]]),
+            np.concatenate([speaker_slots, hearer_slots[applied]]),
+            np.concatenate([self.communicative_success, self.communicative_success[applied]]),
+        )
+        self.update_statistics(np.concatenate([trials, trials]), np.concatenate([speakers, hearers]))
+
+    def used_slots(self, trials, agents):
+        """Returns the number of slots in use by the fullest row of the given (trial, agent) pairs."""
+        return max(int(self.n_forms[trials, agents].max(initial=0)), 1)
+
+    def lexicon_similarity(self):
+        """Returns the lexicon similarity of the speaker and hearer of every game (see Monitors.lexicon_similarity).
+
+        Each (meaning, form) pair is encoded as a single key, the pairs shared by speaker and hearer
+        are the duplicates in the sorted keys of both lexicons.
+        """
+        trials = np.concatenate([self.game_trials, self.game_trials])
+        agents = np.concatenate([self.speakers, self.hearers])
+        forms = self.form_ids[trials, agents, :, : self.used_slots(trials, agents)]
+        meanings = np.arange(forms.shape[1])[:, None]
+        keys = np.where(forms >= 0, forms * forms.shape[1] + meanings, -1).reshape(2, self.n_games, -1)
+        keys = np.sort(np.concatenate([keys[0], keys[1]], axis=1), axis=1)
+        shared = ((keys[:, 1:] == keys[:, :-1]) & (keys[:, 1:] >= 0)).sum(axis=1)
+        total = (keys >= 0).sum(axis=1)
+        return np.where(total > 0, 2 * shared / np.maximum(total, 1), 0)
+
+    def associations(self):
+        """Yields the agents and the associations (keyed by form and meaning) of the (live) pairs of every trial."""
+        width = max(int(self.n_forms.max(initial=0)), 1)
+        forms = self.form_ids[..., :width]
+        mask = forms >= 0
+        if self.cfg.IGNORE_LOW_SA_PAIR:
+            mask &= keep_value(self.cfg, self.q[..., :width])
+        for trial in range(self.n_trials):
+            agents, meanings, slots = np.nonzero(mask[trial])
+            yield agents, forms[trial, agents, meanings, slots] * forms.shape[2] + meanings
+
+    def population_coherence(self):
+        """Returns the average lexicon similarity of all pairs of agents of every trial (see population_coherence)."""
+        population_size = self.cfg.POPULATION_SIZE
+        return np.array([population_coherence(*pairs, population_size) for pairs in self.associations()])
+
+    def population_jaccard_sketch(self):
+        """Returns the MinHash estimate of the Jaccard similarity of all pairs of agents of every trial (see sketch)."""
+        population_size, size = self.cfg.POPULATION_SIZE, self.cfg.get("MINHASH_SIZE", SIGNATURE_SIZE)
+        return np.array(
+            [estimate_similarity(signatures(*pairs, population_size, size)) for pairs in self.associations()]
+        )
+
+    def measures(self, keys=None):
+        """Returns the events of every trial for each monitor of Experiment.record_events.
+
+        In game mode, or when averaging rounds (cfg.MONITOR_GRANULARITY: round), the events are (trial,) arrays.
+        Otherwise each trial records an event per game of the round, i.e. (trial, game) arrays.
+
+        Args:
+            keys (list): the monitors of which the events are computed (in MONITORS), None computes all of them
+        """
+        keys = MONITORS if keys is None else keys
+        shape = (self.n_trials, self.games_per_round)
+        games = {
+            "communicative-success": lambda: self.communicative_success,
+            "lexicon-coherence": lambda: self.lexicon_coherence,
+            "grammar-similarity": self.lexicon_similarity,
+            "lexicon-change": lambda: self.lexicon_change,
+        }
+        population_size = self.cfg.POPULATION_SIZE
+        population = {
+            "lexicon-size": lambda: self.sizes.sum(axis=1) / population_size,
+            "forms-per-meaning": lambda: self.forms_per_meaning.sum(axis=1) / population_size,
+            "meanings-per-form": lambda: self.meanings_per_form.sum(axis=1) / population_size,
+            "population-coherence": self.population_coherence,
+            "population-jaccard-sketch": self.population_jaccard_sketch,
+        }
+        measures = {}
+        for key in keys:
+            if key in games:
+                events = games[key]().reshape(shape)
+                if self.games_per_round == 1:
+                    events = events[:, 0]
+                elif self.granularity == "round":
+                    events = events.mean(axis=1)
+            elif key in population:
+                events = population[key]()
+                if self.games_per_round > 1 and self.granularity != "round":
+                    events = np.repeat(events[:, None], shape[1], axis=1)
+            else:
+                raise ValueError(f"Given monitor {key} is not valid for engine batched!")
+            measures[key] = events
+        return measures
+
+    def lexicon(self, trial, agent):
+        """Returns the (meaning, form, q-value) triples of the lexicon of an agent in insertion order."""
+        meanings, slots = np.nonzero(self.form_ids[trial, agent] >= 0)
+        order = np.argsort(self.stamps[trial, agent, meanings, slots], kind="stable")
+        meanings, slots = meanings[order], slots[order]
+        forms = self.form_ids[trial, agent, meanings, slots].tolist()
+        q_values = self.q[trial, agent, meanings, slots].tolist()
+        return list(zip(meanings.tolist(), forms, q_values))
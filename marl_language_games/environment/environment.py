@@ -1,30 +1,33 @@
 import logging
-import random
 
 import numpy as np
 
 from marl_language_games.environment.agent import HEARER, SPEAKER, Agent
-from marl_language_games.utils.invention import make_id
+from marl_language_games.environment.schedule import Scheduler
+from marl_language_games.utils.invention import SymbolTable
+from marl_language_games.utils.seeding import rand_index, spawn_env_rngs
 
 
 class World:
     """Abstraction class of the part of the environment which handles the shared world."""
 
-    def __init__(self, world_size):
-        """Initializes a world of objects."""
-        self.objects = [make_id("OBJECT") for _ in range(world_size)]
+    def __init__(self, world_size, symbols=None, rng=None):
+        """Initializes a world of objects, each object is identified by its interned id."""
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.objects = [self.symbols.make_id("OBJECT") for _ in range(world_size)]
 
     def pick_topic(self, context):
         """Given a list of objects (context) returns at random one of the objects as the topic."""
-        return random.sample(context, k=1)[0]
+        return context[rand_index(self.rng, len(context))]
 
     def pick_context(self, context_min_size, context_max_size):
         """Given a world chooses a subset of the world of objects as the context.
 
         The size of the context is sampled uniformly at run-time using the given parameters context_min/max_size.
         """
-        context_size = np.random.randint(context_min_size, context_max_size + 1)
-        return random.sample(self.objects, k=context_size)
+        context_size = context_min_size + rand_index(self.rng, context_max_size - context_min_size + 1)
+        return [self.objects[idx] for idx in self.rng.choice(len(self.objects), context_size, replace=False).tolist()]
 
 
 class BasicNamingGameEnv:
@@ -55,21 +58,46 @@ class BasicNamingGameEnv:
 
     """
 
-    def __init__(self, cfg):
+    def __init__(self, cfg, seed=None, schedule=None):
         self.cfg = cfg
-        self.world = World(self.cfg.WORLD_SIZE)
-        self.population = [Agent(cfg) for i in range(self.cfg.POPULATION_SIZE)]
+        self.symbols = SymbolTable()  # agents, objects and forms of this environment
+        world_rng, self.rng, agent_rngs = spawn_env_rngs(seed, self.cfg.POPULATION_SIZE)
+        self.world = World(self.cfg.WORLD_SIZE, self.symbols, world_rng)
+        self.population = [Agent(cfg, self.symbols, rng) for rng in agent_rngs]
+        self.scheduler = self.select_scheduler(schedule)
+
+    def select_scheduler(self, schedule=None):
+        """Returns the scheduler of the interactions, None samples every interaction separately at reset.
+
+        A given schedule is replayed, otherwise interactions are sampled in blocks of cfg.SCHEDULE_BLOCK_SIZE episodes.
+        """
+        if schedule is not None:
+            return Scheduler(self.cfg, schedule=schedule)
+        block_size = self.cfg.get("SCHEDULE_BLOCK_SIZE", 0)
+        if block_size:
+            return Scheduler(self.cfg, self.rng, block_size, keep=self.cfg.get("SCHEDULE_SAVE", False))
+        return None
 
     def reset(self):
         """Resets the basic naming game environment."""
-        # determine interacting agents
-        self.speaker, self.hearer = random.sample(self.population, k=2)
-
-        # determine context and topic
-        self.context = self.world.pick_context(
-            self.cfg.CONTEXT_MIN_SIZE, self.cfg.CONTEXT_MAX_SIZE
-        )
-        self.topic = self.world.pick_topic(self.context)
+        if self.scheduler is not None:
+            # read interacting agents, context and topic from the schedule
+            speaker, hearer, context, topic = self.scheduler.next()
+            self.speaker, self.hearer = self.population[speaker], self.population[hearer]
+            self.context = [self.world.objects[obj] for obj in context]
+            self.topic = self.world.objects[topic]
+        else:
+            # determine interacting agents
+            speaker = rand_index(self.rng, len(self.population))
+            hearer = rand_index(self.rng, len(self.population) - 1)
+            hearer += hearer >= speaker  # two different agents
+            self.speaker, self.hearer = self.population[speaker], self.population[hearer]
+
+            # determine context and topic
+            self.context = self.world.pick_context(
+                self.cfg.CONTEXT_MIN_SIZE, self.cfg.CONTEXT_MAX_SIZE
+            )
+            self.topic = self.world.pick_topic(self.context)
 
         # reset agent
         self.speaker.reset(self.context)
@@ -109,15 +137,20 @@ class BasicNamingGameEnv:
             self.print_example_interaction(idx, utterance, interpretation)
 
     def print_example_interaction(self, idx, utterance, interpretation):
+        speaker = self.symbols.name("AGENT", self.speaker.id)
+        hearer = self.symbols.name("AGENT", self.hearer.id)
+        utterance = self.symbols.name("FORM", utterance)
+        if interpretation is not None:
+            interpretation = self.symbols.name("OBJECT", interpretation)
         logging.debug(f"\n\n- Episode {idx}")
-        logging.debug(f" ~~ GAME BETWEEN: {self.speaker.id} - {self.hearer.id} ~~")
-        logging.debug(f" ~~ TOPIC: {self.topic} ~~")
-        logging.debug(f" === {self.speaker.id} q-table:")
+        logging.debug(f" ~~ GAME BETWEEN: {speaker} - {hearer} ~~")
+        logging.debug(f" ~~ TOPIC: {self.symbols.name('OBJECT', self.topic)} ~~")
+        logging.debug(f" === {speaker} q-table:")
         logging.debug(f"\n{self.speaker.lexicon}")
-        logging.debug(f" === {self.speaker.id} uttered {utterance}")
-        logging.debug(f" === {self.hearer.id} q-table:")
+        logging.debug(f" === {speaker} uttered {utterance}")
+        logging.debug(f" === {hearer} q-table:")
         logging.debug(f"\n{self.hearer.lexicon}")
-        logging.debug(f" === {self.hearer.id} interpreted {interpretation}")
+        logging.debug(f" === {hearer} interpreted {interpretation}")
         if self.speaker.communicative_success:
             logging.debug(" ===> SUCCESS <===")
         else:
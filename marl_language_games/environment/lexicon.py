@@ -1,18 +1,155 @@
 from collections import defaultdict
 
+import numpy as np
 from prettytable import PrettyTable
 
-from marl_language_games.utils.invention import invent
+from marl_language_games.environment.sketch import SIGNATURE_SIZE, hashes, minhash
+from marl_language_games.utils.invention import SymbolTable, invent
+
+
+MULTIPLE_STATES = (list, tuple, set, frozenset)
+# number of bits of a form id in the key of an association (see pair_key)
+FORM_BITS = 32
+FORM_MASK = (1 << FORM_BITS) - 1
+# type of the meaning and form codes stored by a lexicon and the code of an empty slot
+CODE_DTYPE = np.int32
+EMPTY_SLOT = np.iinfo(CODE_DTYPE).min
+# number of slots of the arrays of a new lexicon
+INITIAL_SLOTS = 8
+# kind of the symbol table under which a lexicon interns meanings and forms that are not interned ids
+UNINTERNED = "UNINTERNED"
+
+
+def as_states(states):
+    """Returns the given state(s) as a collection, a single state (e.g. an interned id) is wrapped in a list."""
+    return states if isinstance(states, MULTIPLE_STATES) else [states]
+
+
+def keep_value(cfg, q_value):
+    """True if and only if the q-value is larger than the reward for failure + some epsilon.
+
+    The threshold depends on the update rule, missing reward parameters are taken to be 0.
+
+    Args:
+        cfg (dict): parameters of the experiment
+        q_value (float or np.ndarray): q-value(s) to check
+
+    Returns:
+        bool or np.ndarray: whether the q-value(s) should be counted as part of the lexicon
+    """
+    update_rule = cfg.get("UPDATE_RULE")
+    if update_rule == "interpolated":
+        return q_value >= cfg.get("REWARD_FAILURE", 0) + cfg.get("EPSILON_FAILURE", 0)
+    elif update_rule == "basic":
+        return q_value >= cfg.get("EPSILON_FAILURE", 0)
+    return False
+
+
+def population_coherence(agents, associations, n_agents):
+    """Returns the lexicon similarity (see Monitors.lexicon_similarity) averaged over all pairs of agents.
+
+    The lexicons form a sparse binary (agent, association) matrix A, given by the coordinates of its entries.
+    The overlaps of all pairs of lexicons are the entries of A A^T. Since the similarity of a pair only depends
+    on its overlap and the sizes of both lexicons, the overlaps are summed per pair of sizes instead:
+    H^T H, where H counts the agents holding each association per lexicon size. The cost is linear in the
+    number of entries (agents x lexicon size) rather than quadratic in the number of agents.
+
+    Args:
+        agents (np.ndarray): the agent of each entry of A, in [0, n_agents)
+        associations (np.ndarray): the (meaning, form) association of each entry of A as an integer key
+        n_agents (int): the number of agents of the population
+
+    Returns:
+        float: a number between [0, 1] denoting the coherence of the lexicons of the population
+    """
+    if n_agents < 2:
+        return 0.0
+    agents = np.asarray(agents, dtype=np.int64)
+    sizes = np.bincount(agents, minlength=n_agents)
+    distinct, size_index = np.unique(sizes, return_inverse=True)
+    keys, key_index = np.unique(associations, return_inverse=True)
+    holders = np.bincount(key_index * len(distinct) + size_index[agents], minlength=len(keys) * len(distinct))
+    holders = holders.reshape(len(keys), len(distinct)).astype(np.float64)
+    overlaps = holders.T @ holders  # summed overlaps of the ordered pairs of agents (including themselves) per sizes
+    totals = distinct[:, None] + distinct[None, :]
+    similarity = (2 * overlaps / np.maximum(totals, 1)).sum() - np.count_nonzero(sizes)  # an agent with itself is 1
+    return float(similarity / (n_agents * (n_agents - 1)))
+
+
+def pair_key(meaning, form):
+    """Returns the integer key of the association of a meaning and a form id, i.e. the packed pair of ids.
+
+    Also packs arrays of 64-bit meanings and forms, e.g. the codes of a lexicon (see Lexicon.keys).
+    """
+    return meaning << FORM_BITS | form & FORM_MASK
 
 
 class SAPair:
+    """A state/action pair of the q-table, i.e. an association between a meaning and a form with a q-value.
+
+    A lexicon does not store its pairs as objects (see Lexicon), the pairs it returns are views on a slot of
+    its arrays: reading the q-value of a view reads the lexicon, changing it calls Lexicon.set_q_value so that
+    the statistics follow. A pair that is not part of a lexicon (e.g. given to the q_table setter) holds its own
+    q-value.
+    Pairs are equal if their meaning and form are equal, their hash is the packed pair of ids (see pair_key).
+    """
+
+    __slots__ = ("meaning", "form", "_q_value", "_lexicon", "_slot", "_epoch")
+
     def __init__(self, meaning, form, initial_value=0):
         self.meaning = meaning
         self.form = form
-        self.q_value = initial_value
+        self._q_value = initial_value
+        self._lexicon = None
+
+    @classmethod
+    def views(cls, lexicon, slots, meanings, forms):
+        """Returns the pairs stored in the given slots of the arrays of a lexicon, given their meanings and forms."""
+        epoch, views = lexicon._epoch, []
+        for slot, meaning, form in zip(slots, meanings, forms):
+            sa_pair = cls.__new__(cls)
+            sa_pair.meaning, sa_pair.form = meaning, form
+            sa_pair._lexicon, sa_pair._slot, sa_pair._epoch = lexicon, slot, epoch
+            views.append(sa_pair)
+        return views
+
+    @property
+    def q_value(self):
+        lexicon = self._lexicon
+        if lexicon is None:
+            return self._q_value
+        return lexicon._q_values.item(self._slot if self._epoch == lexicon._epoch else self._locate())
+
+    @q_value.setter
+    def q_value(self, q_value):
+        if self._lexicon is None:
+            self._q_value = q_value
+        else:
+            self._lexicon.set_q_value(self, q_value)
+
+    def detach(self):
+        """Turns a view into a pair that holds its own q-value, e.g. once it is removed from the lexicon."""
+        self._q_value = self.q_value
+        self._lexicon = None
+
+    def _locate(self):
+        """Returns the slot of the view, which is looked up again if the lexicon moved or removed pairs (see Lexicon).
+
+        Raises a ValueError if the pair is no longer part of the lexicon, e.g. removed through an equal pair.
+        """
+        lexicon = self._lexicon
+        if self._epoch != lexicon._epoch:
+            slot = lexicon._find(self.meaning, self.form)
+            if slot is None:
+                raise ValueError(f"Given pair ({self.meaning} - {self.form}) is not part of the lexicon!")
+            self._slot, self._epoch = slot, lexicon._epoch
+        return self._slot
 
     def __hash__(self):
-        return hash((self.meaning, self.form))
+        try:
+            return hash(pair_key(self.meaning, self.form))
+        except TypeError:  # symbols that are not interned ids, e.g. strings
+            return hash((self.meaning, self.form))
 
     def __eq__(self, other):
         return self.meaning == other.meaning and self.form == other.form
@@ -21,13 +158,88 @@ class SAPair:
         return f"SAPair: ({self.meaning} - {self.form}) -> {self.q_value}"
 
 
-class Lexicon:
-    """The bidirectional dynamic Q-table implemented as a list of state-action pairs."""
+class LexiconStatistics:
+    """Running counts over a set of state/action pairs.
+
+    Keeps the number of pairs, the number of distinct meanings and the number of distinct forms,
+    so that the averages reported by the monitors never require a pass over the q-table.
+    The lexicon tells whether a pair holds the first (or last) occurrence of its meaning and form.
+    """
+
+    __slots__ = ("size", "meanings", "forms")
+
+    def __init__(self):
+        self.size = 0
+        self.meanings = 0  # number of distinct meanings of the pairs
+        self.forms = 0  # number of distinct forms of the pairs
+
+    def add(self, new_meaning, new_form):
+        self.size += 1
+        self.meanings += new_meaning
+        self.forms += new_form
+
+    def remove(self, last_meaning, last_form):
+        self.size -= 1
+        self.meanings -= last_meaning
+        self.forms -= last_form
+
+    def forms_per_meaning(self):
+        """Returns the average number of forms associated to each meaning (0 if there are no pairs)."""
+        return self.size / self.meanings if self.meanings else 0
+
+    def meanings_per_form(self):
+        """Returns the average number of meanings associated to each form (0 if there are no pairs)."""
+        return self.size / self.forms if self.forms else 0
+
 
-    def __init__(self, cfg):
+class Lexicon:
+    """The bidirectional dynamic Q-table implemented as per-agent parallel arrays of meanings, forms and q-values.
+
+    A pair takes a slot of the arrays: its meaning and form are stored as 32-bit codes (interned ids are their
+    own code, other symbols such as strings get a negative code, see _code) and its q-value as a double.
+    Slots are taken in insertion order. A removed pair leaves an empty slot behind, the empty slots are dropped
+    when the arrays are full (compacting them) and the arrays double in size otherwise. Compacting moves the
+    pairs to other slots, hence the views handed out by the lexicon (see SAPair) look their slot up again
+    after pairs are moved or removed. The views of a removed pair raise a ValueError.
+    Produce and comprehend scan the meanings or forms with NumPy.
+
+    Next to the q-table, the lexicon keeps running statistics over all its pairs and over its live pairs,
+    i.e. the pairs of which the q-value passes keep_value. The statistics are updated when pairs are added
+    or removed and when a q-value changed through set_q_value crosses the keep_value threshold.
+    Once requested, MinHash signatures of its pairs are maintained in the same way (see signature).
+    """
+
+    def __init__(self, cfg, symbols=None, rng=None):
         self.cfg = cfg
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.rng = rng if rng is not None else np.random.default_rng()  # used to invent forms
+        self._epoch = 0  # incremented whenever pairs move to other slots or are removed
         self.q_table = []  # the set of state/action pairs, i.e. the q-table
 
+    @property
+    def q_table(self):
+        """The set of state/action pairs in insertion order."""
+        return self._pairs_at(np.flatnonzero(self._meanings[: self._end] != EMPTY_SLOT))
+
+    @q_table.setter
+    def q_table(self, sa_pairs):
+        pairs = [(sa_pair.meaning, sa_pair.form, sa_pair.q_value) for sa_pair in sa_pairs]  # may be views on self
+        self._clear()
+        self.statistics = {False: LexiconStatistics(), True: LexiconStatistics()}  # live -> statistics
+        self.signatures = {}  # live -> MinHash signature, only for the requested signatures
+        for meaning, form, q_value in pairs:
+            self._insert(meaning, form, q_value)
+
+    def keys(self):
+        """Returns the keys of the pairs in insertion order (see pair_key), without creating the pairs.
+
+        Symbols that are not interned ids are packed by their code, which is only shared by the lexicons
+        of the same symbol table.
+        """
+        used = self._meanings[: self._end] != EMPTY_SLOT
+        meanings, forms = self._meanings[: self._end][used], self._forms[: self._end][used]
+        return pair_key(meanings.astype(np.int64), forms.astype(np.int64)).tolist()
+
     def invent_sa_pair(self, state):
         """Invents an action for a given state and adds the new pair to the lexicon.
 
@@ -35,11 +247,10 @@ class Lexicon:
             meaning (str): denotes the meaning of an object
 
         Returns:
-            sa_pair: the newly added state/action pair of the lexicon
+            sa_pair: the newly added state/action pair of the lexicon, its form is an interned id
         """
-        new_sa_pair = SAPair(state, invent(), self.cfg.INITIAL_Q_VALUE)
-        self.q_table.append(new_sa_pair)
-        return new_sa_pair
+        form = self.symbols.intern("FORM", invent(rng=self.rng))
+        return self._pairs_at([self._insert(state, form, self.cfg.INITIAL_Q_VALUE)])[0]
 
     def adopt_sa_pair(self, meaning, form):
         """Adds a given state/action pair to the lexicon.
@@ -51,13 +262,12 @@ class Lexicon:
             form (str): denotes the utterance to describe the object
 
         Returns:
-            sa_pair: the newly added state/action pair of the lexicon
+            sa_pair: the state/action pair of the lexicon, which was already part of it or newly added
         """
-        new_sa_pair = SAPair(meaning, form, self.cfg.INITIAL_Q_VALUE)
-        # uses SAPair __eq__ to determine if member
-        if new_sa_pair not in self.q_table:
-            self.q_table.append(new_sa_pair)
-        return new_sa_pair
+        slot = self._find(meaning, form)
+        if slot is None:
+            slot = self._insert(meaning, form, self.cfg.INITIAL_Q_VALUE)
+        return self._pairs_at([slot])[0]
 
     def get_actions_produce(self, states):
         """Returns the set of possible state/action pairs that have the given state.
@@ -65,13 +275,12 @@ class Lexicon:
         The state in this case corresponds to a meaning of an object.
 
         Args:
-            states (str or list): a single meaning or a list of meanings
+            states (int or list): a single meaning or a list of meanings
 
         Returns:
             list: a list of all state/action pairs that are a match
         """
-        filtered = filter(lambda sa_pair: sa_pair.meaning in states, self.q_table)
-        return list(filtered)
+        return self._pairs_at(self._slots(False, self._codes(as_states(states))))
 
     def get_actions_comprehend(self, states):
         """Returns the set of possible state/action pairs that have the given state.
@@ -79,32 +288,217 @@ class Lexicon:
         The state in this case corresponds to the form used to describe a meaning.
 
         Args:
-            states (str or list): a single form or a list of form
+            states (int or list): a single form or a list of forms
 
         Returns:
             list: a list of all state/action pairs that are a match
         """
-        filtered = filter(lambda sa_pair: sa_pair.form in states, self.q_table)
-        return list(filtered)
+        return self._pairs_at(self._slots(True, self._codes(as_states(states))))
 
     def remove_sa_pair(self, sa_pair):
-        """Removes a state/action pair from the lexicon."""
-        self.q_table.remove(sa_pair)
+        """Removes a state/action pair from the lexicon.
+
+        Raises a ValueError if no equal pair is present.
+        """
+        slot = self._slot_of(sa_pair)
+        self._track(False, slot, added=False)
+        if self.is_live(self._q_values.item(slot)):
+            self._track(True, slot, added=False)
+        if sa_pair._lexicon is self:
+            sa_pair.detach()
+        self._discard(slot)
+
+    def set_q_value(self, sa_pair, q_value):
+        """Sets the q-value of a state/action pair of the lexicon and updates the live statistics."""
+        slot = self._slot_of(sa_pair)
+        was_live, is_live = self.is_live(self._q_values.item(slot)), self.is_live(q_value)
+        if was_live and not is_live:
+            self._track(True, slot, added=False)
+        self._q_values[slot] = q_value
+        if is_live and not was_live:
+            self._track(True, slot, added=True)
+
+    def is_live(self, q_value):
+        """True if and only if a pair with the given q-value passes keep_value."""
+        return bool(keep_value(self.cfg, q_value))
+
+    def size(self, live=False):
+        """Returns the number of (live) pairs of the lexicon."""
+        return self.statistics[live].size
+
+    def forms_per_meaning(self, live=False):
+        """Returns the average number of forms associated to each meaning, counting (live) pairs."""
+        return self.statistics[live].forms_per_meaning()
+
+    def meanings_per_form(self, live=False):
+        """Returns the average number of meanings associated to each form, counting (live) pairs."""
+        return self.statistics[live].meanings_per_form()
+
+    def signature(self, live=False):
+        """Returns the MinHash signature of the (live) pairs of the lexicon, see sketch.minhash.
+
+        Each pair is keyed by its hash, cfg.MINHASH_SIZE sets the number of hash functions. Once requested,
+        the signature is updated when pairs are added or become live. Removing a pair that holds a minimum
+        of the signature drops it, it is recomputed on the next request.
+        """
+        if live not in self.signatures:
+            pairs = [hash(sa_pair) for sa_pair in self.q_table if not live or self.is_live(sa_pair.q_value)]
+            self.signatures[live] = minhash(pairs, self.cfg.get("MINHASH_SIZE", SIGNATURE_SIZE))
+        return self.signatures[live]
+
+    def _update_signature(self, live, slot, added):
+        """Adds or removes the pair in the given slot to the (live) signature if it has been requested."""
+        signature = self.signatures.get(live)
+        if signature is None:
+            return
+        values = hashes([hash(self._pairs_at([slot])[0])], len(signature))[0]
+        if added:
+            np.minimum(signature, values, out=signature)
+        elif (values == signature).any():
+            del self.signatures[live]
+
+    def _track(self, live, slot, added):
+        """Adds or removes the pair in the given slot to the (live) statistics and signature.
+
+        The pair is counted with the (live) pairs of the lexicon, i.e. it is added to them before and removed after.
+        """
+        new_meaning = self._count(False, self._meanings.item(slot), live) == 1
+        new_form = self._count(True, self._forms.item(slot), live) == 1
+        if added:
+            self.statistics[live].add(new_meaning, new_form)
+        else:
+            self.statistics[live].remove(new_meaning, new_form)
+        self._update_signature(live, slot, added)
+
+    def _count(self, by_form, code, live):
+        """Returns the number of (live) pairs with the given meaning (or form) code."""
+        matches = (self._forms if by_form else self._meanings)[: self._end] == code
+        if live:
+            matches &= keep_value(self.cfg, self._q_values[: self._end])
+        return int(np.count_nonzero(matches))
+
+    def _insert(self, meaning, form, q_value):
+        """Adds a state/action pair to the arrays and to the statistics, returns its slot."""
+        if self._end == len(self._q_values):
+            self._make_room()
+        slot = self._end
+        self._meanings[slot], self._forms[slot] = self._code(meaning), self._code(form)
+        self._q_values[slot] = q_value
+        self._end += 1
+        self._add(slot)
+        self._track(False, slot, added=True)
+        if self.is_live(q_value):
+            self._track(True, slot, added=True)
+        return slot
+
+    def _make_room(self):
+        """Compacts the arrays if at least half of the slots are empty, doubles their size otherwise."""
+        if 2 * self._removed >= len(self._q_values):
+            kept = np.flatnonzero(self._meanings[: self._end] != EMPTY_SLOT)
+            self._end, self._removed = len(kept), 0
+            for array in (self._meanings, self._forms, self._q_values):
+                array[: self._end] = array[kept]
+            self._meanings[self._end :] = self._forms[self._end :] = EMPTY_SLOT
+            self._epoch += 1
+            self._reindex()
+        else:
+            capacity = len(self._q_values)
+            self._meanings = np.concatenate([self._meanings, np.full(capacity, EMPTY_SLOT, dtype=CODE_DTYPE)])
+            self._forms = np.concatenate([self._forms, np.full(capacity, EMPTY_SLOT, dtype=CODE_DTYPE)])
+            self._q_values = np.concatenate([self._q_values, np.zeros(capacity)])
+
+    def _code(self, symbol):
+        """Returns the code of a meaning or form in the arrays, symbols that are not interned ids are interned."""
+        if isinstance(symbol, (int, np.integer)):
+            return symbol
+        return -1 - self.symbols.intern(UNINTERNED, symbol)
+
+    def _codes(self, symbols):
+        """Returns the codes of the given meanings or forms, leaving out the symbols that were never interned."""
+        uninterned, codes = self.symbols.ids.get(UNINTERNED, {}), []
+        for symbol in symbols:
+            if isinstance(symbol, (int, np.integer)):
+                codes.append(symbol)
+            elif symbol in uninterned:
+                codes.append(-1 - uninterned[symbol])
+        return codes
+
+    def _symbol(self, code):
+        """Returns the meaning or form of a code in the arrays (see _code)."""
+        return code if code >= 0 else self.symbols.names[UNINTERNED][-1 - code]
+
+    def _pairs_at(self, slots):
+        """Returns the views on the pairs in the given slots (see SAPair)."""
+        if isinstance(slots, np.ndarray):
+            meanings, forms, slots = self._meanings[slots].tolist(), self._forms[slots].tolist(), slots.tolist()
+        else:  # a few slots of an index, reading them one by one is cheaper
+            meanings, forms = [self._meanings.item(slot) for slot in slots], [self._forms.item(slot) for slot in slots]
+        if UNINTERNED in self.symbols.ids:
+            meanings, forms = [self._symbol(code) for code in meanings], [self._symbol(code) for code in forms]
+        return SAPair.views(self, slots, meanings, forms)
+
+    def _slot_of(self, sa_pair):
+        """Returns the slot of the pair of the lexicon equal to the given pair, raises a ValueError if there is none."""
+        if sa_pair._lexicon is self:
+            return sa_pair._locate()
+        slot = self._find(sa_pair.meaning, sa_pair.form)
+        if slot is None:
+            raise ValueError(f"Given pair ({sa_pair.meaning} - {sa_pair.form}) is not part of the lexicon!")
+        return slot
+
+    def _find(self, meaning, form):
+        """Returns the slot of the pair with the given meaning and form or None if it is not part of the lexicon."""
+        codes = self._codes([meaning, form])
+        if len(codes) < 2:
+            return None
+        for slot in self._slots(False, codes[:1]):
+            if self._forms.item(slot) == codes[1]:
+                return int(slot)
+        return None
+
+    def _slots(self, by_form, codes):
+        """Returns the slots of the pairs with one of the given meaning (or form) codes, in insertion order."""
+        column = (self._forms if by_form else self._meanings)[: self._end]
+        if len(codes) == 1:
+            return (column == codes[0]).nonzero()[0]
+        return np.isin(column, codes).nonzero()[0]
+
+    def _clear(self):
+        """Removes all state/action pairs from the arrays."""
+        self._meanings = np.full(INITIAL_SLOTS, EMPTY_SLOT, dtype=CODE_DTYPE)
+        self._forms = np.full(INITIAL_SLOTS, EMPTY_SLOT, dtype=CODE_DTYPE)
+        self._q_values = np.zeros(INITIAL_SLOTS)
+        self._end = 0  # number of used slots, including the empty slots of removed pairs
+        self._removed = 0  # number of empty slots of removed pairs
+        self._epoch += 1
+
+    def _add(self, slot):
+        """Called once a pair is stored in the given slot."""
+
+    def _discard(self, slot):
+        """Empties the slot of a removed pair."""
+        self._meanings[slot] = self._forms[slot] = EMPTY_SLOT
+        self._removed += 1
+        self._epoch += 1  # the views of the removed pair must not read or write the empty slot
+
+    def _reindex(self):
+        """Called once the arrays are compacted."""
 
     def __len__(self):
         """Returns the length of the q-table, which corresponds to the amount of current entries."""
-        return len(self.q_table)
+        return self._end - self._removed
 
     def __repr__(self):
         """Returns a string representation of the lexicon as a bidirectional dynamic q-table."""
         tbl = PrettyTable()
+        q_table = self.q_table
 
-        forms = sorted(list(set([cxn.form for cxn in self.q_table])))
+        forms = sorted(list(set([self.symbols.name("FORM", cxn.form) for cxn in q_table])))
         forms = {k: v for v, k in enumerate(forms)}
 
         meanings = defaultdict(list)
-        for cxn in self.q_table:
-            meanings[cxn.meaning].append(cxn)
+        for cxn in q_table:
+            meanings[self.symbols.name("OBJECT", cxn.meaning)].append(cxn)
 
         rows = []
         meaning_keys = list(meanings.keys())
@@ -114,7 +508,7 @@ class Lexicon:
             cxns = meanings[meaning]
             row = [""] * len(forms)
             for cxn in cxns:
-                idx = forms[cxn.form]
+                idx = forms[self.symbols.name("FORM", cxn.form)]
                 row[idx] = round(cxn.q_value, 3)
             row.insert(0, meaning)
             rows.append(row)
@@ -127,3 +521,89 @@ class Lexicon:
             tbl.add_row(row)
 
         return str(tbl)
+
+
+class IndexedLexicon(Lexicon):
+    """The bidirectional dynamic Q-table backed by hash indexes.
+
+    Next to the arrays of the pairs, the lexicon keeps a meaning -> slots and a form -> slots index
+    that are updated whenever a pair is invented, adopted or removed. Most forms (and, once the population
+    agrees, most meanings) have a single pair, hence a single slot is indexed as is instead of in a list.
+    Producing, comprehending, adopting and removing are therefore independent of the size of the lexicon.
+
+    The public interface is identical to the one of Lexicon, including the order in which pairs are returned,
+    so that the epsilon-greedy action selection breaks ties in exactly the same way.
+    """
+
+    def __init__(self, cfg, symbols=None, rng=None):
+        self._by_meaning = {}  # meaning code -> slot or slots in insertion order
+        self._by_form = {}  # form code -> slot or slots in insertion order
+        super().__init__(cfg, symbols, rng)
+
+    def _clear(self):
+        super()._clear()
+        self._by_meaning.clear()
+        self._by_form.clear()
+
+    def _add(self, slot):
+        self._add_to_index(self._by_meaning, int(self._meanings[slot]), slot)
+        self._add_to_index(self._by_form, int(self._forms[slot]), slot)
+
+    def _discard(self, slot):
+        self._remove_from_index(self._by_meaning, int(self._meanings[slot]), slot)
+        self._remove_from_index(self._by_form, int(self._forms[slot]), slot)
+        super()._discard(slot)
+
+    def _reindex(self):
+        self._by_meaning.clear()
+        self._by_form.clear()
+        for slot in range(self._end):
+            self._add(slot)
+
+    @staticmethod
+    def _add_to_index(index, key, slot):
+        bucket = index.get(key)
+        if bucket is None:
+            index[key] = slot
+        elif isinstance(bucket, int):
+            index[key] = [bucket, slot]
+        else:
+            bucket.append(slot)
+
+    @staticmethod
+    def _remove_from_index(index, key, slot):
+        bucket = index[key]
+        if isinstance(bucket, int):
+            del index[key]
+            return
+        bucket.remove(slot)
+        if len(bucket) == 1:
+            index[key] = bucket[0]
+
+    def _slots(self, by_form, codes):
+        index = self._by_form if by_form else self._by_meaning
+        slots = []
+        for code in codes:
+            bucket = index.get(code, ())
+            if isinstance(bucket, int):
+                slots.append(bucket)
+            else:
+                slots.extend(bucket)
+        return sorted(set(slots)) if len(codes) > 1 else slots
+
+    def _count(self, by_form, code, live):
+        slots = self._slots(by_form, [code])
+        if not live:
+            return len(slots)
+        return sum(self.is_live(self._q_values.item(slot)) for slot in slots)
+
+
+def select_lexicon(cfg, symbols=None, rng=None):
+    """Returns a new lexicon using the backend specified by cfg.LEXICON (list-based if not specified)."""
+    backend = cfg.get("LEXICON", "list")
+    if backend == "list":
+        return Lexicon(cfg, symbols, rng)
+    elif backend == "indexed":
+        return IndexedLexicon(cfg, symbols, rng)
+    else:
+        raise ValueError(f"Given lexicon {backend} is not valid!")
@@ -0,0 +1,284 @@
+import numpy as np
+
+
+def sample_contexts(rng, episodes, world_size, context_min_size, context_max_size):
+    """Samples the contexts (padded with -1), context sizes and topics of a block of interactions.
+
+    The objects with the k smallest random keys form a uniformly sampled ordered context,
+    the topic is sampled uniformly from the context.
+    """
+    k = min(context_max_size, world_size)
+    keys = rng.random((episodes, world_size))
+    if k < world_size:
+        contexts = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    else:
+        contexts = np.broadcast_to(np.arange(world_size), keys.shape)
+    order = np.argsort(np.take_along_axis(keys, contexts, axis=1), axis=1)
+    contexts = np.take_along_axis(contexts, order, axis=1)
+
+    context_sizes = rng.integers(context_min_size, context_max_size + 1, size=episodes)
+    contexts[np.arange(k) >= context_sizes[:, None]] = -1
+    topics = contexts[np.arange(episodes), rng.integers(context_sizes)]
+    return contexts, context_sizes, topics
+
+
+class Schedule:
+    """Pre-sampled sequence of interactions of a naming game.
+
+    Episode i is played by speakers[i] and hearers[i] (indices in the population)
+    in the context contexts[i, :context_sizes[i]] (indices of world objects, padded with -1) about topics[i].
+    """
+
+    def __init__(self, speakers, hearers, contexts, context_sizes, topics):
+        self.speakers = np.asarray(speakers, dtype=np.int64)
+        self.hearers = np.asarray(hearers, dtype=np.int64)
+        self.contexts = np.asarray(contexts, dtype=np.int64)
+        self.context_sizes = np.asarray(context_sizes, dtype=np.int64)
+        self.topics = np.asarray(topics, dtype=np.int64)
+
+    @classmethod
+    def sample(cls, rng, episodes, population_size, world_size, context_min_size, context_max_size):
+        """Samples a block of interactions at once.
+
+        The distribution is the one of BasicNamingGameEnv.reset: two different agents,
+        a context of distinct objects with a size sampled uniformly and a topic sampled uniformly from the context.
+
+        Args:
+            rng (np.random.Generator): random generator to sample from
+            episodes (int): number of interactions in the block
+            population_size (int): number of agents
+            world_size (int): number of objects in the world
+            context_min_size (int): minimal number of objects in a context
+            context_max_size (int): maximal number of objects in a context
+
+        Returns:
+            Schedule: the sampled interactions
+        """
+        speakers = rng.integers(population_size, size=episodes)
+        hearers = rng.integers(population_size - 1, size=episodes)
+        hearers += hearers >= speakers  # two different agents
+        contexts, context_sizes, topics = sample_contexts(
+            rng, episodes, world_size, context_min_size, context_max_size
+        )
+        return cls(speakers, hearers, contexts, context_sizes, topics)
+
+    @classmethod
+    def sample_rounds(cls, rng, rounds, population_size, world_size, context_min_size, context_max_size):
+        """Samples a block of rounds, in a round the population is paired into population_size // 2 disjoint games.
+
+        The games of round r are the interactions r * games_per_round ... (r + 1) * games_per_round - 1,
+        no agent plays in two games of the same round. With an odd population size, one agent sits out each round.
+        Contexts and topics are sampled as in Schedule.sample.
+
+        Args:
+            rng (np.random.Generator): random generator to sample from
+            rounds (int): number of rounds in the block
+            population_size (int): number of agents
+            world_size (int): number of objects in the world
+            context_min_size (int): minimal number of objects in a context
+            context_max_size (int): maximal number of objects in a context
+
+        Returns:
+            Schedule: the sampled interactions of all rounds
+        """
+        games = population_size // 2
+        pairs = np.argsort(rng.random((rounds, population_size)), axis=1)[:, : 2 * games]
+        speakers, hearers = pairs[:, 0::2].ravel(), pairs[:, 1::2].ravel()
+        contexts, context_sizes, topics = sample_contexts(
+            rng, rounds * games, world_size, context_min_size, context_max_size
+        )
+        return cls(speakers, hearers, contexts, context_sizes, topics)
+
+    @classmethod
+    def concatenate(cls, schedules):
+        """Returns the schedule that plays the given schedules one after the other."""
+        width = max(schedule.contexts.shape[1] for schedule in schedules)
+        contexts = [
+            np.pad(s.contexts, [(0, 0), (0, width - s.contexts.shape[1])], constant_values=-1) for s in schedules
+        ]
+        return cls(
+            np.concatenate([s.speakers for s in schedules]),
+            np.concatenate([s.hearers for s in schedules]),
+            np.concatenate(contexts),
+            np.concatenate([s.context_sizes for s in schedules]),
+            np.concatenate([s.topics for s in schedules]),
+        )
+
+    def episode(self, i):
+        """Returns the speaker, hearer, context (list) and topic of the ith interaction."""
+        size = self.context_sizes[i]
+        return (
+            int(self.speakers[i]),
+            int(self.hearers[i]),
+            self.contexts[i, :size].tolist(),
+            int(self.topics[i]),
+        )
+
+    def head(self, n):
+        """Returns the schedule of the first n interactions."""
+        return Schedule(
+            self.speakers[:n], self.hearers[:n], self.contexts[:n], self.context_sizes[:n], self.topics[:n]
+        )
+
+    def save(self, path):
+        """Saves the schedule in the compressed .npz format."""
+        np.savez_compressed(
+            path,
+            speakers=self.speakers,
+            hearers=self.hearers,
+            contexts=self.contexts,
+            context_sizes=self.context_sizes,
+            topics=self.topics,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Loads a schedule saved with Schedule.save."""
+        with np.load(path) as data:
+            return cls(data["speakers"], data["hearers"], data["contexts"], data["context_sizes"], data["topics"])
+
+    def __len__(self):
+        return len(self.speakers)
+
+
+class Scheduler:
+    """Hands out the interactions of an environment one by one.
+
+    The interactions are either sampled lazily in blocks of block_size episodes from the given generator,
+    or replayed from a given schedule. With keep, the played interactions can be retrieved with played(),
+    e.g. to save them for a replay on another engine or with another update rule (cfg.SCHEDULE_SAVE).
+    Otherwise only the current block is held, so that the memory does not grow with the number of episodes.
+    """
+
+    def __init__(self, cfg, rng=None, block_size=1000, schedule=None, keep=True):
+        self.cfg = cfg
+        self.rng = rng
+        self.block_size = block_size
+        self.replay = schedule is not None
+        self.keep = keep or self.replay  # a replayed schedule is held anyway
+        self.blocks = [] if schedule is None else [schedule]
+        self.block = schedule
+        self.position = 0
+        self.n_played = 0
+        if self.replay:
+            self.validate(schedule)
+
+    def validate(self, schedule):
+        """Raises a ValueError if the schedule does not fit the population and world of the config."""
+        if len(schedule) and (
+            max(schedule.speakers.max(), schedule.hearers.max()) >= self.cfg.POPULATION_SIZE
+            or schedule.contexts.max() >= self.cfg.WORLD_SIZE
+        ):
+            raise ValueError(
+                f"Given schedule does not fit a population of {self.cfg.POPULATION_SIZE} agents "
+                f"and a world of {self.cfg.WORLD_SIZE} objects!"
+            )
+
+    def next(self):
+        """Returns the speaker, hearer, context and topic of the next interaction."""
+        if self.block is None or self.position == len(self.block):
+            if self.replay:
+                raise ValueError(f"Given schedule of {len(self.block)} episodes is exhausted!")
+            self.block = Schedule.sample(
+                self.rng,
+                self.block_size,
+                self.cfg.POPULATION_SIZE,
+                self.cfg.WORLD_SIZE,
+                self.cfg.CONTEXT_MIN_SIZE,
+                self.cfg.CONTEXT_MAX_SIZE,
+            )
+            if self.keep:
+                self.blocks.append(self.block)
+            self.position = 0
+        episode = self.block.episode(self.position)
+        self.position += 1
+        self.n_played += 1
+        return episode
+
+    def played(self):
+        """Returns the schedule of the interactions handed out so far, which are only kept with keep."""
+        if not self.keep:
+            raise ValueError("Given scheduler does not keep the played interactions, see SCHEDULE_SAVE!")
+        return Schedule.concatenate(self.blocks).head(self.n_played)
+
+
+class BatchedScheduler:
+    """Hands out the interactions of a batch of independent trials, one episode of every trial at a time.
+
+    An episode is a single game, or with cfg.INTERACTION_MODE "round" a round of population_size // 2 disjoint games
+    (see Schedule.sample_rounds). Blocks hold block_size games, rounded to whole rounds (at least one round).
+    Trial t samples its blocks from rngs[t], in game mode exactly like a Scheduler with the same generator and block
+    size, or replays schedules[t]. As for a Scheduler, the played games are only kept with keep.
+    """
+
+    def __init__(self, cfg, rngs=None, block_size=1000, schedules=None, keep=True):
+        self.cfg = cfg
+        self.rngs = rngs
+        self.block_size = block_size
+        self.rounds = select_interaction_mode(cfg) == "round"
+        self.games_per_round = self.cfg.POPULATION_SIZE // 2 if self.rounds else 1
+        self.replay = schedules is not None
+        self.keep = keep or self.replay
+        self.blocks = []  # per block, the schedule of every trial
+        self.stacked = None
+        self.position = 0
+        self.n_played = 0
+        if self.replay:
+            for schedule in schedules:
+                Scheduler(cfg, schedule=schedule)  # validates the schedule
+            self.add_block(schedules)
+
+    def add_block(self, schedules):
+        """Stacks the schedules of the trials into (trial, episode) arrays."""
+        n = min(len(schedule) for schedule in schedules)
+        block = Schedule.concatenate([schedule.head(n) for schedule in schedules])
+        self.stacked = [arr.reshape(len(schedules), n, *arr.shape[1:]) for arr in self.arrays(block)]
+        if self.keep:
+            self.blocks.append(schedules)
+        self.block_length = n
+        self.position = 0
+
+    def arrays(self, schedule):
+        return schedule.speakers, schedule.hearers, schedule.contexts, schedule.context_sizes, schedule.topics
+
+    def next(self):
+        """Returns the speakers, hearers, contexts, context sizes and topics of the next episode of every trial.
+
+        The returned arrays have a leading (trial, game) shape, with one game per episode in game mode.
+        """
+        games = self.games_per_round
+        if self.stacked is None or self.position + games > self.block_length:
+            if self.replay:
+                raise ValueError(f"Given schedules of {self.block_length} games are exhausted!")
+            sample = Schedule.sample_rounds if self.rounds else Schedule.sample
+            self.add_block(
+                [
+                    sample(
+                        rng,
+                        max(self.block_size // games, 1),
+                        self.cfg.POPULATION_SIZE,
+                        self.cfg.WORLD_SIZE,
+                        self.cfg.CONTEXT_MIN_SIZE,
+                        self.cfg.CONTEXT_MAX_SIZE,
+                    )
+                    for rng in self.rngs
+                ]
+            )
+        episode = tuple(arr[:, self.position : self.position + games] for arr in self.stacked)
+        self.position += games
+        self.n_played += games
+        return episode
+
+    def played(self, trial):
+        """Returns the schedule of the games handed out so far in the given trial, which are only kept with keep."""
+        if not self.keep:
+            raise ValueError("Given scheduler does not keep the played games, see SCHEDULE_SAVE!")
+        return Schedule.concatenate([schedules[trial] for schedules in self.blocks]).head(self.n_played)
+
+
+def select_interaction_mode(cfg):
+    """Returns cfg.INTERACTION_MODE, "game" plays one game per episode and "round" a round of disjoint games."""
+    mode = cfg.get("INTERACTION_MODE", "game")
+    if mode not in ("game", "round"):
+        raise ValueError(f"Given interaction mode {mode} is not valid!")
+    return mode
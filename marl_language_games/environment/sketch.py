@@ -0,0 +1,88 @@
+import functools
+
+import numpy as np
+
+SIGNATURE_SIZE = 128  # number of hash functions of a MinHash signature
+SEED = 20220  # seed of the hash functions, shared by all lexicons so that their signatures are comparable
+EMPTY = np.iinfo(np.uint64).max  # the signature of an empty set holds this value in every slot
+MASK = (1 << 64) - 1
+CHUNK_SIZE = 1 << 16  # number of elements hashed at once by signatures
+
+
+@functools.lru_cache(maxsize=None)
+def salts(size):
+    """Returns the salt of each of the size hash functions of a signature."""
+    return np.random.default_rng(SEED).integers(0, EMPTY, size=size, dtype=np.uint64, endpoint=False)
+
+
+def mix(x):
+    """Scrambles the bits of uint64 values (the finalizer of splitmix64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hashes(keys, size=SIGNATURE_SIZE):
+    """Returns the (key, size) values of the hash functions of the given integer keys."""
+    if isinstance(keys, list):  # Python integers, e.g. hashes, which may be negative
+        keys = np.fromiter((key & MASK for key in keys), dtype=np.uint64, count=len(keys))
+    keys = np.asarray(keys).astype(np.uint64)
+    values = mix(mix(keys)[:, None] ^ salts(size)[None, :])
+    return np.minimum(values, EMPTY - np.uint64(1))  # EMPTY is reserved for empty sets
+
+
+def minhash(keys, size=SIGNATURE_SIZE):
+    """Returns the MinHash signature of a set given the integer keys of its elements, i.e. the minimum
+    of each hash function over the elements.
+    """
+    if len(keys) == 0:
+        return np.full(size, EMPTY, dtype=np.uint64)
+    return hashes(keys, size).min(axis=0)
+
+
+def signatures(owners, keys, n_sets, size=SIGNATURE_SIZE):
+    """Returns the (set, size) signatures of several sets given the set (owner) and the key of each element.
+
+    The elements are hashed in chunks of CHUNK_SIZE, which bounds the memory of the (element, size) hash values.
+    """
+    result = np.full((n_sets, size), EMPTY, dtype=np.uint64)
+    order = np.argsort(owners, kind="stable")
+    owners, keys = np.asarray(owners)[order], np.asarray(keys)[order]
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = owners[start : start + CHUNK_SIZE]
+        firsts = np.flatnonzero(np.concatenate([[True], chunk[1:] != chunk[:-1]]))  # first element of each set
+        minima = np.minimum.reduceat(hashes(keys[start : start + CHUNK_SIZE], size), firsts, axis=0)
+        result[chunk[firsts]] = np.minimum(result[chunk[firsts]], minima)
+    return result
+
+
+def estimate_similarity(signatures):
+    """Returns the MinHash estimate of the Jaccard similarity averaged over all pairs of sets.
+
+    For every hash function, the fraction of pairs of sets with the same minimum is an unbiased estimate
+    of the average Jaccard similarity (two empty sets have similarity 0). The estimate is the mean over the
+    (independent) hash functions, so by Hoeffding's inequality it lies within error_bound of the exact average.
+    Counting the pairs with the same minimum takes a sort per hash function, i.e. O(n log n) for n sets
+    instead of the O(n^2) comparisons of all pairs.
+
+    Args:
+        signatures (np.ndarray): (set, size) signatures of the sets, see minhash
+
+    Returns:
+        float: a number between [0, 1], the estimated average similarity
+    """
+    n_sets, size = signatures.shape
+    if n_sets < 2:
+        return 0.0
+    ordered = np.sort(signatures, axis=0)
+    starts = np.ones(ordered.shape, dtype=bool)  # first set of every run of equal minima
+    starts[1:] = ordered[1:] != ordered[:-1]
+    index = np.arange(n_sets)[:, None]
+    first = np.maximum.accumulate(np.where(starts, index, 0), axis=0)
+    matches = ((index - first) * (ordered != EMPTY)).sum()  # each set matches the earlier sets of its run
+    return float(matches / (size * n_sets * (n_sets - 1) / 2))
+
+
+def error_bound(size=SIGNATURE_SIZE, confidence=0.95):
+    """Returns the error of estimate_similarity that is exceeded with a probability of at most 1 - confidence."""
+    return float(np.sqrt(np.log(2 / (1 - confidence)) / (2 * size)))
@@ -0,0 +1,306 @@
+import numpy as np
+
+from marl_language_games.environment.agent import Agent
+from marl_language_games.environment.environment import BasicNamingGameEnv, World
+from marl_language_games.environment.lexicon import Lexicon, SAPair, keep_value, pair_key
+from marl_language_games.environment.sketch import SIGNATURE_SIZE, minhash
+from marl_language_games.utils.invention import SymbolTable, invent
+from marl_language_games.utils.seeding import rand_index, spawn_env_rngs
+
+
+def update_values(cfg, q_values, reward):
+    """Returns the updated q-values and the mask of pairs to delete using the update rule of the config.
+
+    Vectorized version of Agent.update, the arguments are arrays of the same shape.
+    """
+    if cfg.UPDATE_RULE == "interpolated":
+        new_q = q_values + cfg.LEARNING_RATE * (reward - q_values)
+        delete = new_q < cfg.REWARD_FAILURE + cfg.EPSILON_FAILURE
+    elif cfg.UPDATE_RULE == "basic":
+        new_q = np.clip(q_values + reward, 0, 1)
+        delete = new_q <= 0
+    else:
+        raise ValueError(f"Given update rule {cfg.UPDATE_RULE} is not valid!")
+    if not cfg.DELETE_SA_PAIR:
+        delete[...] = False
+    return new_q, delete
+
+
+class TensorLexicon:
+    """Read-only view on the lexicon of one agent of a TensorNamingGameEnv.
+
+    The view materializes the q-table of the agent as a list of state/action pairs (in insertion order),
+    so that the monitors and the logging can treat it as a regular Lexicon.
+    Changing the q-values of the returned pairs does not affect the environment.
+    """
+
+    def __init__(self, env, idx):
+        self.env = env
+        self.idx = idx
+        self.symbols = env.symbols
+
+    @property
+    def q_table(self):
+        env = self.env
+        meanings, slots = np.nonzero(env.form_ids[self.idx] >= 0)
+        order = np.argsort(env.stamps[self.idx, meanings, slots], kind="stable")
+        meanings, slots = meanings[order], slots[order]
+        forms = env.form_ids[self.idx, meanings, slots].tolist()
+        q_values = env.q[self.idx, meanings, slots].tolist()
+        return [SAPair(*pair) for pair in zip(meanings.tolist(), forms, q_values)]
+
+    def keys(self):
+        meanings, slots = np.nonzero(self.env.form_ids[self.idx] >= 0)
+        return pair_key(meanings, self.env.form_ids[self.idx, meanings, slots]).tolist()
+
+    def size(self, live=False):
+        return self.env.statistics(self.idx, live)[0]
+
+    def forms_per_meaning(self, live=False):
+        return self.env.statistics(self.idx, live)[1]
+
+    def meanings_per_form(self, live=False):
+        return self.env.statistics(self.idx, live)[2]
+
+    def signature(self, live=False):
+        pairs = [hash(sa_pair) for sa_pair in self.q_table if not live or keep_value(self.env.cfg, sa_pair.q_value)]
+        return minhash(pairs, self.env.cfg.get("MINHASH_SIZE", SIGNATURE_SIZE))
+
+    def __len__(self):
+        return int(self.env.n_forms[self.idx].sum())
+
+    __repr__ = Lexicon.__repr__
+
+
+class TensorAgent:
+    """Lightweight handle to an agent of a TensorNamingGameEnv.
+
+    The agent only holds the per-episode state (role context and outcome),
+    its lexicon lives in the population-wide arrays of the environment.
+    """
+
+    def __init__(self, env, idx, rng):
+        self.idx = idx
+        self.rng = rng
+        self.symbols = env.symbols
+        self.id = self.symbols.make_id("AGENT")
+        self.lexicon = TensorLexicon(env, idx)
+
+    def reset(self, context):
+        self.communicative_success = True
+        self.applied_sa_pair = None  # (meaning, form) of the applied pair
+        self.context = context
+
+    __str__ = Agent.__str__
+
+
+class TensorNamingGameEnv(BasicNamingGameEnv):
+    """Basic naming game environment with a population-wide Q-tensor.
+
+    The interaction script is the one of BasicNamingGameEnv, but the lexicons of all agents are stored
+    in arrays indexed by (agent, meaning, form-slot):
+
+        q[a, m, s]         the q-value of the s-th form of agent a for meaning m
+        form_ids[a, m, s]  the (interned) form of that pair, -1 if the slot is empty
+        stamps[a, m, s]    a global insertion counter, used to order pairs across meanings
+        n_forms[a, m]      the number of used slots, the used slots of a row are always stored first
+
+    Meanings and forms are the interned ids of the symbol table of the environment,
+    so the world objects directly index the meaning axis.
+    The slots of a row are kept in insertion order (deletions shift the remaining slots to the left),
+    so that the action selection breaks ties in exactly the same way as the list-based lexicon
+    and draws the same random numbers. Given the same seed, both engines produce identical runs.
+    The number of slots per row grows on demand.
+    """
+
+    def __init__(self, cfg, seed=None, schedule=None, initial_slots=4):
+        self.cfg = cfg
+        self.symbols = SymbolTable()
+        world_rng, self.rng, agent_rngs = spawn_env_rngs(seed, self.cfg.POPULATION_SIZE)
+        self.world = World(self.cfg.WORLD_SIZE, self.symbols, world_rng)
+
+        shape = (self.cfg.POPULATION_SIZE, self.cfg.WORLD_SIZE, initial_slots)
+        self.q = np.zeros(shape)
+        self.form_ids = np.full(shape, -1, dtype=np.int64)
+        self.stamps = np.zeros(shape, dtype=np.int64)
+        self.n_forms = np.zeros(shape[:2], dtype=np.int64)
+        self.clock = 0
+        self.cached_statistics = {}  # (agent, live) -> (size, forms per meaning, meanings per form)
+
+        self.population = [TensorAgent(self, idx, rng) for idx, rng in enumerate(agent_rngs)]
+        self.scheduler = self.select_scheduler(schedule)
+
+    def grow(self):
+        """Doubles the number of form slots of every (agent, meaning) row."""
+        slots = self.q.shape[2]
+        pad = [(0, 0), (0, 0), (0, slots)]
+        self.q = np.pad(self.q, pad)
+        self.form_ids = np.pad(self.form_ids, pad, constant_values=-1)
+        self.stamps = np.pad(self.stamps, pad)
+
+    def statistics(self, agent, live):
+        """Returns the lexicon size, forms per meaning and meanings per form of the (live) pairs of an agent.
+
+        The statistics are cached until the lexicon of the agent changes.
+        """
+        key = (agent, live)
+        if key not in self.cached_statistics:
+            mask = self.form_ids[agent] >= 0
+            if live:
+                mask &= keep_value(self.cfg, self.q[agent])
+            size = int(mask.sum())
+            n_meanings = int(mask.any(axis=1).sum())
+            n_forms = len(np.unique(self.form_ids[agent][mask]))
+            self.cached_statistics[key] = (
+                size,
+                size / n_meanings if n_meanings else 0,
+                size / n_forms if n_forms else 0,
+            )
+        return self.cached_statistics[key]
+
+    def invalidate(self, agent):
+        """Marks the cached statistics of the agent as outdated."""
+        self.cached_statistics.pop((agent, False), None)
+        self.cached_statistics.pop((agent, True), None)
+
+    def add_pair(self, agent, meaning, form_id):
+        """Appends the pair (meaning, form_id) to the row of the given agent."""
+        self.invalidate(agent)
+        slot = self.n_forms[agent, meaning]
+        if slot == self.q.shape[2]:
+            self.grow()
+        self.q[agent, meaning, slot] = self.cfg.INITIAL_Q_VALUE
+        self.form_ids[agent, meaning, slot] = form_id
+        self.stamps[agent, meaning, slot] = self.clock
+        self.n_forms[agent, meaning] += 1
+        self.clock += 1
+
+    def find_slot(self, agent, meaning, form_id):
+        """Returns the slot of the pair (meaning, form_id) of the given agent or None if it is unknown."""
+        slots = np.flatnonzero(self.form_ids[agent, meaning, : self.n_forms[agent, meaning]] == form_id)
+        return int(slots[0]) if slots.size else None
+
+    def epsilon_greedy(self, agent, q_values, eps):
+        """Returns the index of the action selected by the agent given the q-values of the actions (in insertion order).
+
+        Draws the same random numbers as Agent.epsilon_greedy.
+        """
+        rng = self.population[agent].rng
+        p = rng.random()
+        if p < (1 - eps):
+            return int(np.argmax(q_values))
+        else:
+            return rand_index(rng, len(q_values))
+
+    def produce(self, agent, meaning):
+        """Returns the form id of the utterance of the agent for the given meaning and whether it was invented."""
+        n = self.n_forms[agent, meaning]
+        if n:
+            slot = self.epsilon_greedy(agent, self.q[agent, meaning, :n], eps=self.cfg.EPS_GREEDY)
+            form_id = int(self.form_ids[agent, meaning, slot])
+            invented = False
+        else:
+            form_id = self.symbols.intern("FORM", invent(rng=self.population[agent].rng))
+            self.add_pair(agent, meaning, form_id)
+            invented = True
+        self.population[agent].applied_sa_pair = (meaning, form_id)
+        return form_id, invented
+
+    def comprehend(self, agent, form_id):
+        """Returns the meaning the agent interprets for the given form id, None if the form is unknown."""
+        meanings, slots = np.nonzero(self.form_ids[agent] == form_id)
+        if not meanings.size:
+            return None
+        order = np.argsort(self.stamps[agent, meanings, slots], kind="stable")
+        meanings, slots = meanings[order], slots[order]
+        idx = self.epsilon_greedy(agent, self.q[agent, meanings, slots], eps=self.cfg.EPS_GREEDY)
+        meaning = int(meanings[idx])
+        self.population[agent].applied_sa_pair = (meaning, form_id)
+        return meaning
+
+    def re_entrance_hearer(self, agent, meaning, context):
+        """Returns the form id the agent would produce for the meaning within the context, None if there is none."""
+        n = self.n_forms[agent, meaning]
+        if n and meaning in context:
+            slot = self.epsilon_greedy(agent, self.q[agent, meaning, :n], eps=self.cfg.EPS_GREEDY)
+            return int(self.form_ids[agent, meaning, slot])
+        return None
+
+    def adopt(self, agent, meaning, form_id):
+        """Adds the pair (meaning, form_id) to the lexicon of the agent if it is not known yet."""
+        if self.find_slot(agent, meaning, form_id) is None:
+            self.add_pair(agent, meaning, form_id)
+
+    def updated_values(self, q_values, reward):
+        """Returns the updated q-values and the mask of pairs to delete using the specified update rule."""
+        return update_values(self.cfg, q_values, reward)
+
+    def update_row(self, agent, meaning, rewards):
+        """Updates the first len(rewards) slots of a row, rewards of NaN leave the slot untouched."""
+        self.invalidate(agent)
+        n = len(rewards)
+        row = self.q[agent, meaning, :n]
+        mask = ~np.isnan(rewards)
+        new_q, delete = self.updated_values(row[mask], rewards[mask])
+        row[mask] = new_q
+        if delete.any():
+            keep = np.ones(n, dtype=bool)
+            keep[np.flatnonzero(mask)[delete]] = False
+            self.compact_row(agent, meaning, keep)
+
+    def compact_row(self, agent, meaning, keep):
+        """Deletes the slots of the row that are not kept while preserving the insertion order."""
+        n, kept = len(keep), int(keep.sum())
+        for arr, empty in ((self.q, 0), (self.form_ids, -1), (self.stamps, 0)):
+            row = arr[agent, meaning]
+            row[:kept] = row[:n][keep]
+            row[kept:n] = empty
+        self.n_forms[agent, meaning] = kept
+
+    def align(self, agent):
+        """Vectorized version of Agent.align for the given agent."""
+        handle = self.population[agent]
+        if handle.applied_sa_pair is None:
+            return
+        meaning, form_id = handle.applied_sa_pair
+        slot = self.find_slot(agent, meaning, form_id)
+        n = self.n_forms[agent, meaning]
+        rewards = np.full(n, np.nan)
+        if handle.communicative_success:
+            rewards[slot] = self.cfg.REWARD_SUCCESS
+            if self.cfg.LATERAL_INHIBITION:
+                rewards[np.arange(n) != slot] = self.cfg.REWARD_FAILURE
+        else:
+            rewards[slot] = self.cfg.REWARD_FAILURE
+        self.update_row(agent, meaning, rewards)
+
+    def step(self, idx):
+        """Interaction script of the basic naming game (see BasicNamingGameEnv.step)
+
+        Args:
+            idx (int): denotes the ith interaction in the environment
+        """
+        speaker, hearer, topic = self.speaker.idx, self.hearer.idx, self.topic
+
+        # speaker chooses action ifo topic
+        utterance, self.lexicon_change = self.produce(speaker, topic)
+        # hearer chooses action ifo utterance
+        interpretation = self.comprehend(hearer, utterance)
+
+        hearer_utterance = self.re_entrance_hearer(hearer, topic, self.context)  # monitoring
+        self.lexicon_coherence = hearer_utterance == utterance  # monitoring
+
+        # evaluate communicative interaction
+        if interpretation is None or interpretation != topic:
+            self.lexicon_change = True  # monitoring
+            self.adopt(hearer, topic, utterance)
+            self.speaker.communicative_success = False
+            self.hearer.communicative_success = False
+
+        # learn based on outcome
+        self.align(speaker)
+        self.align(hearer)
+
+        # debug interactions
+        if self.cfg.PRINT_EVERY and idx % self.cfg.PRINT_EVERY == 0:
+            self.print_example_interaction(idx, utterance, interpretation)
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class ConvergenceDetector:
+    """Detects per trial when the dynamics of the naming game have converged.
+
+    A trial has converged when, over the last window episodes, the rate of communicative success is at least
+    1 - tolerance, the rate of lexicon change is at most tolerance and the (average) lexicon size varies
+    by at most tolerance times its mean over the window. The size is a count (in steps of 1 / population size),
+    hence its bound is relative, so that a tolerance means the same for every population size.
+    The detector keeps the events of the window in ring buffers,
+    the success and change rates are maintained as running counts of games (games per episode).
+    """
+
+    def __init__(self, window, tolerance, trials=1, games=1):
+        self.window = window
+        self.tolerance = tolerance
+        self.games = games
+        self.success = np.zeros((trials, window), dtype=np.int64)
+        self.change = np.zeros((trials, window), dtype=np.int64)
+        self.sizes = np.zeros((trials, window))
+        self.n_success = np.zeros(trials, dtype=np.int64)
+        self.n_change = np.zeros(trials, dtype=np.int64)
+        self.n_episodes = 0
+
+    def update(self, success, change, size):
+        """Adds the events of an episode of every trial and returns which trials have converged.
+
+        Args:
+            success (np.ndarray): (trial,) communicative success (number of successful games) of the episode
+            change (np.ndarray): (trial,) lexicon change (number of games that changed a lexicon) of the episode
+            size (np.ndarray): (trial,) average lexicon size after the episode
+
+        Returns:
+            np.ndarray: (trial,) mask of the trials that have converged
+        """
+        slot = self.n_episodes % self.window
+        self.n_success += np.asarray(success, dtype=np.int64) - self.success[:, slot]
+        self.n_change += np.asarray(change, dtype=np.int64) - self.change[:, slot]
+        self.success[:, slot], self.change[:, slot], self.sizes[:, slot] = success, change, size
+        self.n_episodes += 1
+        if self.n_episodes < self.window:
+            return np.zeros(len(self.sizes), dtype=bool)
+        games = self.window * self.games
+        converged = (self.n_success >= (1 - self.tolerance) * games) & (self.n_change <= self.tolerance * games)
+        if converged.any():  # the spread of the sizes is only computed for candidates
+            sizes = self.sizes[converged]
+            converged[converged] = np.ptp(sizes, axis=1) <= self.tolerance * sizes.mean(axis=1)
+        return converged
+
+
+def select_convergence_detector(cfg, trials=1, games=1):
+    """Returns the ConvergenceDetector of cfg.CONVERGENCE_WINDOW and cfg.CONVERGENCE_TOLERANCE, None if disabled."""
+    window = cfg.get("CONVERGENCE_WINDOW", 0)
+    if not window:
+        return None
+    if window < 0:
+        raise ValueError(f"Given convergence window {window} is not valid!")
+    return ConvergenceDetector(window, cfg.get("CONVERGENCE_TOLERANCE", 0.01), trials, games)
+
+
+def select_convergence_padding(cfg):
+    """Returns cfg.CONVERGENCE_PADDING, "last" pads converged trials with their last event and "none" ends them."""
+    padding = cfg.get("CONVERGENCE_PADDING", "last")
+    if padding not in ("last", "none"):
+        raise ValueError(f"Given convergence padding {padding} is not valid!")
+    return padding
@@ -1,47 +1,316 @@
 import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
+import numpy as np
 from tqdm import tqdm
 
+from marl_language_games.environment.batched_environment import MONITORS, BatchedNamingGameEnv
 from marl_language_games.environment.environment import BasicNamingGameEnv
-from marl_language_games.experiment.monitors import Monitors
+from marl_language_games.environment.schedule import Schedule, select_interaction_mode
+from marl_language_games.environment.tensor_environment import TensorNamingGameEnv
+from marl_language_games.experiment.convergence import select_convergence_detector
+from marl_language_games.experiment.monitors import Monitors, select_competition_targets
+from marl_language_games.utils.read import read_pickle
+from marl_language_games.utils.seeding import trial_seed
+from marl_language_games.utils.write import write_pickle
+
+
+def run_trial_in_worker(cfg, seed, logdir, resume, trial):
+    """Runs a single trial of an experiment in a worker process.
+
+    With cfg.FLUSH_EVERY, the worker flushes the events of its trial to the logdir itself and returns the rest.
+
+    Returns:
+        tuple: the events of the monitors of the trial and the number of episodes until it converged (or None)
+    """
+    experiment = Experiment(cfg, seed=seed, logdir=logdir, resume=resume)
+    experiment.run_trial(trial, progress=False)
+    return experiment.monitors.get_trial(experiment.monitors.row(trial)), experiment.converged_at.get(trial)
 
 
 class Experiment:
-    def __init__(self, cfg):
+    def __init__(self, cfg, seed=None, logdir=None, resume=False):
         self.cfg = cfg
+        self.logdir = logdir
+        self.resume = resume  # continue from the checkpoints in the logdir
         self.monitors = Monitors(self)
+        self.converged_at = {}  # trial -> number of episodes until the trial converged (cfg.CONVERGENCE_WINDOW)
+        # root seed of the experiment, each trial draws from its own seed derived from it
+        if seed is None:
+            seed = self.cfg.get("SEED")
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
 
-    def initialize(self):
+    def initialize(self, trial=0):
         self.global_reward = 0
         self.timesteps = 0
-        self.env = self.select_env(self.cfg)
+        self.detector = select_convergence_detector(self.cfg)
+        self.env = self.select_env(self.cfg, trial_seed(self.seed, trial), self.load_schedule(trial))
+
+    def schedule_path(self, directory, trial):
+        return os.path.join(directory, f"schedule-trial-{trial}.npz")
+
+    def load_schedule(self, trial):
+        """Returns the schedule of the trial saved in the directory cfg.SCHEDULE_REPLAY, None if no replay is given."""
+        directory = self.cfg.get("SCHEDULE_REPLAY")
+        if not directory:
+            return None
+        return Schedule.load(self.schedule_path(directory, trial))
+
+    def save_schedule(self, trial):
+        """Saves the interactions played in the trial to the logdir to replay them later (cfg.SCHEDULE_SAVE)."""
+        if not self.cfg.get("SCHEDULE_SAVE") or self.logdir is None:
+            return
+        if self.env.scheduler is None:
+            raise ValueError("Given SCHEDULE_BLOCK_SIZE of 0 does not record a schedule that can be saved!")
+        self.env.scheduler.played().save(self.schedule_path(self.logdir, trial))
+
+    @classmethod
+    def from_checkpoint(cls, logdir):
+        """Returns the experiment checkpointed in the logdir (see cfg.CHECKPOINT_EVERY), ready to resume its run."""
+        state = read_pickle(os.path.join(logdir, "checkpoints", "experiment.pkl"))
+        return cls(state["cfg"], seed=state["seed"], logdir=logdir, resume=True)
+
+    def checkpointing(self):
+        return bool(self.cfg.get("CHECKPOINT_EVERY", 0)) and self.logdir is not None
+
+    def checkpoint_path(self, name):
+        return os.path.join(self.logdir, "checkpoints", f"{name}.pkl")
+
+    def checkpoint(self, name, trials, episode):
+        """Checkpoints the run every cfg.CHECKPOINT_EVERY episodes, see save_checkpoint."""
+        every = self.cfg.get("CHECKPOINT_EVERY", 0)
+        if self.checkpointing() and (episode + 1) % every == 0 and episode + 1 < self.cfg.EPISODES:
+            self.save_checkpoint(name, trials, episode + 1)
+
+    def save_checkpoint(self, name, trials, episode):
+        """Saves the state of the run of the given trials after the given number of episodes.
+
+        The state holds the environment (lexicons, world, symbol table, random generators and schedule),
+        the cumulative reward and timesteps and the events of the monitors so far. With cfg.FLUSH_EVERY,
+        the monitors are flushed and only the sizes of the flushed files are saved.
+        A trial that has played all episodes or converged is saved without its environment.
+
+        Args:
+            name (str): name of the checkpoint, one per trial or one for the batched trials
+            trials (list): the trials of the run
+            episode (int): number of episodes played so far
+        """
+        if not self.checkpointing():
+            return
+        state = {
+            "episode": episode,
+            "global_reward": self.global_reward,
+            "timesteps": self.timesteps,
+            "env": self.env if episode < self.cfg.EPISODES else None,
+            "detector": self.detector,
+            "converged_at": {trial: self.converged_at[trial] for trial in trials if trial in self.converged_at},
+        }
+        if self.cfg.get("FLUSH_EVERY", 0):
+            self.monitors.flush(self.logdir)
+            state["flushed"] = self.monitors.flushed_sizes(self.logdir, trials)
+        else:
+            state["events"] = {trial: self.monitors.get_trial(self.monitors.row(trial)) for trial in trials}
+        os.makedirs(os.path.dirname(self.checkpoint_path(name)), exist_ok=True)
+        write_pickle(state, self.checkpoint_path(name))
+
+    def load_checkpoint(self, name, trials):
+        """Restores the checkpointed state of the run of the given trials when resuming, see save_checkpoint.
+
+        Returns:
+            dict: the checkpointed state, None if the trials are run from the start
+        """
+        if not self.resume:
+            return None
+        flushing = self.cfg.get("FLUSH_EVERY", 0)
+        if not os.path.exists(self.checkpoint_path(name)):
+            if flushing:
+                self.monitors.truncate_flushed(self.logdir, trials, {})  # events of the interrupted run
+            return None
+        state = read_pickle(self.checkpoint_path(name))
+        if flushing:
+            self.monitors.truncate_flushed(self.logdir, trials, state["flushed"])
+        else:
+            for trial, events in state["events"].items():
+                self.monitors.add_trial(self.monitors.row(trial), events)
+        self.global_reward, self.timesteps = state["global_reward"], state["timesteps"]
+        self.detector = state["detector"]
+        self.converged_at.update(state["converged_at"])
+        return state
+
+    def remove_checkpoints(self):
+        """Removes the checkpoints of a run once its monitors are written, unless cfg.KEEP_CHECKPOINTS is set."""
+        if self.logdir is not None and not self.cfg.get("KEEP_CHECKPOINTS", False):
+            shutil.rmtree(os.path.join(self.logdir, "checkpoints"), ignore_errors=True)
 
     def run_experiment(self):
-        for trial in range(self.cfg.TRIALS):
-            logging.info(f" == Experiment trial {trial+1}/{self.cfg.TRIALS} ==")
-            self.initialize()
-            for i in tqdm(range(0, self.cfg.EPISODES)):
-                self.env.reset()
-                self.env.step(i)
-                self.record_events(trial)  # monitors
-            self.log_state_of_lexicons(self.env.population)
-
-    def record_events(self, trial):
-        """Records the event of a trial to the monitor."""
-        # communicative success
-        self.monitors.record_communicative_success(trial)
-        # average lexicon size
-        self.monitors.record_lexicon_size(trial)
-        # lexicon coherence between interacting agents
-        self.monitors.record_lexicon_coherence(trial)
-        # lexicon similarity (loetszch version of lexicon coherence)
-        self.monitors.record_lexicon_similarity(trial)
-        # lexicon change
-        self.monitors.record_lexicon_change(trial)
-        # avg forms per meaning
-        self.monitors.record_forms_per_meaning(trial)
-        # avg meanings per form
-        self.monitors.record_meanings_per_form(trial)
+        """Runs cfg.TRIALS independent trials, sequentially, in cfg.WORKERS processes (0 uses all cores)
+        or all at once in a batched environment (cfg.ENGINE: batched).
+
+        Each trial draws from its own random streams, derived from the root seed and the trial index only,
+        so a parallel run records exactly the same events as a sequential one.
+        With cfg.MONITOR_REDUCTION, the events of each trial are reduced across trials once it finished.
+        """
+        workers = self.cfg.get("WORKERS", 1) or os.cpu_count()
+        logging.info(f" == Experiment with seed {self.seed} ==")
+        if self.checkpointing() and not self.resume:
+            os.makedirs(os.path.join(self.logdir, "checkpoints"), exist_ok=True)
+            write_pickle({"cfg": self.cfg, "seed": self.seed}, self.checkpoint_path("experiment"))
+        if self.cfg.get("ENGINE", "object") == "batched":
+            self.run_batched()
+            for trial in range(self.cfg.TRIALS):
+                self.monitors.reduce_trial(trial)
+        elif workers == 1:
+            for trial in range(self.cfg.TRIALS):
+                self.run_trial(trial)
+                self.monitors.reduce_trial(trial)
+        else:
+            trials = range(self.cfg.TRIALS)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    run_trial_in_worker,
+                    repeat(self.cfg),
+                    repeat(self.seed),
+                    repeat(self.logdir),
+                    repeat(self.resume),
+                    trials,
+                )
+                for trial, (events, converged_at) in tqdm(zip(trials, results), total=len(trials)):
+                    if converged_at is not None:
+                        self.converged_at[trial] = converged_at
+                    self.monitors.add_trial(self.monitors.row(trial), events)
+                    self.monitors.reduce_trial(trial)
+
+    def run_trial(self, trial, progress=True):
+        """Runs a single trial of the experiment and records its events in the monitors."""
+        logging.info(f" == Experiment trial {trial+1}/{self.cfg.TRIALS} ==")
+        name, row = f"trial-{trial}", self.monitors.row(trial)
+        state = self.load_checkpoint(name, [trial])
+        if state is None:
+            self.initialize(trial)
+            start = 0
+        elif state["env"] is None:
+            logging.info(f" Trial {trial+1} was completed before, its events are restored")
+            return
+        else:
+            self.env, start = state["env"], state["episode"]
+            logging.info(f" Resuming trial {trial+1} at episode {start}")
+        episodes = range(start, self.cfg.EPISODES)
+        for i in tqdm(episodes, initial=start, total=self.cfg.EPISODES, disable=not progress):
+            self.env.reset()
+            self.env.step(i)
+            self.record_events(row, i)  # monitors
+            converged = self.detect_convergence(trial, i)
+            self.flush_monitors(i)
+            if converged:
+                break
+            self.checkpoint(name, [trial], i)
+        self.flush_monitors()
+        self.save_schedule(trial)
+        self.save_checkpoint(name, [trial], self.cfg.EPISODES)
+        self.log_state_of_lexicons(self.env.population)
+
+    def run_batched(self, progress=True):
+        """Runs all trials of the experiment at once, every episode advances all trials with array operations.
+
+        Trial t plays the same game as run_trial(t) with the object engine (given a SCHEDULE_BLOCK_SIZE).
+        """
+        for key in self.monitors.intervals:
+            if key not in MONITORS:
+                raise ValueError(f"Given monitor {key} is not valid for engine batched!")
+        trials = range(self.cfg.TRIALS)
+        logging.info(f" == Experiment trials 1-{self.cfg.TRIALS} (batched) ==")
+        state = self.load_checkpoint("batched", trials)
+        if state is None:
+            self.global_reward = np.zeros(self.cfg.TRIALS)
+            self.timesteps = 0
+            schedules = [self.load_schedule(trial) for trial in trials]
+            self.env = BatchedNamingGameEnv(
+                self.cfg,
+                [trial_seed(self.seed, trial) for trial in trials],
+                schedules=None if schedules[0] is None else schedules,
+            )
+            self.detector = select_convergence_detector(self.cfg, self.cfg.TRIALS, self.env.games_per_round)
+            start = 0
+        elif state["env"] is None:
+            logging.info(" Trials were completed before, their events are restored")
+            return
+        else:
+            self.env, start = state["env"], state["episode"]
+            logging.info(f" Resuming trials at episode {start}")
+        self.active = np.array([trial not in self.converged_at for trial in trials])  # trials that did not converge
+        episodes = range(start, self.cfg.EPISODES)
+        for i in tqdm(episodes, initial=start, total=self.cfg.EPISODES, disable=not progress):
+            self.env.reset()
+            self.env.step(i)
+            self.record_batched_events(i)  # monitors
+            self.detect_batched_convergence(i)
+            self.flush_monitors(i)
+            if not self.active.any():
+                break
+            self.checkpoint("batched", trials, i)
+        self.flush_monitors()
+        if self.cfg.get("SCHEDULE_SAVE") and self.logdir is not None:
+            for trial in trials:
+                self.env.scheduler.played(trial).save(self.schedule_path(self.logdir, trial))
+        self.save_checkpoint("batched", trials, self.cfg.EPISODES)
+
+    def flush_monitors(self, episode=None):
+        """Flushes the monitors to the logdir every cfg.FLUSH_EVERY episodes and at the end of a trial (no episode).
+
+        Flushing bounds the memory of the monitors and keeps the events of finished episodes on disk after a crash.
+        """
+        flush_every = self.cfg.get("FLUSH_EVERY", 0)
+        if flush_every and (episode is None or (episode + 1) % flush_every == 0):
+            self.monitors.flush(self.logdir)
+
+    def detect_convergence(self, trial, episode):
+        """Returns whether the trial converged in the given episode (see ConvergenceDetector)."""
+        if self.detector is None:
+            return False
+        size = self.monitors.population_lexicon_size()
+        converged = self.detector.update([self.env.speaker.communicative_success], [self.env.lexicon_change], [size])
+        if converged[0]:
+            self.converged_at[trial] = episode + 1
+            logging.info(f" Trial {trial+1} converged after {episode + 1} episodes")
+        return bool(converged[0])
+
+    def detect_batched_convergence(self, episode):
+        """Ends the trials of the batched environment that converged in the given episode.
+
+        In round mode, the success and change rates of the detector count games and the size is the one
+        after the last game of the round. The environment keeps playing the ended trials (which are not recorded)
+        until every trial converged.
+        """
+        if self.detector is None:
+            return
+        shape = (self.cfg.TRIALS, -1)
+        converged = self.detector.update(
+            self.env.communicative_success.reshape(shape).sum(axis=1),
+            self.env.lexicon_change.reshape(shape).sum(axis=1),
+            self.env.measures(["lexicon-size"])["lexicon-size"].reshape(shape)[:, -1],
+        )
+        for trial in np.flatnonzero(converged & self.active):
+            self.converged_at[int(trial)] = episode + 1
+            logging.info(f" Trial {trial+1} converged after {episode + 1} episodes")
+        self.active &= ~converged
+
+    def record_batched_events(self, episode):
+        """Records the events of the active trials of the batched environment to the monitors due in the episode."""
+        trials = None if self.active.all() else np.flatnonzero(self.active)
+        self.monitors.record_measures(self.env.measures(self.monitors.due(episode)), trials)
+        # record shared global cumulative reward of every trial
+        rewards = np.where(self.env.communicative_success, self.cfg.REWARD_SUCCESS, self.cfg.REWARD_FAILURE)
+        self.global_reward += rewards.reshape(self.cfg.TRIALS, -1).sum(axis=1) * self.active
+        # record timesteps (games)
+        self.timesteps += self.env.games_per_round
+
+    def record_events(self, trial, episode):
+        """Records the events of a trial in the given episode to the monitors (see Monitors.record_events)."""
         # record shared global cumulative reward
         self.global_reward += (
             self.cfg.REWARD_SUCCESS
@@ -50,35 +319,50 @@ class Experiment:
         )
         # record timesteps
         self.timesteps += 1
+        # monitors enabled in cfg.MONITORS
+        self.monitors.record_events(trial, episode)
 
     def run_competition(self):
-        """Runs and generates data for a form-competition graph
+        """Runs and generates data for form-competition graphs
 
-        This experiment logs the form competition in a lexicon of a specific agent for a specific meaning.
+        This experiment logs the form competition in the lexicons of the agents for the meanings
+        of cfg.COMPETITION_TARGETS, (agent 1, object 2) by default.
         """
         self.initialize()
-        agent_tracked, object_tracked = 1, 2
+        targets = select_competition_targets(self.cfg)
         for i in tqdm(range(0, self.cfg.EPISODES)):
             logging.debug(
                 f"\n\n - Episode {i} - population reward: {self.global_reward}"
             )
             self.env.reset()
             self.env.step(i)
-            self.record_competition(i, agent_tracked, object_tracked)
+            self.record_competition(i, targets)
+        self.save_schedule(0)
 
-        self.log_state_of_lexicons([self.env.population[agent_tracked]])
-        unique_forms = list(self.monitors.monitors["form-competition"].keys())
-        logging.info(
-            f" Experiment with {len(unique_forms)} unique forms, namely: {unique_forms}"
-        )
+        agents = sorted({agent for agent, _ in targets})
+        self.log_state_of_lexicons([self.env.population[agent] for agent in agents])
+        competition = self.monitors.monitors["form-competition"]
+        for target in targets:
+            unique_forms = [self.env.symbols.name("FORM", form) for form in competition.log[target]]
+            logging.info(
+                f" Target {target} with {len(unique_forms)} unique forms, namely: {unique_forms}"
+            )
 
-    def record_competition(self, episode, agent_idx, obj_idx):
+    def record_competition(self, episode, targets):
         # form competition
-        self.monitors.record_form_competition(episode, agent_idx, obj_idx)
+        self.monitors.record_form_competition(episode, targets)
 
-    def select_env(self, cfg):
+    def select_env(self, cfg, seed=None, schedule=None):
         if self.cfg.ENV == "bng":
-            return BasicNamingGameEnv(cfg)
+            engine = self.cfg.get("ENGINE", "object")
+            if select_interaction_mode(cfg) == "round":
+                raise ValueError(f"Given interaction mode round is not valid for engine {engine}!")
+            if engine == "object":
+                return BasicNamingGameEnv(cfg, seed, schedule)
+            elif engine == "tensor":
+                return TensorNamingGameEnv(cfg, seed, schedule)
+            else:
+                raise ValueError(f"Given engine {engine} is not valid!")
         else:
             raise ValueError(f"Given environment {self.cfg.ENV} is not valid!")
 
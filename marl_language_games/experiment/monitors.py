@@ -1,27 +1,436 @@
+import functools
 import os
+import shutil
 from collections import defaultdict
 
-from marl_language_games.utils.write import write_measure, write_measure_competition
+import numpy as np
+
+from marl_language_games.environment.lexicon import keep_value, population_coherence
+from marl_language_games.environment.schedule import select_interaction_mode
+from marl_language_games.environment.sketch import estimate_similarity
+from marl_language_games.experiment.convergence import select_convergence_padding
+from marl_language_games.experiment.reduction import Reduction, select_reduction
+from marl_language_games.utils.read import read_flushed
+from marl_language_games.utils.write import (
+    CONVERGENCE,
+    FLUSHED,
+    append_events,
+    event_list,
+    flushed_path,
+    parse_flushed_name,
+    write_competition_npy,
+    write_measure,
+    write_measure_competition,
+    write_measure_npy,
+    write_json,
+    write_sidecar,
+)
+
+# storage type of the events of each monitor, the type of other monitors is inferred from their first event
+MONITOR_DTYPES = {
+    "communicative-success": np.bool_,
+    "lexicon-coherence": np.bool_,
+    "lexicon-change": np.bool_,
+    "lexicon-size": np.float64,
+    "grammar-similarity": np.float64,
+    "forms-per-meaning": np.float64,
+    "meanings-per-form": np.float64,
+    "population-coherence": np.float64,
+    "population-jaccard-sketch": np.float64,
+}
+
+
+class ArrayMonitor:
+    """Events of a monitor, stored in a preallocated (trial, event) array that is filled in place.
+
+    Indexing a trial returns a view on its recorded events (no copy).
+    The array grows (doubling its capacity) if more trials or events are recorded than preallocated.
+    """
+
+    def __init__(self, dtype=None, trials=1, capacity=1):
+        self.dtype = dtype
+        self.shape = (max(trials, 1), max(capacity, 1))
+        self.data = None if dtype is None else np.zeros(self.shape, dtype=dtype)
+        self.lengths = np.zeros(self.shape[0], dtype=np.int64)
+        self.n_trials = 0  # number of trials with storage, i.e. up to the last trial with events
+
+    def reserve(self, trials, capacity, dtype=None):
+        """Makes room for the given number of trials and events per trial."""
+        if self.data is None:
+            self.dtype = dtype if self.dtype is None else self.dtype
+            self.data = np.zeros(self.shape, dtype=self.dtype)
+        rows, columns = self.data.shape
+        if trials > rows or capacity > columns:
+            shape = (max(trials, rows), max(capacity, 2 * columns if capacity > columns else columns))
+            data = np.zeros(shape, dtype=self.dtype)
+            data[:rows, :columns] = self.data
+            self.data = data
+            self.lengths = np.concatenate([self.lengths, np.zeros(shape[0] - rows, dtype=np.int64)])
+        self.n_trials = max(self.n_trials, trials)
+
+    def append(self, trial, event):
+        """Adds an event to a given trial."""
+        self.reserve(trial + 1, self.lengths[trial] + 1 if trial < len(self.lengths) else 1, np.asarray(event).dtype)
+        self.data[trial, self.lengths[trial]] = event
+        self.lengths[trial] += 1
+
+    def add_events(self, events, trials=None):
+        """Adds an event (trial,) or events (trial, event) to every trial, e.g. the events of a batch of trials.
+
+        If trials (indices) are given, only the events of these trials are added.
+        """
+        events = np.asarray(events)
+        if events.ndim == 1:
+            events = events[:, None]
+        if trials is None:
+            rows, n_rows = slice(0, len(events)), len(events)
+        else:
+            rows, n_rows = np.asarray(trials), int(max(trials, default=-1)) + 1
+            events = events[rows]
+        n = events.shape[1]
+        self.reserve(n_rows, int(self.lengths[:n_rows].max(initial=0)) + n, events.dtype)
+        lengths = self.lengths[rows]
+        start = lengths[0] if len(lengths) else 0
+        if (lengths == start).all():
+            self.data[rows, start : start + n] = events
+        else:
+            for trial, trial_events in zip(np.arange(n_rows)[rows], events):
+                self.data[trial, self.lengths[trial] : self.lengths[trial] + n] = trial_events
+        self.lengths[rows] += n
+
+    def set_trial(self, trial, events):
+        """Replaces the events of a given trial, e.g. a trial that was run by another process."""
+        events = np.asarray(events)
+        self.reserve(trial + 1, len(events), events.dtype)
+        self.data[trial, : len(events)] = events
+        self.lengths[trial] = len(events)
+
+    def flush(self, directory):
+        """Appends the recorded events of every trial to its file in the directory and drops them from memory.
+
+        The trials keep their indices, after a flush they hold the events recorded since.
+        """
+        if self.data is None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        for trial in range(self.n_trials):
+            if self.lengths[trial]:
+                append_events(self[trial], flushed_path(directory, trial, self.dtype))
+        self.lengths[:] = 0
+
+    def tolist(self):
+        """Returns the events of every trial as lists of Python values (see event_list)."""
+        return [event_list(trial) for trial in self]
+
+    def __getitem__(self, trial):
+        if not -self.n_trials <= trial < self.n_trials:
+            raise IndexError(f"Given trial {trial} has no events!")
+        trial %= self.n_trials
+        return self.data[trial, : self.lengths[trial]]
+
+    def __len__(self):
+        return self.n_trials
+
+    def __iter__(self):
+        return (self[trial] for trial in range(self.n_trials))
+
+    def __eq__(self, other):
+        if isinstance(other, ArrayMonitor):
+            other = other.tolist()
+        return self.tolist() == other
+
+    def __repr__(self):
+        return f"ArrayMonitor({self.tolist()})"
+
+
+class PaddedMonitor:
+    """Lazy view on the events of a monitor in which every shorter trial is padded to a given length
+    by repeating its last event, e.g. the trials that ended when they converged.
+    """
+
+    def __init__(self, monitor, length):
+        self.monitor = monitor
+        self.length = length
+
+    def __iter__(self):
+        for trial in self.monitor:
+            trial = np.asarray(trial)
+            if 0 < len(trial) < self.length:
+                trial = np.concatenate([trial, np.full(self.length - len(trial), trial[-1], dtype=trial.dtype)])
+            yield trial
+
+    def __len__(self):
+        return len(self.monitor)
+
+
+class CompetitionMonitor:
+    """Q-values of the forms competing for a meaning in the lexicon of an agent, for several (agent, object) targets.
+
+    The values are stored as a sparse change-log per target: an (episode, form, q-value) entry is only logged
+    when a form is added, changes its q-value or is removed (NaN). The trajectories of the forms are materialized
+    when the monitor is written (see trajectories).
+    """
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.current = {target: {} for target in self.targets}  # form -> last logged q-value
+        self.log = {target: defaultdict(list) for target in self.targets}  # form -> [(episode, q-value)]
+        self.n_episodes = 0  # number of recorded episodes
+
+    def update(self, episode, target, pairs):
+        """Logs the changes of the forms of a target given its (form, q-value) pairs after the episode."""
+        current, log = self.current[target], self.log[target]
+        for form, q_value in pairs:
+            if current.get(form) != q_value:
+                current[form] = q_value
+                log[form].append((episode, q_value))
+        for form in set(current) - {form for form, _ in pairs}:
+            del current[form]
+            log[form].append((episode, np.nan))
+
+    def trajectories(self, target):
+        """Returns for each form of the target, in order of appearance, its q-value in every episode (NaN if absent)."""
+        episodes = np.arange(self.n_episodes)
+        trajectories = {}
+        for form, changes in self.log[target].items():
+            logged, values = np.array(changes).T
+            index = np.searchsorted(logged, episodes, side="right") - 1  # last change up to every episode
+            trajectories[form] = np.where(index >= 0, values[np.maximum(index, 0)], np.nan)
+        return trajectories
+
+    def name(self, target):
+        """Returns the name of the monitor of a target, e.g. form-competition-1-2 for agent 1 and object 2.
+
+        The monitor of the single default target keeps the form-competition name of the earlier runs.
+        """
+        if self.targets == [DEFAULT_COMPETITION_TARGET]:
+            return "form-competition"
+        return "form-competition-{}-{}".format(*target)
+
+
+class MonitorStore(dict):
+    """Dictionary of monitors that creates a preallocated ArrayMonitor the first time a monitor is accessed."""
+
+    def __init__(self, trials=1, capacity=1, intervals=None):
+        super().__init__()
+        self.trials = trials
+        self.capacity = capacity
+        self.intervals = intervals or {}  # a monitor recorded every n episodes holds 1/n of the events
+
+    def __missing__(self, key):
+        monitor = ArrayMonitor(MONITOR_DTYPES.get(key), self.trials, self.capacity // self.intervals.get(key, 1))
+        self[key] = monitor
+        return monitor
 
 
 class Monitors:
     def __init__(self, exp):
         self.exp = exp
-        self.monitors = defaultdict(list)
+        self.intervals = select_monitors(exp.cfg)
+        self.quantiles = select_reduction(exp.cfg)  # None if the events of every trial are kept
+        self.reductions = {}  # monitor -> Reduction of the events of the reduced trials
+        self.monitors = MonitorStore(*self.preallocated_shape(exp.cfg), self.intervals)
+
+    def preallocated_shape(self, cfg):
+        """Returns the number of trials and the number of events per trial of the monitors of the experiment.
+
+        With cfg.FLUSH_EVERY, at most the events of FLUSH_EVERY episodes are held in memory.
+        With cfg.MONITOR_REDUCTION, only the trials that are running are held in memory (see row).
+        """
+        episodes = cfg.get("EPISODES", 1)
+        if cfg.get("FLUSH_EVERY", 0):
+            episodes = min(episodes, cfg.FLUSH_EVERY)
+        trials = cfg.get("TRIALS", 1) if self.row(1) else 1
+        return trials, episodes * self.events_per_episode(cfg)
+
+    @staticmethod
+    def events_per_episode(cfg):
+        """Returns the number of events per episode, one per game of a round with a game granularity."""
+        if select_interaction_mode(cfg) == "round" and cfg.get("MONITOR_GRANULARITY", "game") == "game":
+            return cfg.POPULATION_SIZE // 2
+        return 1
+
+    def row(self, trial):
+        """Returns the index under which the events of a trial are recorded.
+
+        When the monitors are reduced across trials, the trials that are run one at a time share the first row,
+        so that the memory does not grow with the number of trials. The batched engine runs all trials at once.
+        """
+        if self.quantiles is None or self.exp.cfg.get("ENGINE", "object") == "batched":
+            return trial
+        return 0
+
+    def reduce_trial(self, trial):
+        """Adds the events of a finished trial to the reductions across trials and drops them from memory.
+
+        Trials that converged early are padded first (cfg.CONVERGENCE_PADDING "last"). Does nothing unless
+        the monitors are reduced (cfg.MONITOR_REDUCTION).
+        """
+        if self.quantiles is None:
+            return
+        row = self.row(trial)
+        padding = trial in self.exp.converged_at and select_convergence_padding(self.exp.cfg) == "last"
+        for key, monitor in self.monitors.items():
+            if not isinstance(monitor, ArrayMonitor) or row >= len(monitor):
+                continue
+            events = monitor[row]
+            if padding:
+                length = self.exp.cfg.EPISODES // self.intervals.get(key, 1) * self.events_per_episode(self.exp.cfg)
+                events = next(iter(PaddedMonitor([events], length)))
+            self.reductions.setdefault(key, Reduction(self.quantiles)).add(events)
+            monitor.set_trial(row, events[:0])
+
+    def due(self, episode):
+        """Returns the enabled monitors that record an event in the given episode, i.e. every interval episodes."""
+        return [key for key, interval in self.intervals.items() if (episode + 1) % interval == 0]
+
+    def record_events(self, trial, episode):
+        """Records the events of the enabled monitors (cfg.MONITORS) that are due in the given episode."""
+        for key in self.due(episode):
+            MONITOR_REGISTRY[key](self, trial)
 
     def add_event_to_trial(self, monitor, trial, event):
         """Adds a new event to a monitor in a given trial."""
-        if len(monitor) <= trial:
-            monitor.append([event])  # assumes trials are executed sequentially
-        else:
-            monitor[trial].append(event)
+        monitor.append(trial, event)
+
+    def add_events(self, monitor, events, trials=None):
+        """Adds the events of every trial to a monitor.
+
+        Args:
+            monitor (ArrayMonitor): monitor to which the events are added
+            events (np.ndarray): (trial,) array with an event per trial or (trial, event) array with events per trial
+            trials (np.ndarray): indices of the trials of which the events are added, None adds those of every trial
+        """
+        monitor.add_events(events, trials)
+
+    def record_measures(self, measures, trials=None):
+        """Records the events of a batch of trials, e.g. the measures of a BatchedNamingGameEnv.
+
+        Args:
+            measures (dict): for each monitor, an array with the event(s) of every trial
+            trials (np.ndarray): indices of the trials of which the events are recorded, None records every trial
+        """
+        for key, events in measures.items():
+            self.add_events(self.monitors[key], events, trials)
+
+    def get_trial(self, trial):
+        """Returns the events of all monitors in a given trial."""
+        return {key: monitor[trial] for key, monitor in self.monitors.items()}
+
+    def add_trial(self, trial, events):
+        """Adds the events of all monitors of a trial, e.g. a trial that was run by another process.
+
+        Args:
+            trial (int): index denoting which trial the events belong to
+            events (dict): for each monitor, the list of events of the trial
+        """
+        for key, trial_events in events.items():
+            self.monitors[key].set_trial(trial, trial_events)
+
+    def flush(self, logdir):
+        """Appends the events recorded so far to the flushed directory of the monitors and drops them from memory.
+
+        Every trial of a monitor has a raw file of events, so that worker processes can flush their own trials.
+        The flushed events survive a crash (see read_flushed), Monitors.write assembles them into the final output.
+        Does nothing without a logdir.
+        """
+        if logdir is None:
+            return
+        directory = os.path.join(logdir, "monitors", FLUSHED)
+        for key, monitor in self.monitors.items():
+            if isinstance(monitor, ArrayMonitor):
+                monitor.flush(os.path.join(directory, key))
+
+    def flushed_files(self, logdir, trials):
+        """Yields the paths (relative to the flushed directory) of the flushed files of the given trials."""
+        directory = os.path.join(logdir, "monitors", FLUSHED)
+        if os.path.isdir(directory):
+            for key in os.listdir(directory):
+                for fname in os.listdir(os.path.join(directory, key)):
+                    if parse_flushed_name(fname)[0] in trials:
+                        yield os.path.join(key, fname)
+
+    def flushed_sizes(self, logdir, trials):
+        """Returns the size of every flushed file of the given trials, e.g. to checkpoint a run."""
+        directory = os.path.join(logdir, "monitors", FLUSHED)
+        return {path: os.path.getsize(os.path.join(directory, path)) for path in self.flushed_files(logdir, trials)}
+
+    def truncate_flushed(self, logdir, trials, sizes):
+        """Truncates the flushed files of the given trials to the given sizes (see flushed_sizes).
+
+        The events flushed after the sizes were taken are dropped, files without a size are removed.
+        """
+        directory = os.path.join(logdir, "monitors", FLUSHED)
+        for path in list(self.flushed_files(logdir, trials)):
+            if path in sizes:
+                os.truncate(os.path.join(directory, path), sizes[path])
+            else:
+                os.remove(os.path.join(directory, path))
 
     def write(self, logdir):
+        """Writes the monitors to the monitors directory of the logdir in the formats of cfg.MONITOR_FORMATS.
+
+        If events were flushed during the run, the remaining events are flushed as well and the output is streamed
+        from the flushed files (memory-mapped), which are removed afterwards.
+        With cfg.MONITOR_REDUCTION, the statistics of every monitor across trials are written instead of the trials
+        (see Reduction.statistics), as competition-like monitors with a row per statistic.
+        """
+        self.write_convergence(logdir)
+        if self.quantiles is not None:
+            statistics = {key: reduction.statistics() for key, reduction in self.reductions.items()}
+            reduced_npy = functools.partial(write_competition_npy, kind="reduction")
+            self.write_formats(logdir, statistics, write_measure_competition, reduced_npy)
+            return
+        flushed = os.path.join(logdir, "monitors", FLUSHED)
+        if not os.path.isdir(flushed):
+            self.write_formats(logdir, self.padded(self.monitors), write_measure, write_measure_npy)
+            return
+        self.flush(logdir)
+        monitors = read_flushed(flushed)
+        self.write_formats(logdir, self.padded(monitors), write_measure, write_measure_npy)
+        del monitors  # close the memory maps before removing their files
+        shutil.rmtree(flushed)
+
+    def padded(self, monitors):
+        """Pads the trials that converged early to the full number of events (cfg.CONVERGENCE_PADDING "last")."""
+        cfg = self.exp.cfg
+        if not self.exp.converged_at or select_convergence_padding(cfg) == "none":
+            return monitors
+        length = self.events_per_episode(cfg)
+        return {
+            key: PaddedMonitor(monitor, cfg.EPISODES // self.intervals.get(key, 1) * length)
+            for key, monitor in monitors.items()
+        }
+
+    def write_convergence(self, logdir):
+        """Writes the number of episodes each trial ran until it converged (null if it did not) to convergence.json."""
+        cfg = self.exp.cfg
+        if not cfg.get("CONVERGENCE_WINDOW", 0):
+            return
+        logdir = os.path.join(logdir, "monitors")
+        os.makedirs(logdir, exist_ok=True)
+        convergence = {
+            "window": cfg.CONVERGENCE_WINDOW,
+            "tolerance": cfg.get("CONVERGENCE_TOLERANCE", 0.01),
+            "episodes": [self.exp.converged_at.get(trial) for trial in range(cfg.TRIALS)],
+        }
+        write_json(convergence, os.path.join(logdir, CONVERGENCE))
+
+    def write_formats(self, logdir, monitors, write_lisp, write_npy):
         logdir = os.path.join(logdir, "monitors")
         os.makedirs(logdir, exist_ok=True)
 
-        for key, data in self.monitors.items():
-            write_measure(data, os.path.join(logdir, key))
+        formats = select_monitor_formats(self.exp.cfg)
+        described = {}
+        for key, data in monitors.items():
+            if "lisp" in formats:
+                write_lisp(data, os.path.join(logdir, key))
+            if "npy" in formats:
+                described[key] = write_npy(data, os.path.join(logdir, key))
+                if key in self.intervals:
+                    described[key]["interval"] = self.intervals[key]
+        if "npy" in formats:
+            write_sidecar(logdir, self.exp.cfg, self.exp.seed, described)
 
     def record_communicative_success(self, trial):
         """Records the success of the current interaction.
@@ -38,19 +447,14 @@ class Monitors:
 
         Boolean check only for the interpolated update rule
         """
-        if self.exp.cfg.UPDATE_RULE == "interpolated":
-            return (
-                sa_pair.q_value
-                >= self.exp.cfg.REWARD_FAILURE + self.exp.cfg.EPSILON_FAILURE
-            )
-        elif self.exp.cfg.UPDATE_RULE == "basic":
-            return sa_pair.q_value >= self.exp.cfg.EPSILON_FAILURE
+        return keep_value(self.exp.cfg, sa_pair.q_value)
 
     def calculate_lexicon_size(self, agent):
         """Calculates the length of the lexicon.
 
         If the cfg.IGNORE_LOW_SA_PAIR flag has been set, sa_pairs with q-values
         lower than self.cfg.REWARD_FAILURE + self.cfg.EPSILON_FAILURE will not be counted.
+        The size is read from the running statistics of the lexicon.
 
         Args:
             agent (Agent): agent of which the lexicon size is calculated
@@ -58,17 +462,15 @@ class Monitors:
         Returns:
             int: length of the lexicon
         """
-        lexicon = agent.lexicon.q_table
-        if self.exp.cfg.IGNORE_LOW_SA_PAIR:
-            filtered_list = list(
-                filter(
-                    lambda sa_pair: self.keep_value(sa_pair),
-                    lexicon,
-                )
-            )
-            return len(filtered_list)
-        else:
-            return len(lexicon)
+        return agent.lexicon.size(live=self.exp.cfg.IGNORE_LOW_SA_PAIR)
+
+    def population_lexicon_size(self):
+        """Returns the average number of words known by the population."""
+        sizes = []
+        for agent in self.exp.env.population:
+            lex_size = self.calculate_lexicon_size(agent)
+            sizes.append(lex_size)
+        return sum(sizes) / len(sizes)
 
     def record_lexicon_size(self, trial):
         """Records the average number of words known by the population.
@@ -79,12 +481,7 @@ class Monitors:
         Args:
             trial (int): index denoting which trial the new record belongs to
         """
-        sizes = []
-        for agent in self.exp.env.population:
-            lex_size = self.calculate_lexicon_size(agent)
-            sizes.append(lex_size)
-
-        event = sum(sizes) / len(sizes)  # average lexicon size
+        event = self.population_lexicon_size()  # average lexicon size
         monitor = self.monitors["lexicon-size"]
         self.add_event_to_trial(monitor, trial, event)
 
@@ -95,12 +492,12 @@ class Monitors:
         as the fraction of form meaning associations that are shared by speaker and hearer and all words known by
         speaker and hearer.
         A slightly more precise measure for coherence in the population would be to compare the lexicons of all agents.
-        But because computing coherence between all pairs of agents would be very costly, we chose to use coherence
-        between speaker and hearer as a approximation for population coherence.
+        Because computing this every game would be costly, coherence between speaker and hearer is used as an
+        approximation, the population-coherence monitor compares all pairs every few episodes instead.
 
         Args:
-            speaker_lex (list): lexicon of the speaker
-            hearer_lex (list): lexicon of the hearer
+            speaker_lex (list): lexicon of the speaker, i.e. its pairs or the keys of its pairs (see Lexicon.keys)
+            hearer_lex (list): lexicon of the hearer, i.e. its pairs or the keys of its pairs
 
         Returns:
             float: a number between [0, 1] denoting the coherence of the given lexicons
@@ -123,13 +520,52 @@ class Monitors:
             trial (int): index denoting which trial the new record belongs to
         """
         speaker_lex, hearer_lex = (
-            self.exp.env.speaker.lexicon.q_table,
-            self.exp.env.hearer.lexicon.q_table,
+            self.exp.env.speaker.lexicon.keys(),
+            self.exp.env.hearer.lexicon.keys(),
         )
         event = self.lexicon_similarity(speaker_lex, hearer_lex)
         monitor = self.monitors["grammar-similarity"]
         self.add_event_to_trial(monitor, trial, event)
 
+    def record_population_coherence(self, trial):
+        """Records how similar the lexicons of all pairs of agents are on average (see population_coherence).
+
+        The (live) form-meaning associations of every agent are the entries of the sparse (agent, association)
+        matrix of the population.
+
+        Args:
+            trial (int): index denoting which trial the new record belongs to
+        """
+        population = self.exp.env.population
+        live = self.exp.cfg.IGNORE_LOW_SA_PAIR
+        associations, agents, keys = {}, [], []
+        for idx, agent in enumerate(population):
+            for sa_pair in agent.lexicon.q_table:
+                if not live or self.keep_value(sa_pair):
+                    agents.append(idx)
+                    keys.append(associations.setdefault((sa_pair.meaning, sa_pair.form), len(associations)))
+        event = population_coherence(agents, keys, len(population))
+        monitor = self.monitors["population-coherence"]
+        self.add_event_to_trial(monitor, trial, event)
+
+    def record_population_jaccard_sketch(self, trial):
+        """Records an estimate of the Jaccard similarity of the lexicons, averaged over all pairs of agents
+        (see estimate_similarity).
+
+        The estimate compares the MinHash signatures of the (live) lexicons, which the agents keep up to date.
+        Its error is bounded by sketch.error_bound of the signature size (cfg.MINHASH_SIZE).
+        It is not an estimate of population-coherence, which averages the Dice similarity 2|A∩B| / (|A| + |B|):
+        a pair with Jaccard similarity J has Dice similarity 2J / (1 + J), e.g. 0.67 for J = 0.5.
+
+        Args:
+            trial (int): index denoting which trial the new record belongs to
+        """
+        live = self.exp.cfg.IGNORE_LOW_SA_PAIR
+        signatures = np.stack([agent.lexicon.signature(live) for agent in self.exp.env.population])
+        event = estimate_similarity(signatures)
+        monitor = self.monitors["population-jaccard-sketch"]
+        self.add_event_to_trial(monitor, trial, event)
+
     def record_lexicon_coherence(self, trial):
         """Records how coherent the lexicons of the interactings agents are for the topic.
 
@@ -150,20 +586,8 @@ class Monitors:
         Args:
             trial (int): index denoting which trial the new record belongs to
         """
-        avgs = []
-        for agent in self.exp.env.population:
-            meanings = defaultdict(int)
-            for sa_pair in agent.lexicon.q_table:
-                if not self.exp.cfg.IGNORE_LOW_SA_PAIR or (
-                    self.exp.cfg.IGNORE_LOW_SA_PAIR and self.keep_value(sa_pair)
-                ):
-                    meanings[sa_pair.meaning] += 1
-            counts = list(meanings.values())
-            if counts:
-                avg = sum(counts) / len(counts)  # average forms per meaning
-            else:
-                avg = 0
-            avgs.append(avg)
+        live = self.exp.cfg.IGNORE_LOW_SA_PAIR
+        avgs = [agent.lexicon.forms_per_meaning(live=live) for agent in self.exp.env.population]
 
         # average forms per meaning for the population
         event = sum(avgs) / len(avgs)
@@ -177,20 +601,8 @@ class Monitors:
         Args:
             trial (int): index denoting which trial the new record belongs to
         """
-        avgs = []
-        for agent in self.exp.env.population:
-            forms = defaultdict(int)
-            for sa_pair in agent.lexicon.q_table:
-                if not self.exp.cfg.IGNORE_LOW_SA_PAIR or (
-                    self.exp.cfg.IGNORE_LOW_SA_PAIR and self.keep_value(sa_pair)
-                ):
-                    forms[sa_pair.form] += 1
-            counts = list(forms.values())
-            if counts:
-                avg = sum(counts) / len(counts)  # average meanings per form
-            else:
-                avg = 0
-            avgs.append(avg)
+        live = self.exp.cfg.IGNORE_LOW_SA_PAIR
+        avgs = [agent.lexicon.meanings_per_form(live=live) for agent in self.exp.env.population]
 
         # average forms per meaning for the population
         event = sum(avgs) / len(avgs)
@@ -210,48 +622,137 @@ class Monitors:
         monitor = self.monitors["lexicon-change"]
         self.add_event_to_trial(monitor, trial, event)
 
-    def add_event_competition(self, monitor, events, episode):
-        """Adds competition events to the given monitor.
-
-        This function also logs NIL entries for entries in the monitor that are not tracked anymore.
-        For example, when a SA_Pair is deleted from the lexicon, deleted sa_pair will be logged as NIL.
+    def record_form_competition(self, episode, targets):
+        """Records the form competition for the given (agent index, object index) targets.
 
-        Args:
-            monitor (dict): monitor to which the events are added
-            events (list): list of (key, score) tuples
-            episode (int): current episode index
+        Only the lexicons of the agents that played the episode can change, the targets of the other agents
+        are only read in the first episode.
         """
-        keys = list(monitor.keys())
-        for event in events:
-            key, val = event
-            if key not in monitor:
-                [monitor[key].append("NIL") for i in range(episode)]
-            monitor[key].append(val)
-            if key in keys:
-                keys.remove(key)
-        for key in keys:
-            monitor[key].append("NIL")
-
-    def record_form_competition(self, episode, agent_idx, obj_idx):
-        """Records the form competition for the specified object in the lexicon of the specified agent."""
         if "form-competition" not in self.monitors:
             # initialize competition monitor
-            self.monitors["form-competition"] = defaultdict(list)
-
-        meaning = self.exp.env.world.objects[obj_idx]
-        agent = self.exp.env.population[agent_idx]
-
-        events = []
-        for sa_pair in agent.lexicon.q_table:
-            if meaning == sa_pair.meaning:
-                events.append((sa_pair.form, sa_pair.q_value))
-
+            self.monitors["form-competition"] = CompetitionMonitor(targets)
         monitor = self.monitors["form-competition"]
-        self.add_event_competition(monitor, events, episode)
+        env = self.exp.env
+
+        played = [env.speaker, env.hearer]
+        lexicons = {}
+        for target in monitor.targets:
+            agent_idx, obj_idx = target
+            agent = env.population[agent_idx]
+            if monitor.n_episodes and not any(agent is player for player in played):
+                continue
+            if agent_idx not in lexicons:
+                lexicons[agent_idx] = agent.lexicon.q_table
+            meaning = env.world.objects[obj_idx]
+            pairs = [(sa_pair.form, sa_pair.q_value) for sa_pair in lexicons[agent_idx] if sa_pair.meaning == meaning]
+            monitor.update(episode, target, pairs)
+        monitor.n_episodes = episode + 1
 
     def write_competition(self, logdir):
-        logdir = os.path.join(logdir, "monitors")
-        os.makedirs(logdir, exist_ok=True)
-
-        for key, data in self.monitors.items():
-            write_measure_competition(data, os.path.join(logdir, key))
+        """Writes a competition monitor per target in the formats of cfg.MONITOR_FORMATS, forms are written by name."""
+        symbols = self.exp.env.symbols
+        competition = self.monitors["form-competition"]
+
+        def named(write):
+            # forms are interned ids, the written monitor uses their names
+            return lambda data, fname: write({symbols.name("FORM", form): vals for form, vals in data.items()}, fname)
+
+        monitors = {competition.name(target): competition.trajectories(target) for target in competition.targets}
+        self.write_formats(logdir, monitors, named(write_measure_competition), named(write_competition_npy))
+
+
+# record function of each monitor, given the monitors and the trial, in the order in which they are recorded
+MONITOR_REGISTRY = {
+    # communicative success
+    "communicative-success": Monitors.record_communicative_success,
+    # average lexicon size
+    "lexicon-size": Monitors.record_lexicon_size,
+    # lexicon coherence between interacting agents
+    "lexicon-coherence": Monitors.record_lexicon_coherence,
+    # lexicon similarity (loetszch version of lexicon coherence)
+    "grammar-similarity": Monitors.record_lexicon_similarity,
+    # lexicon change
+    "lexicon-change": Monitors.record_lexicon_change,
+    # avg forms per meaning
+    "forms-per-meaning": Monitors.record_forms_per_meaning,
+    # avg meanings per form
+    "meanings-per-form": Monitors.record_meanings_per_form,
+    # lexicon similarity between all pairs of agents
+    "population-coherence": Monitors.record_population_coherence,
+    # estimated Jaccard similarity between the lexicons of all pairs of agents (not an estimate of population-coherence)
+    "population-jaccard-sketch": Monitors.record_population_jaccard_sketch,
+}
+# monitors recorded every episode when cfg.MONITORS is not given, comparing all agents is too costly for that
+DEFAULT_MONITORS = [key for key in MONITOR_REGISTRY if not key.startswith("population-")]
+
+# (agent index, object index) of which run_competition.py records the competition by default
+DEFAULT_COMPETITION_TARGET = (1, 2)
+
+
+def register_monitor(name, dtype=None):
+    """Registers a custom monitor, which is recorded when it is enabled in cfg.MONITORS.
+
+    The decorated function is given the experiment after each recorded episode and returns the event
+    of the trial, e.g. register_monitor("global-reward")(lambda exp: exp.global_reward).
+    Custom monitors are recorded by the object and tensor engines only.
+
+    Args:
+        name (str): name of the monitor and its files
+        dtype (np.dtype): storage type of the events, None infers it from the first event
+    """
+
+    def register(function):
+        def record(monitors, trial):
+            monitors.add_event_to_trial(monitors.monitors[name], trial, function(monitors.exp))
+
+        MONITOR_REGISTRY[name] = record
+        if dtype is not None:
+            MONITOR_DTYPES[name] = dtype
+        return function
+
+    return register
+
+
+def select_monitors(cfg):
+    """Returns the recording interval of each enabled monitor of cfg.MONITORS.
+
+    cfg.MONITORS maps the name of a monitor (see MONITOR_REGISTRY) to its interval: a monitor with interval n
+    records the events of every n-th episode, 0 disables it. Without cfg.MONITORS, the default monitors are
+    recorded every episode, an empty mapping records no monitors at all.
+    """
+    monitors = cfg.get("MONITORS")
+    if monitors is None:
+        return dict.fromkeys(DEFAULT_MONITORS, 1)
+    intervals = {}
+    for name, interval in monitors.items():
+        if name not in MONITOR_REGISTRY:
+            raise ValueError(f"Given monitor {name} is not valid!")
+        if isinstance(interval, bool) or not isinstance(interval, int) or interval < 0:
+            raise ValueError(f"Given interval {interval} of monitor {name} is not valid!")
+        if interval:
+            intervals[name] = interval
+    return intervals
+
+
+def select_competition_targets(cfg):
+    """Returns the (agent index, object index) targets of cfg.COMPETITION_TARGETS of which the competition is recorded.
+
+    The targets are given as a list of [agent, object] pairs, "all" tracks every object of every agent.
+    """
+    targets = cfg.get("COMPETITION_TARGETS", [list(DEFAULT_COMPETITION_TARGET)])
+    if targets == "all":
+        return [(agent, obj) for agent in range(cfg.POPULATION_SIZE) for obj in range(cfg.WORLD_SIZE)]
+    for target in targets:
+        if len(target) != 2 or not (0 <= target[0] < cfg.POPULATION_SIZE and 0 <= target[1] < cfg.WORLD_SIZE):
+            raise ValueError(f"Given competition target {target} is not valid!")
+    return [tuple(target) for target in targets]
+
+
+def select_monitor_formats(cfg):
+    """Returns the formats of cfg.MONITOR_FORMATS (a format or a list of formats), "lisp" and/or "npy"."""
+    formats = cfg.get("MONITOR_FORMATS", ["lisp"])
+    formats = [formats] if isinstance(formats, str) else list(formats)
+    for monitor_format in formats:
+        if monitor_format not in ("lisp", "npy"):
+            raise ValueError(f"Given monitor format {monitor_format} is not valid!")
+    return formats
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """Streaming estimate of a quantile of the events at every position (event index) of a monitor across trials.
+
+    Each position runs the P^2 algorithm (Jain and Chlamtac, 1985), which tracks the quantile with five markers
+    instead of storing the observations. All positions are updated at once with array operations.
+    Positions with fewer than five observations keep them and report their exact quantile.
+    """
+
+    def __init__(self, quantile):
+        self.quantile = quantile
+        self.increments = np.array([0, quantile / 2, quantile, (1 + quantile) / 2, 1])[:, None]
+        self.count = np.zeros(0, dtype=np.int64)
+        self.heights = np.zeros((5, 0))  # marker heights, the first observations until a position has five
+        self.positions = np.zeros((5, 0))  # actual marker positions (1-based as in the paper)
+        self.desired = np.zeros((5, 0))  # desired marker positions
+
+    def grow(self, length):
+        """Makes room for the given number of positions."""
+        extra = length - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.heights = np.concatenate([self.heights, np.zeros((5, extra))], axis=1)
+            self.positions = np.concatenate([self.positions, np.tile(np.arange(1.0, 6.0)[:, None], (1, extra))], axis=1)
+            initial = np.array([1, 1 + 2 * self.quantile, 1 + 4 * self.quantile, 3 + 2 * self.quantile, 5])[:, None]
+            self.desired = np.concatenate([self.desired, np.tile(initial, (1, extra))], axis=1)
+
+    def add(self, events):
+        """Adds the events of a trial, the i-th event is an observation of position i."""
+        events = np.asarray(events, dtype=np.float64)
+        self.grow(len(events))
+        columns = np.arange(len(events))
+        count = self.count[columns]
+        filling = count < 5
+        self.heights[count[filling], columns[filling]] = events[filling]
+        full = count >= 5  # the markers of these positions are initialized
+        self.count[columns] += 1
+        started = columns[filling & (count == 4)]
+        self.heights[:, started] = np.sort(self.heights[:, started], axis=0)
+        if full.any():
+            self.update(columns[full], events[full])
+
+    def update(self, columns, x):
+        """Runs a step of the P^2 algorithm for an observation x of each of the given positions."""
+        q, n = self.heights[:, columns], self.positions[:, columns]
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        cell = np.clip((x[None, :] >= q[1:4]).sum(axis=0), 0, 3)  # markers above the cell of x are shifted
+        n += np.arange(5)[:, None] > cell[None, :]
+        desired = self.desired[:, columns] + self.increments
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+            d = np.sign(d) * move
+            parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            neighbour = np.where(d > 0, i + 1, i - 1)
+            q_neighbour, n_neighbour = q[neighbour, np.arange(len(x))], n[neighbour, np.arange(len(x))]
+            linear = q[i] + d * (q_neighbour - q[i]) / np.where(move, n_neighbour - n[i], 1)
+            ordered = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = np.where(move, np.where(ordered, parabolic, linear), q[i])
+            n[i] += d
+        self.heights[:, columns], self.positions[:, columns], self.desired[:, columns] = q, n, desired
+
+    def estimate(self):
+        """Returns the estimated quantile of every position (exact for positions with fewer than five trials)."""
+        estimate = self.heights[2].copy()
+        for count in range(1, 5):
+            columns = np.flatnonzero(self.count == count)
+            if len(columns):
+                estimate[columns] = np.quantile(self.heights[:count, columns], self.quantile, axis=0)
+        estimate[self.count == 0] = np.nan
+        return estimate
+
+
+class Reduction:
+    """Running statistics of the events of a monitor across trials, per position (event index).
+
+    The mean and variance are maintained with Welford's algorithm, the quantiles with QuantileSketches,
+    so that the memory depends on the number of events of a trial only, not on the number of trials.
+    Trials may differ in length, each position counts the trials that reached it.
+    """
+
+    def __init__(self, quantiles=()):
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)  # sum of squared differences from the mean
+        self.sketches = [QuantileSketch(quantile) for quantile in quantiles]
+
+    def add(self, events):
+        """Adds the events of a trial."""
+        events = np.asarray(events, dtype=np.float64)
+        extra = len(events) - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+        n = len(events)
+        self.count[:n] += 1
+        delta = events - self.mean[:n]
+        self.mean[:n] += delta / self.count[:n]
+        self.m2[:n] += delta * (events - self.mean[:n])
+        for sketch in self.sketches:
+            sketch.add(events)
+
+    def variance(self):
+        """Returns the (sample) variance of every position, NaN for positions reached by fewer than two trials."""
+        return np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), np.nan)
+
+    def statistics(self):
+        """Returns the statistics of every position by name: count, mean, variance and quantile-<q> per sketch."""
+        statistics = {"count": self.count, "mean": self.mean, "variance": self.variance()}
+        for sketch in self.sketches:
+            statistics[f"quantile-{sketch.quantile}"] = sketch.estimate()
+        return statistics
+
+
+def select_reduction(cfg):
+    """Returns the quantiles of cfg.MONITOR_QUANTILES if the monitors are reduced across trials
+    (cfg.MONITOR_REDUCTION), None if every trial is kept.
+    """
+    if not cfg.get("MONITOR_REDUCTION", False):
+        return None
+    quantiles = list(cfg.get("MONITOR_QUANTILES", []))
+    for quantile in quantiles:
+        if not 0 < quantile < 1:
+            raise ValueError(f"Given monitor quantile {quantile} is not valid!")
+    if cfg.get("FLUSH_EVERY", 0):
+        raise ValueError("Given FLUSH_EVERY is not valid with MONITOR_REDUCTION, the reduction bounds the memory!")
+    return quantiles
@@ -0,0 +1,144 @@
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from marl_language_games.utils.catalog import record_metrics, register_run, registered_runs, run_key
+from marl_language_games.utils.plot import (
+    PLOTTED_MONITORS,
+    ROLLING_WINDOW,
+    event_episode,
+    plot_monitors,
+    rolling_mean,
+    trial_mean,
+)
+from marl_language_games.utils.read import read_config, read_convergence, read_monitors
+
+# rolling communicative success from which the population is considered to communicate successfully
+SUCCESS_THRESHOLD = 0.95
+# statistics of an experiment computed by summarize, in the order of the columns of the summary
+STATISTICS = [
+    "trials",
+    "final-communicative-success",
+    "final-lexicon-coherence",
+    "final-lexicon-size",
+    "peak-lexicon-size",
+    "peak-lexicon-size-episode",
+    "success-episode",
+    "converged-trials",
+    "convergence-episode",
+]
+
+
+def find_experiments(root="data"):
+    """Returns the log directories (see create_logdir) under root that hold monitors, in order of creation."""
+    return sorted(os.path.dirname(path) for path in glob.glob(os.path.join(root, "*", "monitors")))
+
+
+def summarize(monitors, cfg, convergence=None, window=ROLLING_WINDOW, threshold=SUCCESS_THRESHOLD):
+    """Computes the summary statistics (see STATISTICS) of an experiment given its monitors.
+
+    The statistics are computed on the mean of every event across trials. The final values average the last
+    window events, the success episode is the first at which the rolling mean of the communicative success
+    reaches the threshold. Statistics of monitors that were not recorded are NaN.
+
+    Args:
+        monitors (dict): the monitors of the experiment, see read_monitors
+        cfg (dict): config of the experiment
+        convergence (dict): convergence of the trials (see read_convergence), None if it was not detected
+        window (int): number of events averaged by the final values and the rolling success
+        threshold (float): communicative success that counts as success
+
+    Returns:
+        dict: the value of every statistic
+    """
+    intervals = cfg.get("MONITORS") or {}  # the monitors without an interval are recorded every episode
+    means = {key: trial_mean(monitors[key]) for key in PLOTTED_MONITORS if key in monitors}
+    statistics = dict.fromkeys(STATISTICS, np.nan)
+    # competition monitors hold competitors instead of trials
+    measures = [monitor for monitor in monitors.values() if not isinstance(monitor, dict) or "count" in monitor]
+    if measures:
+        monitor = measures[0]
+        statistics["trials"] = int(np.max(monitor["count"])) if isinstance(monitor, dict) else len(monitor)
+    for key, mean in means.items():
+        statistics[f"final-{key}"] = float(mean[-window:].mean()) if len(mean) else np.nan
+    size = means.get("lexicon-size")
+    if size is not None and len(size):
+        peak = int(np.argmax(size))
+        statistics["peak-lexicon-size"] = float(size[peak])
+        statistics["peak-lexicon-size-episode"] = event_episode(peak, cfg, intervals.get("lexicon-size", 1))
+    success = means.get("communicative-success")
+    if success is not None:
+        reached = np.flatnonzero(rolling_mean(success, window) >= threshold)
+        if len(reached):
+            interval = intervals.get("communicative-success", 1)
+            statistics["success-episode"] = event_episode(reached[0], cfg, interval)
+    if convergence is not None:
+        episodes = [episode for episode in convergence["episodes"] if episode is not None]
+        statistics["converged-trials"] = len(episodes)
+        statistics["convergence-episode"] = float(np.mean(episodes)) if episodes else np.nan
+    return statistics
+
+
+def analyze_experiment(logdir, plot=False):
+    """Summarizes an experiment given its log directory and optionally writes its plot (see plot_monitors).
+
+    Returns:
+        dict: the log directory, the config and the summary statistics of the experiment
+    """
+    monitors, cfg = read_monitors(logdir), read_config(logdir)
+    if plot and set(PLOTTED_MONITORS) <= set(monitors):
+        plot_monitors(monitors, os.path.join(logdir, "plots", "monitors"), cfg)
+    return {"logdir": logdir, "config": cfg, **summarize(monitors, cfg, read_convergence(logdir))}
+
+
+def analyze(logdirs, workers=1, plot=False):
+    """Summarizes many experiments, in parallel processes if workers is not 1 (0 uses all cores).
+
+    Returns:
+        list: the summary of every experiment (see analyze_experiment), in the order of logdirs
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        return [analyze_experiment(logdir, plot) for logdir in logdirs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyze_experiment, logdirs, [plot] * len(logdirs)))
+
+
+def config_value(value):
+    """Returns a config value as written to the summary, lists and dicts are written as JSON."""
+    return json.dumps(value, default=str) if isinstance(value, (list, dict)) else value
+
+
+def varying_config(summaries):
+    """Returns the config keys whose values differ between the summarized experiments, e.g. the swept parameters."""
+    keys = sorted({key for summary in summaries for key in summary["config"]})
+    values = {key: {json.dumps(summary["config"].get(key), default=str) for summary in summaries} for key in keys}
+    return [key for key in keys if len(values[key]) > 1]
+
+
+def write_summary(summaries, fname):
+    """Writes the summaries of experiments as a CSV file, a row per experiment with the log directory,
+    the config keys that vary between the experiments and the statistics.
+    """
+    keys = varying_config(summaries)
+    with open(fname, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["logdir", *keys, *STATISTICS])
+        for summary in summaries:
+            config = [config_value(summary["config"].get(key)) for key in keys]
+            writer.writerow([summary["logdir"], *config, *(summary[statistic] for statistic in STATISTICS)])
+
+
+def catalog_summaries(path, summaries):
+    """Records the statistics of summarized experiments in the catalog (see record_metrics),
+    experiments that are not in the catalog yet (e.g. run before it existed) are added as finished runs.
+    """
+    registered = registered_runs(path)
+    for summary in summaries:
+        if run_key(path, summary["logdir"]) not in registered:
+            register_run(path, summary["logdir"], summary["config"], status="finished")
+        record_metrics(path, summary["logdir"], {statistic: summary[statistic] for statistic in STATISTICS})
@@ -0,0 +1,190 @@
+import contextlib
+import datetime
+import hashlib
+import json
+import math
+import numbers
+import os
+import sqlite3
+
+# name of the catalog of the runs, in the directory holding their log directories (see create_logdir)
+CATALOG = "catalog.sqlite"
+
+# a row per run, a row per (flattened) config parameter and summary metric of a run
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    logdir TEXT PRIMARY KEY,
+    config_hash TEXT NOT NULL,
+    cfg_file TEXT,
+    started TEXT,
+    runtime REAL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    logdir TEXT NOT NULL REFERENCES runs(logdir),
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    number REAL,
+    PRIMARY KEY (logdir, key)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    logdir TEXT NOT NULL REFERENCES runs(logdir),
+    key TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (logdir, key)
+);
+CREATE INDEX IF NOT EXISTS parameters_by_value ON parameters (key, value);
+CREATE INDEX IF NOT EXISTS parameters_by_number ON parameters (key, number);
+CREATE INDEX IF NOT EXISTS runs_by_config ON runs (config_hash);
+"""
+
+
+def catalog_path(logdir):
+    """Returns the path of the catalog of a run, next to its log directory."""
+    return os.path.join(os.path.dirname(os.path.normpath(logdir)), CATALOG)
+
+
+def run_key(path, logdir):
+    """Returns the key of a run in the catalog: its logdir relative to the directory of the catalog,
+    so that every spelling of a logdir (e.g. data/<ts>, ./data/<ts> or an absolute path) denotes the same run.
+    """
+    return os.path.relpath(os.path.abspath(logdir), os.path.dirname(os.path.abspath(path)))
+
+
+def run_path(path, key):
+    """Returns the logdir of a run given its key in the catalog (see run_key)."""
+    return os.path.normpath(os.path.join(os.path.dirname(path), key))
+
+
+@contextlib.contextmanager
+def connect(path):
+    """Opens the catalog (created if it does not exist) and commits the changes of the block.
+
+    Every access opens its own connection, so that runs in several processes can update the same catalog.
+    """
+    connection = sqlite3.connect(path, timeout=60)
+    try:
+        connection.executescript(SCHEMA)
+        with connection:  # commits, or rolls back on an exception
+            yield connection
+    finally:
+        connection.close()
+
+
+def flatten(cfg, prefix=""):
+    """Returns the parameters of a config by key, nested mappings (e.g. MONITORS) as "<key>.<nested key>"."""
+    parameters = {}
+    for key, value in cfg.items():
+        if isinstance(value, dict):
+            parameters.update(flatten(value, f"{prefix}{key}."))
+        else:
+            parameters[f"{prefix}{key}"] = value
+    return parameters
+
+
+def config_hash(cfg):
+    """Returns a hash of a config, equal for runs with the same parameters."""
+    return hashlib.sha256(json.dumps(cfg, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def parameter_row(logdir, key, value):
+    """Returns the row of a parameter, numbers (not booleans) can also be compared by their number."""
+    number = value if isinstance(value, numbers.Real) and not isinstance(value, bool) else None
+    return logdir, key, json.dumps(value, default=str), number
+
+
+def registered_runs(path):
+    """Returns the keys of all runs in the catalog (see run_key)."""
+    with connect(path) as connection:
+        return {logdir for (logdir,) in connection.execute("SELECT logdir FROM runs")}
+
+
+def register_run(path, logdir, cfg, cfg_file=None, status="running"):
+    """Adds a run and its config to the catalog, a run that is already in the catalog (e.g. resumed) keeps
+    the time at which it started.
+    """
+    started, logdir = datetime.datetime.now().isoformat(timespec="seconds"), run_key(path, logdir)
+    with connect(path) as connection:
+        connection.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, NULL, ?) ON CONFLICT(logdir) DO UPDATE SET config_hash ="
+            " excluded.config_hash, cfg_file = coalesce(excluded.cfg_file, cfg_file), status = excluded.status",
+            (logdir, config_hash(cfg), cfg_file, started, status),
+        )
+        connection.execute("DELETE FROM parameters WHERE logdir = ?", (logdir,))
+        connection.executemany(
+            "INSERT INTO parameters VALUES (?, ?, ?, ?)",
+            [parameter_row(logdir, key, value) for key, value in flatten(cfg).items()],
+        )
+
+
+def finish_run(path, logdir, runtime, metrics=None):
+    """Records that a registered run finished after runtime seconds (added up over resumes) and its metrics."""
+    with connect(path) as connection:
+        updated = connection.execute(
+            "UPDATE runs SET runtime = coalesce(runtime, 0) + ?, status = 'finished' WHERE logdir = ?",
+            (runtime, run_key(path, logdir)),
+        )
+        if not updated.rowcount:
+            raise ValueError(f"Given run {logdir} is not in the catalog {path}!")
+    record_metrics(path, logdir, metrics or {})
+
+
+def record_metrics(path, logdir, metrics):
+    """Records the metrics of a run, e.g. the summary statistics of analyze_experiment. NaN is stored as NULL."""
+    logdir = run_key(path, logdir)
+    with connect(path) as connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO metrics VALUES (?, ?, ?)",
+            [(logdir, key, None if math.isnan(value) else float(value)) for key, value in metrics.items()],
+        )
+
+
+def find_runs(path, **parameters):
+    """Returns the log directories of the runs with the given parameters, e.g. find_runs(path, LEARNING_RATE=0.3).
+
+    The log directories are returned as paths relative to the working directory, as catalog_path is given.
+
+    Numbers are compared by value (50 matches 50.0), other parameters by their JSON representation.
+    Nested parameters are given by their flattened key, e.g. find_runs(path, **{"MONITORS.lexicon-size": 1}).
+    """
+    conditions, arguments = [], []
+    for key, value in parameters.items():
+        _, _, text, number = parameter_row(None, key, value)
+        column, argument = ("number", number) if number is not None else ("value", text)
+        conditions.append(f"logdir IN (SELECT logdir FROM parameters WHERE key = ? AND {column} = ?)")
+        arguments.extend([key, argument])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with connect(path) as connection:
+        rows = connection.execute(f"SELECT logdir FROM runs {where} ORDER BY started, logdir", arguments)
+        return [run_path(path, logdir) for (logdir,) in rows]
+
+
+def compare_runs(path, logdirs, parameters=(), metrics=()):
+    """Returns the given parameters and metrics of runs side by side, e.g. to compare the runs of a sweep.
+
+    Returns:
+        list: a dict per run with its logdir, config hash, runtime, status and the requested values
+            (None if a run has no such parameter or metric)
+    """
+    with connect(path) as connection:
+        results = []
+        for logdir in logdirs:
+            key = run_key(path, logdir)
+            row = connection.execute(
+                "SELECT config_hash, runtime, status FROM runs WHERE logdir = ?", (key,)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Given run {logdir} is not in the catalog {path}!")
+            result = {"logdir": run_path(path, key), "config_hash": row[0], "runtime": row[1], "status": row[2]}
+            for name in parameters:
+                value = connection.execute(
+                    "SELECT value FROM parameters WHERE logdir = ? AND key = ?", (key, name)
+                ).fetchone()
+                result[name] = None if value is None else json.loads(value[0])
+            for name in metrics:
+                value = connection.execute(
+                    "SELECT value FROM metrics WHERE logdir = ? AND key = ?", (key, name)
+                ).fetchone()
+                result[name] = None if value is None else value[0]
+            results.append(result)
+        return results
@@ -17,7 +17,7 @@ def parse_args():
         "--cfg",
         dest="cfg_file",
         help="config file of the experiment",
-        required=True,
+        default=[],
         type=str,
         nargs="*",
     )
@@ -31,5 +31,53 @@ def parse_args():
         type=int,
         default=1000,
     )
+    parser.add_argument(
+        "--resume",
+        dest="resume",
+        help="log directory of a checkpointed experiment to resume (instead of --cfg)",
+        type=str,
+        default=None,
+    )
     args = parser.parse_args()
+    if not args.cfg_file and args.resume is None:
+        parser.error("one of the arguments --cfg --resume is required")
     return args
+
+
+def parse_analysis_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data",
+        dest="data",
+        help="directory holding the log directories of the experiments to analyze",
+        type=str,
+        default="data",
+    )
+    parser.add_argument(
+        "--logdirs",
+        dest="logdirs",
+        help="log directories of the experiments to analyze (instead of all experiments of --data)",
+        default=[],
+        type=str,
+        nargs="*",
+    )
+    parser.add_argument(
+        "--workers", dest="workers", help="number of processes (0 uses all cores)", type=int, default=0
+    )
+    parser.add_argument(
+        "--plot", dest="plot", help="writes the plot of every experiment to its logdir", action="store_true"
+    )
+    parser.add_argument(
+        "--catalog",
+        dest="catalog",
+        help="records the summaries in the catalog of --data, adding the experiments it does not hold yet",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--output",
+        dest="output",
+        help="path of the CSV summary, by default summary.csv in --data",
+        type=str,
+        default=None,
+    )
+    return parser.parse_args()
@@ -1,38 +1,93 @@
-import random
 from collections import defaultdict
 
-ids = defaultdict(int)
+import numpy as np
 
 
-def make_id(name):
-    """Creates a unique id for an object resembling a lisp symbol.
+class SymbolTable:
+    """Interns the symbols of an experiment (agents, objects and forms) as dense integer ids.
 
-    Each input gets its own counter that is incremented each time the function is called.
+    Each kind of symbol has its own counter, so the ids of a kind are 0, 1, 2, ...
+    The human-readable names are only needed when logging or writing output.
+    A table is owned by an environment, so that parallel experiments never share counters.
     To use:
-    >>> make_id("AGENT")
-    #'AG-0
-    >>> make_id("AGENT")
-    #'AG-1
-    >>> make_id("OBJECT")
-    #'OBJ-0
-    >>> make_id("AGENT")
-    #'AG-2
-    >>> make_id("OBJECT")
-    #'OBJ-1
+    >>> symbols = SymbolTable()
+    >>> symbols.make_id("AGENT")
+    0
+    >>> symbols.make_id("AGENT")
+    1
+    >>> symbols.make_id("OBJECT")
+    0
+    >>> symbols.name("AGENT", 1)
+    "#'AGENT-1"
+    >>> symbols.intern("FORM", "bako")
+    0
+    """
 
-    Args:
-        name (str): a string for which a so-called symbolic id is created.
+    def __init__(self):
+        self.names = defaultdict(list)  # kind -> names, indexed by id
+        self.ids = defaultdict(dict)  # kind -> name -> id
 
-    Returns:
-        str: a string that is unique each time the function is called.
-    """
-    global ids
-    val = f"#'{name}-{ids[name]}"
-    ids[name] += 1
-    return val
+    def make_id(self, kind):
+        """Creates a new symbol of the given kind with a name resembling a lisp symbol (e.g. #'AGENT-0).
+
+        Args:
+            kind (str): the kind of symbol, e.g. AGENT or OBJECT
+
+        Returns:
+            int: the id of the new symbol
+        """
+        return self.intern(kind, f"#'{kind}-{len(self.names[kind])}")
+
+    def intern(self, kind, name):
+        """Returns the id of the given name, unseen names get the next free id of the kind.
+
+        Args:
+            kind (str): the kind of symbol, e.g. FORM
+            name (str): the human-readable name of the symbol
 
+        Returns:
+            int: the id of the symbol
+        """
+        ids = self.ids[kind]
+        if name not in ids:
+            ids[name] = len(self.names[kind])
+            self.names[kind].append(name)
+        return ids[name]
 
-def invent(syllables=3):
+    def name(self, kind, symbol):
+        """Returns the name of the given symbol, symbols that are not interned ids (e.g. strings) are returned as is."""
+        if isinstance(symbol, int):
+            return self.names[kind][symbol]
+        return symbol
+
+
+VOWELS = ["a", "e", "i", "o", "u"]
+CONSONANTS = [
+    "b",
+    "c",
+    "d",
+    "f",
+    "g",
+    "h",
+    "j",
+    "k",
+    "l",
+    "m",
+    "n",
+    "p",
+    "q",
+    "r",
+    "s",
+    "t",
+    "v",
+    "w",
+    "x",
+    "y",
+    "z",
+]
+
+
+def invent(syllables=3, rng=None):
     """Invents a word with a number of syllables through random sampling of letters.
 
     Each syllable has exactly two letters: a consonant and a vowel (in that order).
@@ -41,37 +96,25 @@ def invent(syllables=3):
 
     Args:
         syllables (int, optional): an integer representing the amount of syllables in the new word. Defaults to 3.
+        rng (np.random.Generator, optional): the random generator to sample from. Defaults to a fresh generator.
 
     Returns:
         str: a string that is randomly generated.
     """
-    vowels = ["a", "e", "i", "o", "u"]
-    consonants = [
-        "b",
-        "c",
-        "d",
-        "f",
-        "g",
-        "h",
-        "j",
-        "k",
-        "l",
-        "m",
-        "n",
-        "p",
-        "q",
-        "r",
-        "s",
-        "t",
-        "v",
-        "w",
-        "x",
-        "y",
-        "z",
-    ]
-
-    # produce word containing a sequence of syllables
-    new_word = ""
-    for i in range(syllables):
-        new_word += random.sample(consonants, k=1)[0] + random.sample(vowels, k=1)[0]
-    return new_word
+    if rng is None:
+        rng = np.random.default_rng()
+    return word_from_draws(rng.random(2 * syllables).tolist())
+
+
+def word_from_draws(draws):
+    """Returns the word encoded by 2 uniform draws in [0, 1) per syllable (see invent).
+
+    The first half of the draws selects the consonants, the second half the vowels.
+    Inventing only consumes uniform doubles, so engines that buffer the random stream of an agent
+    invent the same words as an agent drawing from its generator.
+    """
+    syllables = len(draws) // 2
+    return "".join(
+        CONSONANTS[int(c * len(CONSONANTS))] + VOWELS[int(v * len(VOWELS))]
+        for c, v in zip(draws[:syllables], draws[syllables:])
+    )
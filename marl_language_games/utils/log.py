@@ -8,6 +8,8 @@ from pprint import pformat
 import dateutil
 import dateutil.tz
 
+from marl_language_games.utils.catalog import catalog_path, register_run
+
 
 class Logger(object):
     def __init__(self, logfile, mode):
@@ -53,6 +55,7 @@ def log_experiment(args, cfg_file, cfg, logdir):
 
     For each experiment a new unique directory is created.
     A copy of the code, config file and the sysout is copied.
+    The run is registered in the catalog of the runs (see register_run).
 
     Args:
         args (dict): command-line arguments
@@ -102,4 +105,7 @@ def log_experiment(args, cfg_file, cfg, logdir):
     # copy config file
     shutil.copy(cfg_file, logdir)
 
+    # register the run in the catalog next to its logdir
+    register_run(catalog_path(logdir), logdir, cfg, cfg_file)
+
     return logger
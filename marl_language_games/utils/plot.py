@@ -1,51 +1,151 @@
-import matplotlib.pyplot as plt
+import os
+
 import numpy as np
-import pandas as pd
-
-
-def convert_data(monitor):
-    converted_data = []
-    for trial in monitor:
-        if isinstance(trial[0], bool) or isinstance(trial[0], int):
-            data = [int(i) for i in trial]
-        else:
-            data = [round(i, ndigits=2) for i in trial]
-        converted_data.append(data)
-    return converted_data
-
-def plot_monitors(monitors):
-    comm_success = pd.DataFrame(convert_data(monitors['communicative-success']))
-    lex_size = pd.DataFrame(convert_data(monitors['lexicon-size']))
-    lex_coh = pd.DataFrame(convert_data(monitors['lexicon-coherence']))
-
-    timesteps = [i for i in range(len(comm_success.mean().tolist()))]
-    data_cs = comm_success.mean().rolling(100, min_periods=1).mean().tolist()
-    data_ls = lex_size.mean().rolling(100, min_periods=1).mean().tolist()
-    data_lc = lex_coh.mean().rolling(100, min_periods=1).mean().tolist()
-
-    fig, ax1 = plt.subplots()
-    fig.set_figheight(4)
-    fig.set_figwidth(6)
-
-    ax1.set_xlabel('number of games')
+from easydict import EasyDict as edict
+from matplotlib.figure import Figure
+
+from marl_language_games.experiment.monitors import Monitors
+from marl_language_games.utils.read import read_config, read_monitors
+
+# monitors plotted by plot_monitors
+PLOTTED_MONITORS = ["communicative-success", "lexicon-size", "lexicon-coherence"]
+# formats in which plot_monitors writes the plot
+PLOT_FORMATS = ["png", "svg"]
+# number of episodes averaged by the rolling mean of the plotted series
+ROLLING_WINDOW = 100
+# number of points of a plotted series after decimation (see decimate)
+MAX_POINTS = 4000
+
+
+def event_episode(event, cfg, interval=1):
+    """Returns the number of episodes played when the event(s) with the given index of a monitor were recorded.
+
+    A monitor with the given interval records events_per_episode events every interval episodes (see Monitors).
+    """
+    return (event // Monitors.events_per_episode(cfg) + 1) * interval
+
+
+def trial_mean(monitor):
+    """Returns the mean of every event across trials, given the trials or the reduction of a monitor.
+
+    Trials that differ in length are averaged over the trials that reached the event.
+    """
+    if isinstance(monitor, dict):  # reduced across trials (cfg.MONITOR_REDUCTION)
+        return np.asarray(monitor["mean"], dtype=np.float64)
+    if isinstance(monitor, np.ndarray) and monitor.ndim == 2:
+        return monitor.mean(axis=0, dtype=np.float64)
+    trials = [np.asarray(trial, dtype=np.float64) for trial in monitor]
+    length = max((len(trial) for trial in trials), default=0)
+    sums, counts = np.zeros(length), np.zeros(length)
+    for trial in trials:
+        sums[: len(trial)] += trial
+        counts[: len(trial)] += 1
+    return sums / np.maximum(counts, 1)
+
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+    """Returns the mean of the last window values at every position, the first positions average fewer values."""
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def decimate(values, max_points=MAX_POINTS):
+    """Downsamples a series for plotting, keeping the minimum and the maximum of every bucket of positions.
+
+    The series is split into max_points / 2 buckets, so the plotted line keeps the peaks of the full series.
+
+    Returns:
+        tuple: the positions (np.ndarray) and values (np.ndarray) of the kept points, in order
+    """
+    values = np.asarray(values)
+    if len(values) <= max_points:
+        return np.arange(len(values)), values
+    size = -(-len(values) // (max_points // 2))  # positions per bucket
+    buckets = -(-len(values) // size)
+    padded = np.pad(values, (0, buckets * size - len(values)), mode="edge").reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    positions = np.concatenate([offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)])
+    positions = np.unique(np.minimum(positions, len(values) - 1))
+    return positions, values[positions]
+
+
+def plotted_series(monitor, key, cfg=None, window=ROLLING_WINDOW, max_points=MAX_POINTS):
+    """Returns the decimated rolling mean across trials of a monitor and the episodes at which its points were recorded.
+
+    Args:
+        monitor: the trials or the reduction of the monitor (see read_monitors)
+        key (str): name of the monitor, whose recording interval is read from cfg.MONITORS
+        cfg (dict): config of the experiment, None if every monitor records one event per episode
+        window (int): number of episodes averaged by the rolling mean
+        max_points (int): number of points of the series
+
+    Returns:
+        tuple: the episodes (np.ndarray) and values (np.ndarray) of the points
+    """
+    cfg = cfg if cfg is not None else edict()
+    interval = (cfg.get("MONITORS") or {}).get(key, 1)  # the monitors without an interval are recorded every episode
+    events = max(round(window * Monitors.events_per_episode(cfg) / interval), 1)  # events in the window
+    positions, values = decimate(rolling_mean(trial_mean(monitor), events), max_points)
+    return event_episode(positions, cfg, interval), values
+
+
+def plot_monitors(
+    monitors, fname=None, cfg=None, formats=PLOT_FORMATS, window=ROLLING_WINDOW, max_points=MAX_POINTS
+):
+    """Plots the main dynamics of the naming game given the monitors or the logdir of an experiment.
+
+    The events of every monitor are placed at the episode in which they were recorded, given the recording
+    interval of the monitor (cfg.MONITORS) and the number of events per episode (see event_episode).
+    The rolling means are computed on the arrays of the monitors and decimated to at most max_points per series.
+    The figure is drawn without a display and written in every format of formats.
+
+    Args:
+        monitors (dict | str): the monitors (see read_monitors) or the logdir of an experiment
+        fname (str): path of the plot without extension, by default plots/monitors in the logdir
+        cfg (dict): config of the experiment, by default read from the logdir (see read_config),
+            without a config every monitor is taken to record one event per episode
+        formats (list): extensions of the written files, e.g. png or svg
+        window (int): number of episodes averaged by the rolling means
+        max_points (int): number of points of each plotted series
+
+    Returns:
+        list: the paths of the written files
+    """
+    if isinstance(monitors, (str, os.PathLike)):
+        fname = fname or os.path.join(monitors, "plots", "monitors")
+        cfg = cfg if cfg is not None else read_config(monitors)
+        monitors = read_monitors(monitors)
+    if fname is None:
+        raise ValueError("Given monitors are not read from a logdir, the fname of the plot is required!")
+    series = {key: plotted_series(monitors[key], key, cfg, window, max_points) for key in PLOTTED_MONITORS}
+    last_episode = max((episodes[-1] for episodes, _ in series.values() if len(episodes)), default=1)
+
+    fig = Figure(figsize=(6, 4))
+    ax1 = fig.add_subplot()
+    ax1.set_xlabel('number of episodes')
     ax1.set_ylabel('communicative success / lexical coherence')
-    cs = ax1.plot(timesteps, data_cs, linestyle='-', color='blue', label='communicative success')
-    lc = ax1.plot(timesteps, data_lc, linestyle=':', color='red', label='lexical coherence')
+    cs = ax1.plot(*series['communicative-success'], linestyle='-', color='blue', label='communicative success')
+    lc = ax1.plot(*series['lexicon-coherence'], linestyle=':', color='red', label='lexical coherence')
     ax1.tick_params(axis='y')
-    ax1.set_xlim([0, 5000])
-    ax1.set_xticks(np.arange(0, 5001, 500))
+    ax1.set_xlim([0, last_episode])
     ax1.set_ylim([0, 1])
     ax1.grid(axis='y')
 
     ax2 = ax1.twinx()  # instantiate a second axes that shares the same x-axis
     ax2.set_ylabel('lexicon size')  # we already handled the x-label with ax1
-    ls = ax2.plot(timesteps, data_ls, linestyle='--', color='y', label='lexicon size')
+    ls = ax2.plot(*series['lexicon-size'], linestyle='--', color='y', label='lexicon size')
     ax2.tick_params(axis='y')
-    ax2.set_ylim([0, 35])
+    ax2.set_ylim(bottom=0)
 
     lns = cs+lc+ls
     labs = [l.get_label() for l in lns]
     ax1.legend(lns, labs, loc=0)
-    
+
     fig.tight_layout()  # otherwise the right y-label is slightly clipped
-    plt.show()
+    os.makedirs(os.path.dirname(os.path.abspath(fname)), exist_ok=True)
+    fnames = [f"{fname}.{extension}" for extension in formats]
+    for path in fnames:
+        fig.savefig(path)
+    return fnames
@@ -0,0 +1,254 @@
+import glob
+import json
+import os
+import pickle
+import re
+
+import numpy as np
+from easydict import EasyDict as edict
+
+from marl_language_games.utils.cfg import cfg_from_file
+from marl_language_games.utils.write import CONVERGENCE, FLUSHED, SIDECAR, parse_flushed_name
+
+# number of characters that are read from a file at once
+CHUNK_SIZE = 1 << 20
+
+PARENS = re.compile(r"[()]")
+NOT_INTEGER = re.compile(r"[^\d\s-]")
+
+
+def tokenize(file, chunk_size=None):
+    """Yields the tokens of an s-expression file: "(", ")" and runs of whitespace separated atoms.
+
+    The file is read chunk by chunk. A run holds all atoms between two brackets as a single string,
+    so that the atoms of a trial can be converted at once (see parse_atoms).
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    run = []  # pieces of the current run, which may span several chunks
+    while chunk := file.read(chunk_size):
+        start = 0
+        for match in PARENS.finditer(chunk):
+            run.append(chunk[start : match.start()])
+            text = "".join(run).strip()
+            if text:
+                yield text
+            run = []
+            yield match.group()
+            start = match.end()
+        run.append(chunk[start:])
+    text = "".join(run).strip()
+    if text:
+        yield text
+
+
+def parse(tokens):
+    """Returns the nested lists of an s-expression given its tokens, the atoms are kept as runs (strings)."""
+    stack = [[]]
+    for token in tokens:
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) == 1:
+                raise ValueError("Given s-expression has an unmatched closing bracket!")
+            expression = stack.pop()
+            stack[-1].append(expression)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise ValueError("Given s-expression has an unmatched opening bracket!")
+    return stack[0]
+
+
+def parse_atoms(run):
+    """Returns the numbers of a run of atoms as an array, integers if all atoms are integers and floats otherwise.
+
+    NIL atoms (events of pairs that are not in the lexicon) are read as NaN.
+    """
+    if not run:
+        return np.zeros(0, dtype=np.int64)
+    if "NIL" in run:
+        run = run.replace("NIL", "nan")
+    dtype = np.float64 if NOT_INTEGER.search(run) else np.int64
+    return np.array(run.split(), dtype=dtype)
+
+
+def read_expression(fname):
+    """Parses the s-expression of a monitor file written by write_measure or write_measure_competition."""
+    with open(fname) as file:
+        expression = parse(tokenize(file))
+    # monitors are written as ((...)), the outer brackets hold a single list of trials or competitors
+    if len(expression) != 1 or len(expression[0]) != 1 or not isinstance(expression[0][0], list):
+        raise ValueError(f"Given file {fname} is not a monitor!")
+    return expression[0][0]
+
+
+def lisp_path(fname):
+    """Returns the path of the .lisp file of a monitor, fname may be given with or without the extension."""
+    fname = os.fspath(fname)
+    return fname if fname.endswith(".lisp") else f"{fname}.lisp"
+
+
+def is_competition(expression):
+    """True if and only if the parsed monitor holds competition data, i.e. (key (events)) entries."""
+    return any(len(entry) == 2 and isinstance(entry[1], list) for entry in expression)
+
+
+def measure(expression, fname):
+    """Returns the events of every trial of a parsed measure monitor."""
+    if is_competition(expression):
+        raise ValueError(f"Given file {fname} holds competition data, use read_measure_competition!")
+    return [parse_atoms(" ".join(trial)) for trial in expression]
+
+
+def competition(expression, fname):
+    """Returns the events of every competitor of a parsed competition monitor."""
+    monitor = {}
+    for entry in expression:
+        if len(entry) != 2 or not isinstance(entry[0], str) or not isinstance(entry[1], list):
+            raise ValueError(f"Given file {fname} does not hold competition data!")
+        monitor[entry[0]] = parse_atoms(" ".join(entry[1])).astype(np.float64)
+    return monitor
+
+
+def read_measure(fname):
+    """Reads a monitor written by write_measure.
+
+    Args:
+        fname (str): path of the monitor, with or without the .lisp extension
+
+    Returns:
+        list: an array with the events of every trial, booleans are read as 0/1 integers
+    """
+    fname = lisp_path(fname)
+    return measure(read_expression(fname), fname)
+
+
+def read_measure_competition(fname):
+    """Reads a competition monitor written by write_measure_competition.
+
+    Args:
+        fname (str): path of the monitor, with or without the .lisp extension
+
+    Returns:
+        dict: for each competitor (e.g. a form), a float array of its events with NaN for NIL entries
+    """
+    fname = lisp_path(fname)
+    return competition(read_expression(fname), fname)
+
+
+def monitors_dir(logdir):
+    """Returns the monitors directory given the log directory of an experiment or the monitors directory itself."""
+    logdir = os.fspath(logdir)
+    if os.path.isdir(os.path.join(logdir, "monitors")):
+        return os.path.join(logdir, "monitors")
+    return logdir
+
+
+def read_sidecar(logdir):
+    """Returns the JSON sidecar (config, seed and description of the monitors) of the .npy monitors of a directory."""
+    with open(os.path.join(monitors_dir(logdir), SIDECAR)) as file:
+        return json.load(file)
+
+
+def read_config(logdir):
+    """Returns the config of an experiment, from the sidecar of its .npy monitors or the copied config file."""
+    if os.path.exists(os.path.join(monitors_dir(logdir), SIDECAR)):
+        return edict(read_sidecar(logdir)["config"])
+    fnames = sorted(glob.glob(os.path.join(logdir, "*.yml")))
+    return cfg_from_file(fnames[0]) if fnames else edict()
+
+
+def read_convergence(logdir):
+    """Returns the convergence of the trials (window, tolerance and episodes until convergence, None if they did not)
+    written with cfg.CONVERGENCE_WINDOW, None if the experiment did not detect convergence.
+    """
+    path = os.path.join(monitors_dir(logdir), CONVERGENCE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def read_npy_monitors(logdir, mmap_mode="r"):
+    """Loads the .npy monitors of a directory, by default memory-mapped so that only the accessed events are read.
+
+    Args:
+        logdir (str): the log directory of the experiment (holding the monitors directory) or the monitors directory
+        mmap_mode (str): memory-map mode of np.load, None loads the monitors into memory
+
+    Returns:
+        dict: for each measure, a (trial, event) array (or a list of per-trial arrays if the trials differ in length),
+            for each competition monitor, a dict with a float array per competitor (NaN for NIL entries)
+            and for each monitor reduced across trials, a dict with a float array per statistic
+    """
+    logdir = monitors_dir(logdir)
+    monitors = {}
+    for key, description in read_sidecar(logdir)["monitors"].items():
+        data = np.load(os.path.join(logdir, f"{key}.npy"), mmap_mode=mmap_mode)
+        if description["kind"] in ("competition", "reduction"):
+            monitors[key] = dict(zip(description["keys"], data))
+        elif all(length == data.shape[1] for length in description["lengths"]):
+            monitors[key] = data
+        else:
+            monitors[key] = [trial[:length] for trial, length in zip(data, description["lengths"])]
+    return monitors
+
+
+def read_flushed(directory, mmap_mode="r"):
+    """Loads the events that were flushed to a directory during a run (see Monitors.flush).
+
+    Also recovers the events recorded up to the last flush of a run that did not finish.
+
+    Args:
+        directory (str): the directory of the flushed events, holding a directory of raw trial files per monitor
+        mmap_mode (str): memory-map mode of the trial files, None loads them into memory
+
+    Returns:
+        dict: for each monitor, an array with the events of every trial (empty for trials without flushed events)
+    """
+    monitors = {}
+    for key in sorted(os.listdir(directory)):
+        trials = {}
+        for fname in os.listdir(os.path.join(directory, key)):
+            (trial, dtype), path = parse_flushed_name(fname), os.path.join(directory, key, fname)
+            if mmap_mode is None or os.path.getsize(path) == 0:  # empty files can not be memory-mapped
+                trials[trial] = np.fromfile(path, dtype=dtype)
+            else:
+                trials[trial] = np.memmap(path, dtype=dtype, mode=mmap_mode)
+        dtype = next(iter(trials.values())).dtype if trials else np.float64
+        monitors[key] = [trials.get(trial, np.zeros(0, dtype=dtype)) for trial in range(max(trials, default=-1) + 1)]
+    return monitors
+
+
+def read_monitors(logdir):
+    """Reads all monitors written by an experiment.
+
+    The .npy monitors are loaded (memory-mapped) if the directory has a sidecar, otherwise the .lisp files are parsed.
+    Without any of both (e.g. after a crash), the events flushed so far are loaded.
+
+    Args:
+        logdir (str): the log directory of the experiment (holding the monitors directory) or the monitors directory
+
+    Returns:
+        dict: for each monitor, the events of every trial (see read_npy_monitors, read_measure
+            and read_measure_competition)
+    """
+    logdir = monitors_dir(logdir)
+    if os.path.exists(os.path.join(logdir, SIDECAR)):
+        return read_npy_monitors(logdir)
+    monitors = {}
+    for fname in sorted(os.listdir(logdir)):
+        if fname.endswith(".lisp"):
+            path = os.path.join(logdir, fname)
+            expression = read_expression(path)
+            convert = competition if is_competition(expression) else measure
+            monitors[fname[: -len(".lisp")]] = convert(expression, path)
+    if not monitors and os.path.isdir(os.path.join(logdir, FLUSHED)):
+        return read_flushed(os.path.join(logdir, FLUSHED))
+    return monitors
+
+
+def read_pickle(fname):
+    """Unpickles an object written by write_pickle."""
+    with open(fname, "rb") as file:
+        return pickle.load(file)
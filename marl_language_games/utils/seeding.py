@@ -0,0 +1,54 @@
+import numpy as np
+
+
+def seed_sequence(seed=None):
+    """Returns the given seed as a SeedSequence, None draws fresh entropy from the OS.
+
+    A given SeedSequence is copied, since spawning from it changes the children it spawns next:
+    the streams derived from a seed do not depend on earlier uses of the seed.
+
+    Args:
+        seed (int, SeedSequence or None): the seed
+
+    Returns:
+        SeedSequence: the root of a tree of independent random streams
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+    return np.random.SeedSequence(seed)
+
+
+def trial_seed(seed, trial):
+    """Returns the seed of a trial, derived from the root seed of the experiment and the index of the trial.
+
+    The seed of a trial does not depend on the other trials, so trials can be run in any order or process.
+    """
+    return np.random.SeedSequence(seed, spawn_key=(trial,))
+
+
+def spawn_rngs(seed, n):
+    """Returns n independent random generators derived from the given seed."""
+    return [np.random.default_rng(child) for child in seed_sequence(seed).spawn(n)]
+
+
+def spawn_env_rngs(seed, population_size):
+    """Derives the random generators of the world, the environment and each agent of an environment from its seed.
+
+    Args:
+        seed (int, SeedSequence or None): seed of the environment, e.g. the seed of a trial
+        population_size (int): number of agents
+
+    Returns:
+        tuple: the generator of the world, of the environment and a list with a generator per agent
+    """
+    world_seed, env_seed, agents_seed = seed_sequence(seed).spawn(3)
+    return np.random.default_rng(world_seed), np.random.default_rng(env_seed), spawn_rngs(agents_seed, population_size)
+
+
+def rand_index(rng, n):
+    """Returns a uniformly sampled integer in [0, n).
+
+    Scaling a single uniform double is several times faster than rng.integers for scalar draws,
+    which are on the hot path of every interaction.
+    """
+    return int(rng.random() * n)
@@ -1,3 +1,77 @@
+import io
+import json
+import os
+import pickle
+from itertools import islice
+
+import numpy as np
+
+# number of events that are formatted and written at once
+CHUNK_SIZE = 8192
+
+
+def event_list(trial):
+    """Returns the events of a trial (a list or an array of an ArrayMonitor) as a list of Python values."""
+    if isinstance(trial, np.ndarray):
+        return trial.tolist()
+    return list(trial)
+
+
+def format_value(val):
+    """Formats a single event as an s-expression atom: 0/1 for booleans, floats rounded to 2 digits, NIL for NaN."""
+    if isinstance(val, bool) or isinstance(val, int):
+        return str(int(val))
+    elif isinstance(val, str):
+        return val
+    elif np.isnan(val):  # absent entries, e.g. forms of a competition that are not in the lexicon
+        return "NIL"
+    return str(round(val, ndigits=2))
+
+
+def chunks(events, size=None):
+    """Yields the events (a list or an array) in lists of at most size (default CHUNK_SIZE) Python values."""
+    size = size or CHUNK_SIZE
+    if isinstance(events, np.ndarray):
+        for start in range(0, len(events), size):
+            yield events[start : start + size].tolist()
+    else:
+        events = iter(events)
+        while chunk := list(islice(events, size)):
+            yield chunk
+
+
+def write_events(file, events, formatter):
+    """Writes the formatted events separated by spaces, chunk by chunk."""
+    separator = ""
+    for chunk in chunks(events):
+        file.write(separator)
+        file.write(" ".join(map(formatter, chunk)))
+        separator = " "
+
+
+def write_monitor(monitor, file):
+    """Streams a monitor to a file (into s-expression format), one trial at a time.
+
+    Integer and boolean trials (as determined by their first event) are written as integers,
+    other trials as floats rounded to 2 digits.
+
+    Args:
+        monitor (list): the events of every trial, e.g. an ArrayMonitor
+        file (io.TextIOBase): text file to write to
+    """
+    file.write("((")
+    for trial in monitor:
+        file.write("(")
+        if len(trial):
+            first = event_list(trial[:1])[0]
+            if isinstance(first, bool) or isinstance(first, int):
+                write_events(file, trial, lambda val: str(int(val)))
+            else:
+                write_events(file, trial, lambda val: str(round(val, ndigits=2)))
+        file.write(")")
+    file.write("))")  # add final round brackets
+
+
 def convert_monitor(monitor):
     """Converts monitor to a string (into s-expression format)
 
@@ -7,48 +81,121 @@ def convert_monitor(monitor):
     Returns:
         str: s-expression version of the data inside the given monitor
     """
-    out = ""
-    for trial in monitor:
-        if isinstance(trial[0], bool) or isinstance(trial[0], int):
-            data = str([int(i) for i in trial])
-        else:
-            data = str([round(i, ndigits=2) for i in trial])
-        # remove commas and square brackets, add brackets around list and concatenate lists
-        data = data.replace(",", "").replace("[", "").replace("]", "")
-        data = "(" + data + ")"
-        out += data
-    out = "((" + out + "))"  # add final round brackets
-
-    return out
+    out = io.StringIO()
+    write_monitor(monitor, out)
+    return out.getvalue()
 
 
 def write_measure(monitor, fname):
     """Converts and writes data out to a file with a given filename."""
-
-    data = convert_monitor(monitor)
     with open(f"{fname}.lisp", "w") as file:
-        file.write(data)
+        write_monitor(monitor, file)
+
+
+def write_competition_monitor(monitor, file):
+    """Streams competition data to a file (into s-expression format), one key at a time."""
+    file.write("((")
+    for key, vals in monitor.items():
+        file.write(f"({key} (")
+        write_events(file, vals, format_value)
+        file.write("))")
+    file.write("))")  # add final round brackets
 
 
 def write_measure_competition(monitor, fname):
     """Writes competition data out to a specified file (into s-expression format)."""
-    out = ""
-    for key, vals in monitor.items():
-        data = ""
-        for val in vals:
-            if isinstance(val, bool) or isinstance(val, int):
-                data += str(int(val)) + " "
-            elif isinstance(val, str):
-                data += val + " "
-            else:
-                data += str(round(val, ndigits=2)) + " "
-        data = data[:-1]
+    with open(f"{fname}.lisp", "w") as file:
+        write_competition_monitor(monitor, file)
 
-        # remove commas and square brackets, add brackets around list and concatenate lists
-        data = f"({key} ({data}))"
 
-        out += data
-    out = "((" + out + "))"  # add final round brackets
+# name of the JSON file next to the .npy monitors that describes them
+SIDECAR = "monitors.json"
+# name of the JSON file with the number of episodes until every trial converged
+CONVERGENCE = "convergence.json"
 
-    with open(f"{fname}.lisp", "w") as file:
-        file.write(out)
+
+def write_measure_npy(monitor, fname):
+    """Writes the events of a monitor as a (trial, event) array to a .npy file, one trial at a time.
+
+    Trials with fewer events than the longest trial are padded with zeros (see the lengths of the sidecar).
+    The monitor is iterated twice (shape and data), holding a single trial in memory at a time.
+
+    Returns:
+        dict: description of the written array for the sidecar
+    """
+    lengths, dtypes = [], []
+    for trial in monitor:  # e.g. views on memory-mapped flushed events or lazily padded trials
+        trial = np.asarray(trial)
+        lengths.append(len(trial))
+        dtypes.append(trial.dtype)
+    dtype = np.result_type(*dtypes) if dtypes else np.float64
+    shape = (len(lengths), max(lengths, default=0))
+    data = np.lib.format.open_memmap(f"{fname}.npy", mode="w+", dtype=dtype, shape=shape)
+    for row, trial in zip(data, monitor):
+        trial = np.asarray(trial)
+        row[: len(trial)] = trial
+    data.flush()
+    return {"kind": "measure", "shape": list(shape), "dtype": data.dtype.str, "lengths": lengths}
+
+
+def write_competition_npy(monitor, fname, kind="competition"):
+    """Writes competition data as a (competitor, event) float array to a .npy file, NIL entries become NaN.
+
+    The rows of a monitor reduced across trials (kind "reduction") are the statistics, e.g. the mean.
+
+    Returns:
+        dict: description of the written array for the sidecar, including the competitors (keys) in row order
+    """
+    keys = list(monitor)
+    length = max((len(vals) for vals in monitor.values()), default=0)
+    data = np.full((len(keys), length), np.nan)
+    for row, vals in zip(data, monitor.values()):
+        row[: len(vals)] = [np.nan if isinstance(val, str) else float(val) for val in vals]
+    np.save(f"{fname}.npy", data)
+    return {"kind": kind, "shape": list(data.shape), "dtype": data.dtype.str, "keys": [str(k) for k in keys]}
+
+
+def write_sidecar(logdir, cfg, seed, monitors):
+    """Writes the JSON sidecar of the .npy monitors of a directory.
+
+    Args:
+        logdir (str): directory of the .npy monitors
+        cfg (dict): config of the experiment
+        seed (int): root seed of the experiment
+        monitors (dict): for each monitor, the description returned by write_measure_npy or write_competition_npy
+    """
+    write_json({"config": cfg, "seed": seed, "monitors": monitors}, os.path.join(logdir, SIDECAR))
+
+
+def write_json(obj, fname):
+    """Writes an object to a JSON file, values that JSON does not support are written as strings."""
+    with open(fname, "w") as file:
+        json.dump(obj, file, indent=2, default=str)
+
+
+# name of the directory in which the monitors are flushed during a run
+FLUSHED = "flushed"
+
+
+def flushed_path(directory, trial, dtype):
+    """Returns the path of the raw file with the flushed events of a trial, the file name holds their dtype."""
+    return os.path.join(directory, f"trial-{trial}.{np.dtype(dtype).name}")
+
+
+def parse_flushed_name(fname):
+    """Returns the trial and the dtype of the events of a flushed file given its name (see flushed_path)."""
+    name, dtype = fname.split(".")
+    return int(name[len("trial-") :]), dtype
+
+
+def append_events(events, fname):
+    """Appends the events (an array) in raw binary format to a file."""
+    with open(fname, "ab") as file:
+        np.ascontiguousarray(events).tofile(file)
+
+
+def write_pickle(obj, fname):
+    """Pickles an object to a file atomically, a crash while writing leaves the previous file intact."""
+    with open(f"{fname}.tmp", "wb") as file:
+        pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{fname}.tmp", fname)
@@ -0,0 +1,25 @@
+import os
+
+from prettytable import PrettyTable
+
+from marl_language_games.utils.analysis import STATISTICS, analyze, catalog_summaries, find_experiments, write_summary
+from marl_language_games.utils.catalog import CATALOG
+from marl_language_games.utils.cfg import parse_analysis_args
+
+if __name__ == "__main__":
+    args = parse_analysis_args()
+    logdirs = args.logdirs or find_experiments(args.data)
+    if not logdirs:
+        raise SystemExit(f"No experiments with monitors found in {args.data}")
+    summaries = analyze(logdirs, workers=args.workers, plot=args.plot)
+    output = args.output or os.path.join(args.data, "summary.csv")
+    write_summary(summaries, output)
+    if args.catalog:
+        catalog_summaries(os.path.join(args.data, CATALOG), summaries)
+
+    table = PrettyTable(["logdir", *STATISTICS])
+    table.float_format = ".3"
+    for summary in summaries:
+        table.add_row([summary["logdir"], *(summary[statistic] for statistic in STATISTICS)])
+    print(table)
+    print(f"Summary of {len(summaries)} experiments written to {output}")
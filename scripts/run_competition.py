@@ -1,4 +1,7 @@
+import time
+
 from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.utils.catalog import catalog_path, finish_run
 from marl_language_games.utils.cfg import cfg_from_file, parse_args
 from marl_language_games.utils.log import create_logdir, log_experiment
 
@@ -9,7 +12,9 @@ if __name__ == "__main__":
         cfg.PRINT_EVERY = args.print_every
         logdir = create_logdir()
         logger = log_experiment(args, cfg_file, cfg, logdir)
-        experiment = Experiment(cfg)
+        experiment = Experiment(cfg, logdir=logdir)
+        start = time.perf_counter()
         experiment.run_competition()
         experiment.monitors.write_competition(logdir)
+        finish_run(catalog_path(logdir), logdir, time.perf_counter() - start)
         logger.close()
@@ -1,17 +1,48 @@
+import logging
+import os
+import time
+
 from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.utils.analysis import STATISTICS, analyze_experiment
+from marl_language_games.utils.catalog import catalog_path, finish_run, register_run
 from marl_language_games.utils.cfg import cfg_from_file, parse_args
-from marl_language_games.utils.log import create_logdir, log_experiment
-from marl_language_games.utils.plot import plot_monitors
+from marl_language_games.utils.log import Logger, create_logdir, log_experiment
+from marl_language_games.utils.plot import PLOTTED_MONITORS, plot_monitors
+
+
+def catalog_run(logdir, runtime):
+    """Records the runtime and the summary statistics of a finished run in the catalog."""
+    summary = analyze_experiment(logdir)
+    finish_run(catalog_path(logdir), logdir, runtime, {statistic: summary[statistic] for statistic in STATISTICS})
+
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.resume:  # continue a checkpointed experiment in its own logdir
+        logdir = args.resume
+        logger = Logger(os.path.join(logdir, "logfile.log"), logging.DEBUG if args.debug else logging.INFO)
+        experiment = Experiment.from_checkpoint(logdir)
+        experiment.cfg.PRINT_EVERY = args.print_every
+        register_run(catalog_path(logdir), logdir, experiment.cfg)  # keeps the run if it is in the catalog
+        start = time.perf_counter()
+        experiment.run_experiment()
+        experiment.monitors.write(logdir)
+        experiment.remove_checkpoints()  # the run can no longer be resumed
+        catalog_run(logdir, time.perf_counter() - start)
+        if set(PLOTTED_MONITORS) <= set(experiment.monitors.intervals):
+            plot_monitors(logdir)
+        logger.close()
     for cfg_file in args.cfg_file:  # multiple cfgs given
         cfg = cfg_from_file(cfg_file)
         cfg.PRINT_EVERY = args.print_every
         logdir = create_logdir()
         logger = log_experiment(args, cfg_file, cfg, logdir)
-        experiment = Experiment(cfg)
+        experiment = Experiment(cfg, logdir=logdir)
+        start = time.perf_counter()
         experiment.run_experiment()
         experiment.monitors.write(logdir)
-        plot_monitors(experiment.monitors.monitors)
+        experiment.remove_checkpoints()  # the run can no longer be resumed
+        catalog_run(logdir, time.perf_counter() - start)
+        if set(PLOTTED_MONITORS) <= set(experiment.monitors.intervals):  # e.g. not without monitors
+            plot_monitors(logdir)  # reads the written monitors, which are flushed from memory with FLUSH_EVERY
         logger.close()
@@ -0,0 +1,41 @@
+import pytest
+from easydict import EasyDict as edict
+
+
+@pytest.fixture
+def base_cfg():
+    """A small naming game config, the cfg fixtures of the test modules override the keys they need."""
+    cfg = edict()
+    cfg.ENV = "bng"
+    cfg.TRIALS = 3
+    cfg.EPISODES = 300
+    cfg.WORLD_SIZE = 10
+    cfg.POPULATION_SIZE = 10
+    cfg.CONTEXT_MIN_SIZE = 5
+    cfg.CONTEXT_MAX_SIZE = 5
+    cfg.EPS_GREEDY = 0.05
+    cfg.INITIAL_Q_VALUE = 0.5
+    cfg.REWARD_SUCCESS = 1
+    cfg.REWARD_FAILURE = 0
+    cfg.EPSILON_FAILURE = 0.01
+    cfg.LEARNING_RATE = 0.5
+    cfg.LATERAL_INHIBITION = True
+    cfg.UPDATE_RULE = "interpolated"
+    cfg.DELETE_SA_PAIR = False
+    cfg.IGNORE_LOW_SA_PAIR = True
+    cfg.PRINT_EVERY = 0
+    return cfg
+
+
+@pytest.fixture
+def basic_cfg(base_cfg):
+    """The base config with the basic update rule, which deletes pairs and rewards in [-0.1, 0.1]."""
+    base_cfg.update(
+        CONTEXT_MIN_SIZE=2,
+        CONTEXT_MAX_SIZE=8,
+        REWARD_SUCCESS=0.1,
+        REWARD_FAILURE=-0.1,
+        UPDATE_RULE="basic",
+        DELETE_SA_PAIR=True,
+    )
+    return base_cfg
@@ -0,0 +1,66 @@
+import csv
+
+import numpy as np
+import pytest
+import yaml
+from easydict import EasyDict as edict
+
+from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.utils.analysis import analyze, find_experiments, summarize, write_summary
+
+
+@pytest.fixture
+def cfg(base_cfg):
+    base_cfg.update(TRIALS=2, EPISODES=600, WORLD_SIZE=5, POPULATION_SIZE=5, CONTEXT_MIN_SIZE=3, CONTEXT_MAX_SIZE=3)
+    return base_cfg
+
+
+def write_experiment(cfg, logdir):
+    logdir.mkdir(parents=True)
+    (logdir / "config.yml").write_text(yaml.safe_dump(dict(cfg)))  # copied by log_experiment
+    exp = Experiment(cfg, seed=3, logdir=str(logdir))
+    exp.run_experiment()
+    exp.monitors.write(str(logdir))
+    return exp
+
+
+def test_summarize():
+    monitors = {
+        "communicative-success": np.array([[0, 0, 1, 1, 1], [0, 1, 0, 1, 1]]),
+        "lexicon-size": np.array([[1, 3, 2, 1, 1], [1, 2, 2, 2, 1]]),
+    }
+    cfg = edict(MONITORS={"communicative-success": 1, "lexicon-size": 2})
+    statistics = summarize(monitors, cfg, {"episodes": [4, None]}, window=2, threshold=1)
+    assert statistics["trials"] == 2
+    assert statistics["final-communicative-success"] == 1
+    assert statistics["final-lexicon-size"] == 1.25
+    assert np.isnan(statistics["final-lexicon-coherence"])
+    assert statistics["peak-lexicon-size"] == 2.5
+    assert statistics["peak-lexicon-size-episode"] == 4  # the second event of a monitor recorded every 2 episodes
+    assert statistics["success-episode"] == 5
+    assert statistics["converged-trials"] == 1 and statistics["convergence-episode"] == 4
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_analyze_experiments(cfg, tmp_path, workers):
+    write_experiment(cfg, tmp_path / "data" / "a")
+    cfg.update(LEARNING_RATE=0.3, MONITOR_FORMATS=["lisp", "npy"], CONVERGENCE_WINDOW=50, CONVERGENCE_TOLERANCE=0.1)
+    exp = write_experiment(cfg, tmp_path / "data" / "b")
+    (tmp_path / "data" / "empty").mkdir()
+
+    logdirs = find_experiments(str(tmp_path / "data"))
+    assert logdirs == [str(tmp_path / "data" / "a"), str(tmp_path / "data" / "b")]
+    summaries = analyze(logdirs, workers=workers, plot=True)
+    assert (tmp_path / "data" / "b" / "plots" / "monitors.png").exists()
+    assert summaries[0]["trials"] == summaries[1]["trials"] == 2
+    assert np.isnan(summaries[0]["converged-trials"])
+    assert summaries[1]["converged-trials"] == len(exp.converged_at)
+    success = np.array([list(trial) for trial in exp.monitors.padded(exp.monitors.monitors)["communicative-success"]])
+    assert summaries[1]["final-communicative-success"] == pytest.approx(success[:, -100:].mean())
+
+    write_summary(summaries, tmp_path / "summary.csv")
+    with open(tmp_path / "summary.csv") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["LEARNING_RATE"] for row in rows] == ["0.5", "0.3"]
+    assert "ENV" not in rows[0]  # the same in all experiments
+    assert float(rows[1]["final-lexicon-size"]) == pytest.approx(summaries[1]["final-lexicon-size"])
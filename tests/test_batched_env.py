@@ -0,0 +1,132 @@
+import pytest
+
+from marl_language_games.environment.batched_environment import BatchedNamingGameEnv
+from marl_language_games.environment.environment import BasicNamingGameEnv
+from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.utils.seeding import trial_seed
+
+
+@pytest.fixture
+def cfg(basic_cfg):
+    basic_cfg.update(EPISODES=500, SCHEDULE_BLOCK_SIZE=100)
+    return basic_cfg
+
+
+@pytest.mark.parametrize("update_rule", ["basic", "interpolated"])
+def test_same_run_as_object_engine(cfg, update_rule):
+    cfg.UPDATE_RULE = update_rule
+    if update_rule == "interpolated":
+        cfg.LEARNING_RATE = 0.5
+        cfg.REWARD_SUCCESS = 1
+        cfg.REWARD_FAILURE = 0
+    seeds = [trial_seed(0, trial) for trial in range(cfg.TRIALS)]
+    batched = BatchedNamingGameEnv(cfg, seeds, initial_slots=1)
+    events = []
+    for i in range(cfg.EPISODES):
+        batched.reset()
+        batched.step(i)
+        events.append((batched.communicative_success, batched.lexicon_change, batched.lexicon_coherence))
+
+    for trial, seed in enumerate(seeds):
+        env = BasicNamingGameEnv(cfg, seed)
+        for i in range(cfg.EPISODES):
+            env.reset()
+            env.step(i)
+            event = (env.speaker.communicative_success, env.lexicon_change, env.lexicon_coherence)
+            assert event == tuple(arr[trial] for arr in events[i])
+        for agent in env.population:
+            lexicon = [(sa_pair.meaning, sa_pair.form, sa_pair.q_value) for sa_pair in agent.lexicon.q_table]
+            assert lexicon == batched.lexicon(trial, agent.id)
+            assert [env.symbols.name("FORM", form) for _, form, _ in lexicon] == [
+                batched.symbols[trial].name("FORM", form) for _, form, _ in batched.lexicon(trial, agent.id)
+            ]
+
+
+def test_same_monitors_as_object_engine(cfg):
+    cfg.ENGINE = "object"
+    experiment = Experiment(cfg, seed=1)
+    experiment.run_experiment()
+    cfg.ENGINE = "batched"
+    batched = Experiment(cfg, seed=1)
+    batched.run_experiment()
+
+    assert batched.monitors.monitors.keys() == experiment.monitors.monitors.keys()
+    for key, monitor in experiment.monitors.monitors.items():
+        for trial in range(cfg.TRIALS):
+            assert batched.monitors.monitors[key][trial].tolist() == pytest.approx(monitor[trial].tolist())
+    assert batched.timesteps == cfg.EPISODES
+
+
+def test_replay_schedules(cfg, tmp_path):
+    cfg.ENGINE = "batched"
+    cfg.SCHEDULE_SAVE = True
+    experiment = Experiment(cfg, seed=2, logdir=tmp_path)
+    experiment.run_experiment()
+    assert len(list(tmp_path.iterdir())) == cfg.TRIALS
+
+    cfg.SCHEDULE_SAVE = False
+    cfg.SCHEDULE_REPLAY = str(tmp_path)
+    cfg.ENGINE = "object"
+    replay = Experiment(cfg, seed=2)
+    replay.initialize(trial=1)
+    played = experiment.env.scheduler.played(1)
+    assert [replay.env.scheduler.next() for _ in range(cfg.EPISODES)] == [
+        played.episode(i) for i in range(cfg.EPISODES)
+    ]
+
+
+@pytest.mark.parametrize("population_size", [10, 11])
+def test_rounds_same_run_as_object_engine_replay(cfg, population_size):
+    cfg.POPULATION_SIZE = population_size
+    cfg.INTERACTION_MODE = "round"
+    cfg.SCHEDULE_BLOCK_SIZE = 30
+    cfg.SCHEDULE_SAVE = True
+    seeds = [trial_seed(0, trial) for trial in range(2)]
+    batched = BatchedNamingGameEnv(cfg, seeds)
+    measures = []
+    for i in range(100):
+        batched.reset()
+        batched.step(i)
+        measures.append(batched.measures())
+    games = batched.games_per_round
+    assert games == 5
+
+    # the games of a round are disjoint, playing them one by one gives the same run
+    cfg.INTERACTION_MODE = "game"
+    for trial, seed in enumerate(seeds):
+        env = BasicNamingGameEnv(cfg, seed, schedule=batched.scheduler.played(trial))
+        for i in range(100 * games):
+            env.reset()
+            env.step(i)
+            events = measures[i // games]
+            assert env.speaker.communicative_success == events["communicative-success"][trial, i % games]
+            assert env.lexicon_coherence == events["lexicon-coherence"][trial, i % games]
+        for agent in env.population:
+            lexicon = [(sa_pair.meaning, sa_pair.form, sa_pair.q_value) for sa_pair in agent.lexicon.q_table]
+            assert lexicon == batched.lexicon(trial, agent.id)
+
+
+@pytest.mark.parametrize("granularity, events", [("game", 5 * 20), ("round", 20)])
+def test_monitor_granularity(cfg, granularity, events):
+    cfg.ENGINE = "batched"
+    cfg.INTERACTION_MODE = "round"
+    cfg.MONITOR_GRANULARITY = granularity
+    cfg.EPISODES = 20
+    experiment = Experiment(cfg, seed=0)
+    experiment.run_experiment()
+    for monitor in experiment.monitors.monitors.values():
+        assert [len(trial) for trial in monitor] == [events] * cfg.TRIALS
+    success = experiment.monitors.monitors["communicative-success"]
+    if granularity == "round":
+        assert all(0 <= event <= 1 for event in success[0])
+    assert experiment.timesteps == 5 * 20
+
+
+def test_rounds_require_batched_engine(cfg):
+    cfg.INTERACTION_MODE = "round"
+    with pytest.raises(ValueError):
+        Experiment(cfg).initialize()
+    cfg.INTERACTION_MODE = "pairs"
+    cfg.ENGINE = "batched"
+    with pytest.raises(ValueError):
+        Experiment(cfg).run_experiment()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from easydict import EasyDict as edict
+
+from marl_language_games.utils.analysis import STATISTICS, catalog_summaries
+from marl_language_games.utils.catalog import (
+    catalog_path,
+    compare_runs,
+    config_hash,
+    find_runs,
+    finish_run,
+    register_run,
+    registered_runs,
+)
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # runs are logged to data/<timestamp> of the working directory
+    (tmp_path / "data").mkdir()
+    return catalog_path("data/run-0")
+
+
+def sweep(path):
+    for i, (learning_rate, world_size) in enumerate([(0.3, 50), (0.3, 10), (0.5, 50)]):
+        cfg = edict(LEARNING_RATE=learning_rate, WORLD_SIZE=world_size, ENGINE="object", MONITORS={"lexicon-size": 1})
+        register_run(path, f"data/run-{i}", cfg, "cfg/config.yml")
+
+
+def test_find_runs(path):
+    sweep(path)
+    assert find_runs(path, LEARNING_RATE=0.3, WORLD_SIZE=50) == ["data/run-0"]
+    assert find_runs(path, WORLD_SIZE=50.0) == ["data/run-0", "data/run-2"]
+    assert find_runs(path, ENGINE="object", **{"MONITORS.lexicon-size": 1}) == [f"data/run-{i}" for i in range(3)]
+    assert find_runs(path, ENGINE="batched") == []
+    assert catalog_path("data/run-0/") == "data/catalog.sqlite"
+
+
+def test_finish_and_compare_runs(path):
+    sweep(path)
+    finish_run(path, "data/run-0", 2.5, {"final-lexicon-size": 10.0, "convergence-episode": np.nan})
+    finish_run(path, "data/run-0", 1.5)  # resumed
+    register_run(path, "data/run-0", edict(LEARNING_RATE=0.3, WORLD_SIZE=50, ENGINE="object"))
+
+    metrics = ["final-lexicon-size", "convergence-episode"]
+    runs = compare_runs(path, ["data/run-0", "data/run-1"], ["WORLD_SIZE"], metrics)
+    assert runs[0] == {
+        "logdir": "data/run-0",
+        "config_hash": config_hash(edict(LEARNING_RATE=0.3, WORLD_SIZE=50, ENGINE="object")),
+        "runtime": 4.0,
+        "status": "running",
+        "WORLD_SIZE": 50,
+        "final-lexicon-size": 10.0,
+        "convergence-episode": None,
+    }
+    assert runs[1]["runtime"] is None and runs[1]["final-lexicon-size"] is None
+    with pytest.raises(ValueError):
+        finish_run(path, "data/missing", 1.0)
+
+
+def test_catalog_summaries(path):
+    sweep(path)
+    statistics = {**dict.fromkeys(STATISTICS, np.nan), "trials": 3, "final-communicative-success": 0.9}
+    cfg = edict(LEARNING_RATE=0.7)
+    summaries = [{"logdir": logdir, "config": cfg, **statistics} for logdir in ("data/run-1", "data/old")]
+    catalog_summaries(path, summaries)
+
+    assert registered_runs(path) == {"run-0", "run-1", "run-2", "old"}
+    assert find_runs(path, LEARNING_RATE=0.7) == ["data/old"]  # registered runs keep their config
+    old, run = compare_runs(path, ["data/old", "data/run-1"], metrics=["trials", "peak-lexicon-size"])
+    assert old["status"] == "finished" and run["status"] == "running"
+    assert old["trials"] == run["trials"] == 3
+    assert old["peak-lexicon-size"] is None
+
+
+def test_spellings_of_a_logdir_denote_the_same_run(path, tmp_path):
+    sweep(path)
+    finish_run(path, "./data/run-0", 1.0, {"trials": 2})
+    finish_run(path, str(tmp_path / "data" / "run-0"), 2.0)
+    statistics = {**dict.fromkeys(STATISTICS, np.nan), "trials": 3}
+    catalog_summaries(path, [{"logdir": "./data//run-0/", "config": edict(), **statistics}])
+
+    assert len(registered_runs(path)) == 3
+    run = compare_runs(path, [str(tmp_path / "data" / "run-0")], ["WORLD_SIZE"], ["trials"])[0]
+    assert run == {
+        "logdir": "data/run-0",
+        "config_hash": run["config_hash"],
+        "runtime": 3.0,
+        "status": "finished",
+        "WORLD_SIZE": 50,
+        "trials": 3,
+    }
+
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from easydict import EasyDict as edict
+
+from marl_language_games.experiment.convergence import ConvergenceDetector, select_convergence_detector
+from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.utils.read import read_convergence, read_monitors
+
+
+@pytest.fixture
+def cfg(base_cfg):
+    base_cfg.update(
+        EPISODES=2000,
+        WORLD_SIZE=5,
+        POPULATION_SIZE=5,
+        CONTEXT_MIN_SIZE=3,
+        CONTEXT_MAX_SIZE=3,
+        EPS_GREEDY=0,
+        CONVERGENCE_WINDOW=100,
+        MONITOR_FORMATS=["lisp", "npy"],
+    )
+    return base_cfg
+
+
+def test_detector_window():
+    detector = ConvergenceDetector(window=3, tolerance=0.01, trials=2)
+    assert not detector.update([1, 1], [0, 0], [2.0, 2.0]).any()
+    assert not detector.update([1, 0], [0, 0], [2.0, 2.0]).any()
+    assert detector.update([1, 1], [0, 0], [2.0, 2.0]).tolist() == [True, False]
+    # the failure of trial 1 leaves the window
+    assert detector.update([1, 1], [0, 0], [2.0, 2.0]).tolist() == [True, False]
+    assert detector.update([1, 1], [0, 0], [2.0, 2.0]).tolist() == [True, True]
+
+
+def test_detector_change_and_size():
+    detector = ConvergenceDetector(window=2, tolerance=0.01, trials=2)
+    detector.update([1, 1], [1, 0], [2.0, 2.0])
+    assert detector.update([1, 1], [0, 0], [2.0, 2.5]).tolist() == [False, False]
+    assert detector.update([1, 1], [0, 0], [2.0, 2.5]).tolist() == [True, True]
+
+
+def test_detector_size_is_relative():
+    # the average lexicon size of a large population changes by a fraction of a pair per episode
+    detector = ConvergenceDetector(window=2, tolerance=0.01, trials=3)
+    detector.update([1, 1, 1], [0, 0, 0], [100.0, 1.0, 0.0])
+    assert detector.update([1, 1, 1], [0, 0, 0], [100.5, 1.5, 0.0]).tolist() == [True, False, True]
+
+
+def test_select_convergence_detector(cfg):
+    assert select_convergence_detector(edict()) is None
+    cfg.CONVERGENCE_WINDOW = -1
+    with pytest.raises(ValueError):
+        select_convergence_detector(cfg)
+
+
+def run(cfg, logdir):
+    exp = Experiment(cfg, seed=1, logdir=str(logdir))
+    exp.run_experiment()
+    exp.monitors.write(str(logdir))
+    return exp
+
+
+@pytest.mark.parametrize("padding", ["last", "none"])
+def test_trials_end_when_converged(cfg, tmp_path, padding):
+    cfg.CONVERGENCE_PADDING = padding
+    exp = run(cfg, tmp_path)
+
+    episodes = read_convergence(tmp_path)["episodes"]
+    assert episodes == [exp.converged_at[trial] for trial in range(cfg.TRIALS)]
+    assert all(100 <= n < cfg.EPISODES for n in episodes)
+    monitors = read_monitors(tmp_path)
+    for trial, n in enumerate(episodes):
+        success = np.asarray(monitors["communicative-success"][trial])
+        if padding == "last":
+            assert len(success) == cfg.EPISODES
+            assert (success[n - 1 :] == success[n - 1]).all()
+        else:
+            assert len(success) == n
+        assert success[n - 100 : n].mean() >= 0.99
+
+
+def test_batched_trials_end_at_same_episode(cfg, tmp_path):
+    cfg.SCHEDULE_BLOCK_SIZE = 1000  # the object engine plays the schedule of the batched engine
+    exp = run(cfg, tmp_path / "object")
+    cfg.ENGINE = "batched"
+    batched = run(cfg, tmp_path / "batched")
+
+    assert batched.converged_at == exp.converged_at
+    for fname in (tmp_path / "object" / "monitors").glob("*.lisp"):
+        assert fname.read_text() == (tmp_path / "batched" / "monitors" / fname.name).read_text()
@@ -1,4 +1,8 @@
-from marl_language_games.utils.write import convert_monitor
+import numpy as np
+
+from marl_language_games.experiment.monitors import ArrayMonitor
+from marl_language_games.utils import write
+from marl_language_games.utils.write import convert_monitor, write_measure_competition
 
 
 def test_convert_monitor_int():
@@ -20,3 +24,33 @@ def test_convert_monitor_float():
     data = convert_monitor(monitor)
 
     assert data == "(((0.1 1.01 2.89)(4.5 6.0 6.0)))"
+
+
+def test_convert_monitor_array():
+    monitor = ArrayMonitor(np.bool_)
+    monitor.set_trial(0, [True, False, True])
+    monitor.set_trial(1, [False])
+    data = convert_monitor(monitor)
+
+    assert data == "(((1 0 1)(0)))"
+
+
+def test_convert_monitor_chunks(monkeypatch):
+    monkeypatch.setattr(write, "CHUNK_SIZE", 2)
+    monitor = [[0.1, 1.0102012, 2.8888, 4.5, 5.9999], [1, 2, 3, 4]]
+    data = convert_monitor(monitor)
+
+    assert data == "(((0.1 1.01 2.89 4.5 6.0)(1 2 3 4)))"
+
+
+def test_write_measure_competition(tmp_path):
+    monitor = {"wabo": [0.5, 0.123, True], "fika": ["NIL", "NIL", 0.0]}
+    write_measure_competition(monitor, tmp_path / "form-competition")
+
+    assert (tmp_path / "form-competition.lisp").read_text() == "(((wabo (0.5 0.12 1))(fika (NIL NIL 0.0))))"
+
+
+def test_write_measure_competition_nan(tmp_path):
+    write_measure_competition({"wabo": np.array([np.nan, 0.5])}, tmp_path / "form-competition")
+
+    assert (tmp_path / "form-competition.lisp").read_text() == "(((wabo (NIL 0.5))))"
@@ -363,3 +363,31 @@ def test_step_disable_lateral_inhibition(environment_and_cfg):
     assert env.speaker.lexicon.q_table[1].q_value == 0.5
     assert env.speaker.lexicon.q_table[2].q_value == 0.5
     assert env.speaker.lexicon.q_table[3].q_value == 0.5
+
+
+def test_reset_picks_two_agents():
+    cfg = edict(WORLD_SIZE=10, POPULATION_SIZE=2, CONTEXT_MIN_SIZE=5, CONTEXT_MAX_SIZE=8)
+    env = BasicNamingGameEnv(cfg, seed=0)
+    for _ in range(20):
+        env.reset()
+        assert env.speaker is not env.hearer
+
+
+def test_seeded_env_is_reproducible(simple_env):
+    _, cfg = simple_env
+    env1, env2 = BasicNamingGameEnv(cfg, seed=11), BasicNamingGameEnv(cfg, seed=11)
+    for _ in range(20):
+        env1.reset()
+        env2.reset()
+        assert (env1.speaker.id, env1.hearer.id) == (env2.speaker.id, env2.hearer.id)
+        assert (env1.context, env1.topic) == (env2.context, env2.topic)
+
+
+def test_agents_draw_from_independent_streams(simple_env):
+    _, cfg = simple_env
+    env1, env2 = BasicNamingGameEnv(cfg, seed=11), BasicNamingGameEnv(cfg, seed=11)
+    env1.population[0].rng.random(size=100)  # draws of an agent do not shift the other streams
+    assert env1.population[1].rng.random() == env2.population[1].rng.random()
+    env1.reset()
+    env2.reset()
+    assert (env1.context, env1.topic) == (env2.context, env2.topic)
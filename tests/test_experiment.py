@@ -0,0 +1,310 @@
+import itertools
+
+import numpy as np
+import pytest
+from easydict import EasyDict as edict
+
+from marl_language_games.environment.batched_environment import BatchedNamingGameEnv
+from marl_language_games.environment.environment import BasicNamingGameEnv
+from marl_language_games.environment.sketch import error_bound
+from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.experiment import monitors
+from marl_language_games.experiment.monitors import register_monitor, select_competition_targets, select_monitors
+from marl_language_games.utils.read import read_monitors, read_sidecar
+from marl_language_games.utils.write import FLUSHED
+
+
+@pytest.fixture
+def cfg(base_cfg):
+    base_cfg.update(SEED=7)
+    return base_cfg
+
+
+def run(cfg):
+    exp = Experiment(cfg)
+    exp.run_experiment()
+    return exp.monitors.monitors
+
+
+def test_trials_are_seeded(cfg):
+    monitors = run(cfg)
+    assert monitors == run(cfg)
+    assert len(monitors["communicative-success"]) == cfg.TRIALS
+    assert monitors["lexicon-size"][0].tolist() != monitors["lexicon-size"][1].tolist()
+
+
+def test_parallel_run_is_identical(cfg):
+    sequential = run(cfg)
+    cfg.WORKERS = 2
+    parallel = run(cfg)
+    assert list(parallel.keys()) == list(sequential.keys())
+    assert parallel == sequential
+
+
+def write(cfg, logdir):
+    exp = Experiment(cfg, seed=7, logdir=str(logdir))
+    exp.run_experiment()
+    exp.monitors.write(str(logdir))
+    return exp
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_flushed_run_is_identical(cfg, tmp_path, workers):
+    cfg.MONITOR_FORMATS = ["lisp", "npy"]
+    write(cfg, tmp_path / "memory")
+    cfg.FLUSH_EVERY = 70
+    cfg.WORKERS = workers
+    exp = write(cfg, tmp_path / "flushed")
+
+    assert exp.monitors.monitors["communicative-success"].data.shape[1] == 70  # bounded memory
+    assert not (tmp_path / "flushed" / "monitors" / FLUSHED).exists()
+    fnames = [*(tmp_path / "memory" / "monitors").glob("*.lisp"), *(tmp_path / "memory" / "monitors").glob("*.npy")]
+    assert len(fnames) == 14
+    for fname in fnames:
+        assert fname.read_bytes() == (tmp_path / "flushed" / "monitors" / fname.name).read_bytes()
+
+
+def test_flushed_events_survive_crash(cfg, tmp_path):
+    cfg.FLUSH_EVERY = 100
+    exp = Experiment(cfg, seed=7, logdir=str(tmp_path))
+    exp.run_experiment()  # the monitors are never written, as after a crash
+
+    monitors = read_monitors(tmp_path)
+    assert len(monitors["lexicon-size"]) == cfg.TRIALS
+    assert all(len(trial) == cfg.EPISODES for trial in monitors["communicative-success"])
+    assert monitors["lexicon-size"][1].dtype == np.float64
+
+
+class Preempted(Exception):
+    pass
+
+
+def crash_at(monkeypatch, env_cls, episode):
+    """Makes the run crash when it steps the given episode (counted over all trials)."""
+    step, count = env_cls.step, iter(range(10**9))
+
+    def crashing_step(env, idx):
+        if next(count) == episode:
+            raise Preempted()
+        step(env, idx)
+
+    monkeypatch.setattr(env_cls, "step", crashing_step)
+    return lambda: monkeypatch.setattr(env_cls, "step", step)
+
+
+@pytest.mark.parametrize(
+    "settings, crash, resumed_steps",
+    [
+        ({}, 470, range(150, 300 + 300)),  # trial 1 crashes at episode 170 and resumes at its checkpoint at 150
+        ({"FLUSH_EVERY": 40}, 470, range(150, 300 + 300)),
+        ({"MONITOR_REDUCTION": True, "MONITOR_QUANTILES": [0.5]}, 470, range(150, 300 + 300)),
+        ({"WORKERS": 2}, 470, None),
+        ({"ENGINE": "batched"}, 170, range(150, 300)),
+        ({"ENGINE": "batched", "FLUSH_EVERY": 40}, 170, range(150, 300)),
+        # trials converge after 122, 114 and 119 episodes, trial 1 crashes at episode 60
+        ({"CONVERGENCE_WINDOW": 20, "CONVERGENCE_TOLERANCE": 0.7}, 182, range(50, 114 + 119)),
+    ],
+)
+def test_resume_is_identical(cfg, tmp_path, monkeypatch, settings, crash, resumed_steps):
+    cfg.update(settings, CHECKPOINT_EVERY=50, MONITOR_FORMATS=["lisp", "npy"])
+    write(cfg, tmp_path / "uninterrupted")
+
+    workers = cfg.pop("WORKERS", 1)  # crash a sequential run, workers do not see the patched step
+    env_cls = BatchedNamingGameEnv if cfg.get("ENGINE") == "batched" else BasicNamingGameEnv
+    restore = crash_at(monkeypatch, env_cls, crash)
+    with pytest.raises(Preempted):
+        Experiment(cfg, seed=7, logdir=str(tmp_path / "resumed")).run_experiment()
+    restore()
+
+    resumed = Experiment.from_checkpoint(str(tmp_path / "resumed"))
+    resumed.cfg.WORKERS = workers
+    assert resumed.seed == 7
+    steps = []
+    monkeypatch.setattr(env_cls, "step", lambda env, idx, step=env_cls.step: steps.append(idx) or step(env, idx))
+    resumed.run_experiment()
+    if resumed_steps is not None:  # continues from the last checkpoint
+        assert steps[0] == resumed_steps[0]
+        assert len(steps) == len(resumed_steps)
+    resumed.monitors.write(str(tmp_path / "resumed"))
+    for fname in (tmp_path / "uninterrupted" / "monitors").glob("*.lisp"):
+        assert fname.read_text() == (tmp_path / "resumed" / "monitors" / fname.name).read_text()
+    for fname in (tmp_path / "uninterrupted" / "monitors").glob("*.npy"):
+        assert fname.read_bytes() == (tmp_path / "resumed" / "monitors" / fname.name).read_bytes()
+
+
+@pytest.mark.parametrize("keep", [False, True])
+def test_checkpoints_are_removed_after_writing(cfg, tmp_path, keep):
+    cfg.update(CHECKPOINT_EVERY=50, KEEP_CHECKPOINTS=keep)
+    exp = write(cfg, tmp_path)
+    assert (tmp_path / "checkpoints" / "experiment.pkl").exists()
+    exp.remove_checkpoints()
+
+    assert (tmp_path / "checkpoints").exists() == keep
+    assert (tmp_path / "monitors" / "communicative-success.lisp").exists()
+
+
+@pytest.mark.parametrize("engine", ["object", "batched"])
+def test_sampled_monitors(cfg, engine):
+    cfg.SCHEDULE_BLOCK_SIZE = 100
+    cfg.ENGINE = engine
+    full = run(cfg)
+    cfg.MONITORS = {"communicative-success": 1, "lexicon-size": 100, "lexicon-change": 0}
+    sampled = run(cfg)
+
+    assert list(sampled) == ["communicative-success", "lexicon-size"]
+    assert sampled["communicative-success"] == full["communicative-success"]
+    for trial in range(cfg.TRIALS):
+        assert sampled["lexicon-size"][trial].tolist() == full["lexicon-size"][trial][99::100].tolist()
+
+
+def test_run_without_monitors(cfg, tmp_path):
+    cfg.MONITORS = {}
+    cfg.CONVERGENCE_WINDOW = 20
+    cfg.CONVERGENCE_TOLERANCE = 0.7
+    exp = write(cfg, tmp_path)
+
+    assert not exp.monitors.monitors
+    assert exp.converged_at  # the detector does not depend on the monitors
+    assert exp.timesteps > 0
+
+
+def test_custom_monitor(cfg, tmp_path, monkeypatch):
+    monkeypatch.setattr(monitors, "MONITOR_REGISTRY", dict(monitors.MONITOR_REGISTRY))
+    monkeypatch.setattr(monitors, "MONITOR_DTYPES", dict(monitors.MONITOR_DTYPES))
+    register_monitor("global-reward", dtype=np.int64)(lambda exp: exp.global_reward)
+    cfg.MONITORS = {"global-reward": 50}
+    cfg.MONITOR_FORMATS = ["npy"]
+    cfg.TRIALS = 1
+    exp = write(cfg, tmp_path)
+
+    rewards = read_monitors(tmp_path)["global-reward"]
+    assert rewards.dtype == np.int64 and rewards.shape == (1, 6)
+    assert rewards[0, -1] == exp.global_reward
+    assert read_sidecar(tmp_path)["monitors"]["global-reward"]["interval"] == 50
+
+    cfg.ENGINE = "batched"
+    with pytest.raises(ValueError):
+        run(cfg)
+
+
+@pytest.mark.parametrize("monitors", [{"lexicon-sizes": 1}, {"lexicon-size": -1}, {"lexicon-size": 0.5}])
+def test_invalid_monitors(monitors):
+    with pytest.raises(ValueError):
+        select_monitors(edict({"MONITORS": monitors}))
+
+
+def test_population_coherence_is_engine_independent(cfg):
+    cfg.SCHEDULE_BLOCK_SIZE = 100
+    cfg.MONITORS = {"population-coherence": 50}
+    coherence = run(cfg)["population-coherence"]
+    cfg.ENGINE = "batched"
+
+    assert run(cfg)["population-coherence"] == coherence
+    assert coherence[0].tolist()[-1] > coherence[0].tolist()[0]
+
+
+@pytest.mark.parametrize("engine", ["object", "tensor", "batched"])
+def test_population_jaccard_sketch(cfg, engine):
+    cfg.ENGINE = engine
+    cfg.SCHEDULE_BLOCK_SIZE = 100
+    cfg.MONITORS = {"population-coherence": 50, "population-jaccard-sketch": 50}
+    monitors = run(cfg)
+
+    for trial in range(cfg.TRIALS):
+        coherence, sketched = monitors["population-coherence"][trial], monitors["population-jaccard-sketch"][trial]
+        # the estimated jaccard similarity is at most the similarity of population-coherence
+        assert (sketched <= coherence + error_bound(confidence=0.999)).all()
+        assert sketched[-1] > sketched[0]
+
+
+def test_population_jaccard_sketch_estimates_jaccard(cfg):
+    cfg.MONITORS = {"population-jaccard-sketch": cfg.EPISODES}
+    exp = Experiment(cfg)
+    exp.run_experiment()
+
+    lexicons = [
+        {(sa_pair.meaning, sa_pair.form) for sa_pair in agent.lexicon.q_table if exp.monitors.keep_value(sa_pair)}
+        for agent in exp.env.population
+    ]
+    exact = np.mean([len(a & b) / len(a | b) for a, b in itertools.combinations(lexicons, 2)])
+    sketched = exp.monitors.monitors["population-jaccard-sketch"][cfg.TRIALS - 1][-1]
+    assert abs(sketched - exact) <= error_bound(confidence=0.999)
+
+
+@pytest.mark.parametrize("engine", ["object", "tensor"])
+def test_competition_of_many_targets(cfg, engine):
+    cfg.ENGINE = engine
+    cfg.EPISODES = 200
+    cfg.COMPETITION_TARGETS = "all"
+    exp = Experiment(cfg)
+    exp.initialize()
+    snapshots = []  # q-value of every form of every target after every episode
+    for i in range(cfg.EPISODES):
+        exp.env.reset()
+        exp.env.step(i)
+        exp.record_competition(i, select_competition_targets(cfg))
+        lexicons = [agent.lexicon.q_table for agent in exp.env.population]
+        snapshots.append(
+            {
+                (agent, obj, sa_pair.form): sa_pair.q_value
+                for agent, lexicon in enumerate(lexicons)
+                for obj, meaning in enumerate(exp.env.world.objects)
+                for sa_pair in lexicon
+                if sa_pair.meaning == meaning
+            }
+        )
+
+    competition = exp.monitors.monitors["form-competition"]
+    assert len(competition.targets) == cfg.POPULATION_SIZE * cfg.WORLD_SIZE
+    for agent, obj in competition.targets:
+        for form, trajectory in competition.trajectories((agent, obj)).items():
+            expected = [snapshot.get((agent, obj, form), np.nan) for snapshot in snapshots]
+            np.testing.assert_array_equal(trajectory, expected)
+    tracked = {(agent, obj, form) for agent, obj in competition.targets for form in competition.log[(agent, obj)]}
+    assert tracked == set().union(*snapshots)
+
+
+def test_default_competition_file_name(cfg, tmp_path):
+    cfg.EPISODES = 20
+    cfg.pop("COMPETITION_TARGETS", None)
+    exp = Experiment(cfg)
+    exp.run_competition()
+    exp.monitors.write_competition(tmp_path)
+
+    assert [fname.name for fname in (tmp_path / "monitors").iterdir()] == ["form-competition.lisp"]
+
+
+def test_invalid_competition_targets(cfg):
+    cfg.COMPETITION_TARGETS = [[1, cfg.WORLD_SIZE]]
+    with pytest.raises(ValueError):
+        select_competition_targets(cfg)
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {},
+        {"WORKERS": 2},
+        {"ENGINE": "batched", "SCHEDULE_BLOCK_SIZE": 100},
+        {"CONVERGENCE_WINDOW": 20, "CONVERGENCE_TOLERANCE": 0.7},
+    ],
+)
+def test_reduced_monitors(cfg, tmp_path, settings):
+    cfg.update(settings, MONITOR_FORMATS=["lisp", "npy"])
+    write(cfg, tmp_path / "full")
+    full = read_monitors(tmp_path / "full")  # trials that converged early are padded
+    cfg.update(MONITOR_REDUCTION=True, MONITOR_QUANTILES=[0.5])
+    exp = write(cfg, tmp_path / "reduced")
+
+    if cfg.get("ENGINE") != "batched":
+        assert exp.monitors.monitors["lexicon-size"].n_trials == 1  # a single trial is held in memory
+    reduced = read_monitors(tmp_path / "reduced")
+    assert read_sidecar(tmp_path / "reduced")["monitors"]["lexicon-size"]["kind"] == "reduction"
+    for key, statistics in reduced.items():
+        events = np.array(list(full[key]), dtype=np.float64)
+        assert list(statistics) == ["count", "mean", "variance", "quantile-0.5"]
+        assert (statistics["count"] == cfg.TRIALS).all()
+        assert np.allclose(statistics["mean"], events.mean(axis=0))
+        assert np.allclose(statistics["variance"], events.var(axis=0, ddof=1))
+        assert np.allclose(statistics["quantile-0.5"], np.median(events, axis=0))
+
@@ -1,15 +1,34 @@
-from marl_language_games.utils.invention import ids, invent, make_id
+import numpy as np
+
+from marl_language_games.utils.invention import CONSONANTS, VOWELS, SymbolTable, invent
 
 
 def test_make_id():
-    ag_id = ids["AGENT"]
-    obj_id = ids["OBJECT"]
+    symbols = SymbolTable()
+
+    assert symbols.make_id("AGENT") == 0
+    assert symbols.make_id("AGENT") == 1
+    assert symbols.make_id("OBJECT") == 0
+    assert symbols.make_id("AGENT") == 2
+    assert symbols.make_id("OBJECT") == 1
+
+    assert symbols.name("AGENT", 2) == "#'AGENT-2"
+    assert symbols.name("OBJECT", 0) == "#'OBJECT-0"
+
+
+def test_symbol_tables_are_independent():
+    symbols1, symbols2 = SymbolTable(), SymbolTable()
+    symbols1.make_id("AGENT")
+    assert symbols2.make_id("AGENT") == 0
 
-    assert make_id("AGENT") == f"#'AGENT-{ag_id+0}"
-    assert make_id("AGENT") == f"#'AGENT-{ag_id+1}"
-    assert make_id("OBJECT") == f"#'OBJECT-{obj_id+0}"
-    assert make_id("AGENT") == f"#'AGENT-{ag_id+2}"
-    assert make_id("OBJECT") == f"#'OBJECT-{obj_id+1}"
+
+def test_intern():
+    symbols = SymbolTable()
+    assert symbols.intern("FORM", "bako") == 0
+    assert symbols.intern("FORM", "tepi") == 1
+    assert symbols.intern("FORM", "bako") == 0
+    assert symbols.name("FORM", 1) == "tepi"
+    assert symbols.name("FORM", "not interned") == "not interned"
 
 
 def test_invent():
@@ -19,3 +38,15 @@ def test_invent():
     assert type(f2) == str and len(f2) == 4
     f3 = invent(syllables=3)
     assert type(f3) == str and len(f3) == 6
+
+
+def test_invent_alternates_syllables():
+    word = invent(syllables=4)
+    assert len(word) == 8
+    assert all(c in VOWELS for c in word[1::2])
+    assert all(c in CONSONANTS for c in word[::2])
+
+
+def test_invent_is_reproducible():
+    rng1, rng2 = np.random.default_rng(7), np.random.default_rng(7)
+    assert [invent(rng=rng1) for _ in range(5)] == [invent(rng=rng2) for _ in range(5)]
@@ -1,21 +1,37 @@
-from marl_language_games.environment.lexicon import Lexicon
+import random
+
+import pytest
+from easydict import EasyDict as edict
+
+from marl_language_games.environment.agent import Agent
+from marl_language_games.environment.lexicon import IndexedLexicon, Lexicon, SAPair, pair_key, select_lexicon
+from marl_language_games.environment.sketch import minhash
 from marl_language_games.utils.cfg import cfg_from_file
 
 cfg = cfg_from_file("cfg/config.yml")
 
-def test_invent_sa_pair():
-    lex = Lexicon(cfg)
+
+@pytest.fixture(params=[Lexicon, IndexedLexicon])
+def Lex(request):
+    return request.param
+
+
+def test_invent_sa_pair(Lex):
+    lex = Lex(cfg)
     meaning = "m1"
     assert len(lex) == 0
     new_sa_pair = lex.invent_sa_pair(meaning)
     assert len(lex) == 1 and lex.q_table[0] == new_sa_pair
     assert new_sa_pair.meaning == meaning
-    assert type(new_sa_pair.form) is str
+    assert type(new_sa_pair.form) is int
+    form = lex.symbols.name("FORM", new_sa_pair.form)
+    assert type(form) is str and len(form) == 6
+    assert form in str(lex)
     assert new_sa_pair.q_value == cfg.INITIAL_Q_VALUE
 
 
-def test_adopt_sa_pair():
-    lex = Lexicon(cfg)
+def test_adopt_sa_pair(Lex):
+    lex = Lex(cfg)
     meaning1, form1 = "m1", "f1"
     assert len(lex) == 0
     new_sa_pair1 = lex.adopt_sa_pair(meaning1, form1)
@@ -30,8 +46,8 @@ def test_adopt_sa_pair():
     assert lex.q_table[1] == new_sa_pair2
 
 
-def test_get_actions_produce():
-    lex = Lexicon(cfg)
+def test_get_actions_produce(Lex):
+    lex = Lex(cfg)
     meanings = ["m1", "m2", "m3", "m4", "m5"]
     forms = ["f1", "f2", "f3", "f4", "f5"]
     for meaning, form in zip(meanings, forms):
@@ -51,8 +67,8 @@ def test_get_actions_produce():
         assert sa_pair.form == "f1" or sa_pair.form == "f2"
 
 
-def test_get_actions_comprehend():
-    lex = Lexicon(cfg)
+def test_get_actions_comprehend(Lex):
+    lex = Lex(cfg)
     meanings = ["m1", "m2", "m3", "m4", "m5"]
     forms = ["f1", "f2", "f3", "f4", "f5"]
     for meaning, form in zip(meanings, forms):
@@ -72,8 +88,8 @@ def test_get_actions_comprehend():
         assert sa_pair.meaning == "m1" or sa_pair.meaning == "m2"
 
 
-def test_remove_sa_pair():
-    lex = Lexicon(cfg)
+def test_remove_sa_pair(Lex):
+    lex = Lex(cfg)
     meanings = ["m1", "m2", "m3", "m4", "m5"]
     forms = ["f1", "f2", "f3", "f4", "f5"]
     last = None
@@ -86,8 +102,8 @@ def test_remove_sa_pair():
     assert last not in lex.q_table
 
 
-def test_lex_repr():
-    lex = Lexicon(cfg)
+def test_lex_repr(Lex):
+    lex = Lex(cfg)
     meanings = ["m1", "m2", "m3", "m4", "m5"]
     forms = ["f1", "f2", "f3", "f4", "f5"]
     for meaning, form in zip(meanings, forms):
@@ -104,3 +120,162 @@ def test_lex_repr():
     assert lex.q_table[0].q_value == 500.0156
     lex_repr = str(lex)
     assert "500.016" in lex_repr
+
+
+def test_sa_pair_slots():
+    sa_pair = SAPair("m1", "f1", 0.5)
+    assert not hasattr(sa_pair, "__dict__")
+    assert hash(sa_pair) == hash(SAPair("m1", "f1", 0.9))
+    assert sa_pair == SAPair("m1", "f1") and sa_pair != SAPair("m1", "f2") and sa_pair != SAPair("m2", "f1")
+    assert len({sa_pair, SAPair("m1", "f1", 0.1), SAPair("m2", "f1")}) == 2
+    assert hash(SAPair(3, 7)) == pair_key(3, 7) == 3 << 32 | 7
+
+
+def test_pairs_are_views_on_the_arrays(Lex):
+    lex = Lex(cfg)
+    pairs = [lex.adopt_sa_pair(meaning, form) for meaning in range(4) for form in range(4)]
+    kept = pairs[5]
+    kept.q_value = 0.8
+    assert lex.q_table[5].q_value == 0.8
+    removed = pairs[:12]
+    for sa_pair in removed:
+        if sa_pair != kept:
+            lex.set_q_value(sa_pair, 0.3)
+            lex.remove_sa_pair(sa_pair)
+    assert removed[0].q_value == 0.3  # a removed pair keeps its q-value
+    for form in range(4, 20):  # the empty slots are dropped, the pairs move to other slots
+        lex.adopt_sa_pair(0, form)
+    assert len(lex) == 21 and lex.size() == 21
+    assert kept.q_value == 0.8 and kept in lex.get_actions_produce(1)
+    lex.set_q_value(kept, 0.6)
+    assert [sa_pair.q_value for sa_pair in lex.get_actions_comprehend(1)] == [0.6, 0.5]
+    assert lex.keys() == [hash(sa_pair) for sa_pair in lex.q_table]
+    with pytest.raises(ValueError):
+        lex.remove_sa_pair(removed[0])
+
+
+def test_indexed_q_table_assignment():
+    lex = IndexedLexicon(cfg)
+    lex.q_table = [SAPair("m1", "f1", 0.5), SAPair("m2", "f1", 0.4), SAPair("m1", "f2", 0.3)]
+    assert len(lex) == 3
+    assert lex.get_actions_produce("m1") == [SAPair("m1", "f1"), SAPair("m1", "f2")]
+    assert lex.get_actions_comprehend("f1") == [SAPair("m1", "f1"), SAPair("m2", "f1")]
+    lex.remove_sa_pair(SAPair("m1", "f1"))
+    assert lex.get_actions_produce("m1") == [SAPair("m1", "f2")]
+    assert lex.get_actions_comprehend("f1") == [SAPair("m2", "f1")]
+    with pytest.raises(ValueError):
+        lex.remove_sa_pair(SAPair("m1", "f1"))
+
+
+def test_indexed_insertion_order_multiple_states():
+    lex = IndexedLexicon(cfg)
+    lex.q_table = [SAPair("m2", "f1"), SAPair("m1", "f2"), SAPair("m2", "f3"), SAPair("m3", "f4")]
+    found = lex.get_actions_produce(["m1", "m2"])
+    assert [sa_pair.form for sa_pair in found] == ["f1", "f2", "f3"]
+
+
+def test_indexed_exact_match():
+    lex = IndexedLexicon(cfg)
+    lex.adopt_sa_pair("#'OBJECT-10", "f1")
+    assert lex.get_actions_produce("#'OBJECT-1") == []
+    assert len(lex.get_actions_produce("#'OBJECT-10")) == 1
+
+
+def test_select_lexicon():
+    local_cfg = edict(cfg)
+    local_cfg.LEXICON = "indexed"
+    assert isinstance(select_lexicon(local_cfg), IndexedLexicon)
+    assert isinstance(Agent(local_cfg).lexicon, IndexedLexicon)
+    local_cfg.LEXICON = "list"
+    assert type(select_lexicon(local_cfg)) is Lexicon
+    assert type(Agent(edict()).lexicon) is Lexicon
+    local_cfg.LEXICON = "tree"
+    with pytest.raises(ValueError):
+        select_lexicon(local_cfg)
+
+
+def test_statistics_follow_changes(Lex):
+    lex = Lex(cfg)  # interpolated rule, pairs below REWARD_FAILURE + EPSILON_FAILURE are not live
+    pairs = [lex.adopt_sa_pair(m, f) for m, f in [("m1", "f1"), ("m1", "f2"), ("m2", "f1"), ("m3", "f3")]]
+    assert lex.size() == lex.size(live=True) == 4
+    assert lex.forms_per_meaning() == 4 / 3
+    assert lex.meanings_per_form() == 4 / 3
+
+    stored = lex.q_table[1]
+    lex.set_q_value(stored, 0)
+    assert lex.size() == 4 and lex.size(live=True) == 3
+    assert lex.forms_per_meaning(live=True) == 1
+    assert lex.meanings_per_form(live=True) == 1.5
+    lex.set_q_value(stored, 0.7)
+    assert lex.size(live=True) == 4
+
+    lex.remove_sa_pair(pairs[0])
+    lex.remove_sa_pair(pairs[3])
+    assert lex.size() == lex.size(live=True) == 2
+    assert lex.forms_per_meaning() == 1 and lex.meanings_per_form() == 1
+
+    lex.q_table = []
+    assert lex.size() == 0 and lex.forms_per_meaning() == 0 and lex.meanings_per_form() == 0
+
+
+def test_statistics_match_q_table(Lex):
+    rng = random.Random(0)
+    lex = Lex(cfg)
+    for _ in range(500):
+        action = rng.random()
+        if action < 0.4:
+            lex.adopt_sa_pair(rng.randrange(5), rng.randrange(8))
+        elif action < 0.8 and len(lex):
+            lex.set_q_value(rng.choice(lex.q_table), rng.random() * 0.05)
+        elif len(lex):
+            lex.remove_sa_pair(rng.choice(lex.q_table))
+
+        for live in [False, True]:
+            pairs = [sa_pair for sa_pair in lex.q_table if not live or sa_pair.q_value >= 0.01]
+            meanings = {sa_pair.meaning for sa_pair in pairs}
+            forms = {sa_pair.form for sa_pair in pairs}
+            assert lex.size(live) == len(pairs)
+            assert lex.forms_per_meaning(live) == (len(pairs) / len(meanings) if meanings else 0)
+            assert lex.meanings_per_form(live) == (len(pairs) / len(forms) if forms else 0)
+
+
+def test_signature_matches_q_table(Lex):
+    rng = random.Random(0)
+    lex = Lex(cfg)
+    lex.signature(), lex.signature(live=True)  # tracked from here on
+    for _ in range(500):
+        action = rng.random()
+        if action < 0.4:
+            lex.adopt_sa_pair(rng.randrange(5), rng.randrange(8))
+        elif action < 0.8 and len(lex):
+            lex.set_q_value(rng.choice(lex.q_table), rng.random() * 0.05)
+        elif len(lex):
+            lex.remove_sa_pair(rng.choice(lex.q_table))
+
+        for live in [False, True]:
+            pairs = [hash(sa_pair) for sa_pair in lex.q_table if not live or sa_pair.q_value >= 0.01]
+            assert (lex.signature(live) == minhash(pairs)).all()
+
+
+def test_setting_the_q_value_of_a_view_updates_the_statistics(Lex):
+    lex = Lex(cfg)
+    sa_pair = lex.adopt_sa_pair(1, 2)
+    assert lex.size(live=True) == 1
+    sa_pair.q_value = 0.0
+    assert lex.size() == 1 and lex.size(live=True) == 0
+    assert lex.forms_per_meaning(live=True) == 0 and lex.meanings_per_form(live=True) == 0
+    sa_pair.q_value = 0.7
+    assert lex.size(live=True) == 1 and lex.q_table[0].q_value == 0.7
+
+
+def test_views_of_a_removed_pair_raise(Lex):
+    lex = Lex(cfg)
+    sa_pair = lex.adopt_sa_pair(1, 2)
+    lex.adopt_sa_pair(1, 3)
+    lex.remove_sa_pair(SAPair(1, 2))
+    assert lex.q_table == [SAPair(1, 3)]
+    with pytest.raises(ValueError):
+        sa_pair.q_value
+    with pytest.raises(ValueError):
+        sa_pair.q_value = 0.9
+    assert lex.q_table[0].q_value == cfg.INITIAL_Q_VALUE
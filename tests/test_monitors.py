@@ -1,8 +1,10 @@
+import numpy as np
 import pytest
 from easydict import EasyDict as edict
 
-from marl_language_games.environment.lexicon import SAPair
+from marl_language_games.environment.lexicon import SAPair, population_coherence
 from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.experiment.monitors import ArrayMonitor
 
 
 @pytest.fixture
@@ -32,7 +34,7 @@ def test_add_first_event_to_trial(simple_exp):
     monitors.add_event_to_trial(monitor, 0, 0)
 
     assert len(monitors.monitors["monitor1"]) == 1
-    assert monitors.monitors["monitor1"][0] == [0]
+    assert monitors.monitors["monitor1"][0].tolist() == [0]
 
 
 def test_add_second_event_to_trial(simple_exp):
@@ -43,7 +45,7 @@ def test_add_second_event_to_trial(simple_exp):
     monitors.add_event_to_trial(monitor, 0, 1)
 
     assert len(monitors.monitors["monitor1"]) == 1
-    assert monitors.monitors["monitor1"][0] == [0, 1]
+    assert monitors.monitors["monitor1"][0].tolist() == [0, 1]
 
 
 def test_add_second_trial(simple_exp):
@@ -55,8 +57,8 @@ def test_add_second_trial(simple_exp):
     monitors.add_event_to_trial(monitor, 1, 0)
 
     assert len(monitors.monitors["monitor1"]) == 2
-    assert monitors.monitors["monitor1"][0] == [0, 1]
-    assert monitors.monitors["monitor1"][1] == [0]
+    assert monitors.monitors["monitor1"][0].tolist() == [0, 1]
+    assert monitors.monitors["monitor1"][1].tolist() == [0]
 
 
 def test_add_second_monitor(simple_exp):
@@ -73,6 +75,54 @@ def test_add_second_monitor(simple_exp):
     assert len(monitors.monitors["monitor2"]) == 0
 
 
+def test_monitors_are_preallocated():
+    cfg = edict({"TRIALS": 3, "EPISODES": 100})
+    monitors = Experiment(cfg).monitors
+
+    monitor = monitors.monitors["communicative-success"]
+    data = monitor.data
+    for i in range(100):
+        monitors.add_event_to_trial(monitor, 2, i % 2 == 0)
+
+    assert monitor.data is data  # filled in place
+    assert monitor.data.shape == (3, 100)
+    assert monitor.data.dtype == np.bool_
+    assert len(monitor) == 3
+    assert monitor[2].tolist() == [i % 2 == 0 for i in range(100)]
+    assert monitor[0].tolist() == []
+
+
+def test_array_monitor_grows():
+    monitor = ArrayMonitor(trials=1, capacity=2)
+    for i in range(5):
+        monitor.append(1, i * 0.5)
+
+    assert monitor.dtype == np.float64
+    assert monitor.data.shape[1] >= 5
+    assert monitor.tolist() == [[], [0.0, 0.5, 1.0, 1.5, 2.0]]
+
+
+def test_array_monitor_add_events():
+    monitor = ArrayMonitor(np.float64, trials=2, capacity=4)
+    monitor.add_events(np.array([1.0, 2.0]))
+    monitor.add_events(np.array([[3.0, 4.0], [5.0, 6.0]]))
+
+    assert monitor.tolist() == [[1.0, 3.0, 4.0], [2.0, 5.0, 6.0]]
+    view = monitor[0]
+    view[0] = 7.0
+    assert monitor[0].tolist() == [7.0, 3.0, 4.0]  # trials are views on the storage
+
+
+def test_array_monitor_set_trial():
+    monitor = ArrayMonitor(np.bool_, trials=2, capacity=2)
+    monitor.set_trial(1, [True, False, True])
+    monitor.set_trial(0, [False])
+
+    assert monitor == [[False], [True, False, True]]
+    with pytest.raises(IndexError):
+        monitor[2]
+
+
 @pytest.fixture
 def exp():
     cfg = edict()
@@ -332,3 +382,27 @@ def test_record_meanings_per_form_not_empty_ignore(exp):
         ]
     monitors.record_meanings_per_form(0)
     assert monitors.monitors["meanings-per-form"] == [[0.7]]
+
+
+def test_record_population_coherence(exp):
+    monitors = exp.monitors
+    for i in range(0, 10):
+        exp.env.population[i].lexicon.q_table = [SAPair("m1", "f1", initial_value=0.5)]
+        if i < 7:
+            exp.env.population[i].lexicon.q_table += [
+                SAPair("m1", "f3", initial_value=0),
+                SAPair("m2", "f2", initial_value=0.5),
+            ]
+    monitors.record_population_coherence(0)
+    # 21 pairs of equal lexicons of size 2, 3 pairs of equal lexicons of size 1 and 21 pairs sharing one pair
+    assert monitors.monitors["population-coherence"][0].tolist() == [pytest.approx((21 + 3 + 21 * 2 / 3) / 45)]
+
+
+def test_population_coherence_all_pairs():
+    rng = np.random.default_rng(0)
+    lexicons = [set(rng.choice(20, size=rng.integers(0, 6), replace=False).tolist()) for _ in range(30)]
+    agents = [agent for agent, lexicon in enumerate(lexicons) for _ in lexicon]
+    associations = [key for lexicon in lexicons for key in lexicon]
+    similarity = Experiment(edict()).monitors.lexicon_similarity
+    similarities = [similarity(lexicons[i], lexicons[j]) for i in range(30) for j in range(30) if i != j]
+    assert population_coherence(agents, associations, 30) == pytest.approx(np.mean(similarities))
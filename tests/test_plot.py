@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from easydict import EasyDict as edict
+
+from marl_language_games.utils.plot import (
+    PLOTTED_MONITORS,
+    decimate,
+    plot_monitors,
+    plotted_series,
+    rolling_mean,
+    trial_mean,
+)
+
+
+def test_rolling_mean_matches_pandas():
+    values = np.random.default_rng(0).random(1000)
+    expected = pd.Series(values).rolling(100, min_periods=1).mean().to_numpy()
+    assert np.allclose(rolling_mean(values, 100), expected)
+
+
+def test_trial_mean_of_trials_of_different_lengths():
+    assert trial_mean([[True, False, True], [False, True]]).tolist() == [0.5, 0.5, 1]
+    assert trial_mean(np.array([[1, 2], [3, 6]])).tolist() == [2, 4]
+    assert trial_mean({"mean": [0.5, 0.25]}).tolist() == [0.5, 0.25]
+
+
+def test_decimate_keeps_extrema():
+    values = np.sin(np.linspace(0, 50, 100_001))
+    values[12_345] = 3
+    positions, decimated = decimate(values, max_points=200)
+    assert len(decimated) <= 200
+    assert (np.diff(positions) > 0).all()
+    assert (decimated == values[positions]).all()
+    assert decimated.max() == 3 and decimated.min() == values.min()
+    assert decimate(values[:10], max_points=200)[0].tolist() == list(range(10))
+
+
+def test_series_are_plotted_by_episode():
+    cfg = edict(MONITORS={"communicative-success": 10, "lexicon-size": 1})
+    episodes, values = plotted_series(np.ones((2, 100)), "communicative-success", cfg, window=50)
+    assert episodes.tolist() == list(range(10, 1001, 10))
+    assert (values == 1).all()
+    assert plotted_series(np.ones((2, 1000)), "lexicon-size", cfg)[0][-1] == 1000
+
+    # a round of a population of 10 agents records 5 games per episode, the window of 2 episodes holds 10 games
+    cfg = edict(INTERACTION_MODE="round", POPULATION_SIZE=10)
+    episodes, values = plotted_series([np.arange(20.0)], "lexicon-size", cfg, window=2)
+    assert episodes.tolist() == [1] * 5 + [2] * 5 + [3] * 5 + [4] * 5
+    assert values[-1] == np.arange(10.0, 20).mean()
+
+
+def test_plot_monitors_writes_files(tmp_path):
+    rng = np.random.default_rng(0)
+    monitors = {key: rng.random((2, 1_000_000)) for key in PLOTTED_MONITORS}
+    fnames = plot_monitors(monitors, str(tmp_path / "plots" / "monitors"))
+    assert fnames == [str(tmp_path / "plots" / "monitors.png"), str(tmp_path / "plots" / "monitors.svg")]
+    assert all((tmp_path / "plots" / name).stat().st_size for name in ("monitors.png", "monitors.svg"))
+    with pytest.raises(ValueError):
+        plot_monitors(monitors)
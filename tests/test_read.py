@@ -0,0 +1,130 @@
+import io
+
+import numpy as np
+import pytest
+from easydict import EasyDict as edict
+
+from marl_language_games.experiment.experiment import Experiment
+from marl_language_games.experiment.monitors import CompetitionMonitor
+from marl_language_games.utils.read import (
+    parse,
+    read_measure,
+    read_measure_competition,
+    read_monitors,
+    read_npy_monitors,
+    read_sidecar,
+    tokenize,
+)
+from marl_language_games.utils.write import write_measure, write_measure_competition
+
+
+def test_tokenize_across_chunks():
+    file = io.StringIO("(((0.1 12.25)(3)))")
+    tokens = list(tokenize(file, chunk_size=3))
+
+    assert tokens == ["(", "(", "(", "0.1 12.25", ")", "(", "3", ")", ")", ")"]
+
+
+def test_parse_unbalanced():
+    with pytest.raises(ValueError):
+        parse(["(", "(", ")"])
+    with pytest.raises(ValueError):
+        parse(["(", ")", ")"])
+
+
+def test_read_measure_float(tmp_path):
+    write_measure([[0.1, 1.0102012, 2.8888], [4.5, 5.9999, 6.0]], tmp_path / "lexicon-size")
+    monitor = read_measure(tmp_path / "lexicon-size")
+
+    assert len(monitor) == 2
+    assert monitor[0].dtype == np.float64
+    assert monitor[0].tolist() == [0.1, 1.01, 2.89]
+    assert monitor[1].tolist() == [4.5, 6.0, 6.0]
+
+
+def test_read_measure_bool(tmp_path):
+    write_measure([[True, False, True], [False]], tmp_path / "communicative-success")
+    monitor = read_measure(tmp_path / "communicative-success.lisp")
+
+    assert monitor[0].dtype == np.int64
+    assert [trial.tolist() for trial in monitor] == [[1, 0, 1], [0]]
+
+
+def test_read_measure_competition(tmp_path):
+    write_measure_competition({"wabo": [0.5, 0.123, True], "fika": ["NIL", "NIL", 0.2]}, tmp_path / "competition")
+    monitor = read_measure_competition(tmp_path / "competition")
+
+    assert list(monitor) == ["wabo", "fika"]
+    assert monitor["wabo"].tolist() == [0.5, 0.12, 1.0]
+    assert np.isnan(monitor["fika"][:2]).all()
+    assert monitor["fika"][2] == 0.2
+    with pytest.raises(ValueError):
+        read_measure(tmp_path / "competition")
+
+
+def test_read_monitors(tmp_path):
+    logdir = tmp_path / "monitors"
+    logdir.mkdir()
+    write_measure([[1, 0]], logdir / "communicative-success")
+    write_measure_competition({"wabo": ["NIL", 0.5]}, logdir / "form-competition")
+    monitors = read_monitors(tmp_path)
+
+    assert set(monitors) == {"communicative-success", "form-competition"}
+    assert monitors["communicative-success"][0].tolist() == [1, 0]
+    assert monitors["form-competition"]["wabo"][1] == 0.5
+
+
+@pytest.fixture
+def exp():
+    cfg = edict()
+    cfg.TRIALS = 2
+    cfg.EPISODES = 3
+    cfg.MONITOR_FORMATS = ["lisp", "npy"]
+    return Experiment(cfg, seed=42)
+
+
+def test_read_npy_monitors(exp, tmp_path):
+    monitors = exp.monitors
+    for trial in range(2):
+        for event in [True, False, True]:
+            monitors.add_event_to_trial(monitors.monitors["communicative-success"], trial, event)
+        for event in [1.5, 2.25]:
+            monitors.add_event_to_trial(monitors.monitors["lexicon-size"], trial, event)
+    monitors.add_event_to_trial(monitors.monitors["lexicon-size"], 0, 3.0)
+    monitors.write(tmp_path)
+
+    sidecar = read_sidecar(tmp_path)
+    assert sidecar["seed"] == 42
+    assert sidecar["config"]["EPISODES"] == 3
+    assert sidecar["monitors"]["lexicon-size"]["lengths"] == [3, 2]
+
+    loaded = read_monitors(tmp_path)  # prefers the .npy monitors
+    success = loaded["communicative-success"]
+    assert isinstance(success, np.memmap)
+    assert success.dtype == np.bool_
+    assert success.tolist() == [[True, False, True], [True, False, True]]
+    assert [trial.tolist() for trial in loaded["lexicon-size"]] == [[1.5, 2.25, 3.0], [1.5, 2.25]]
+    assert (tmp_path / "monitors" / "lexicon-size.lisp").exists()
+
+
+def test_read_npy_competition(exp, tmp_path):
+    competition = CompetitionMonitor([(0, 2), (1, 2)])
+    competition.update(0, (1, 2), [(1, 0.25)])
+    competition.update(1, (1, 2), [(0, 0.5)])
+    competition.n_episodes = 2
+    exp.monitors.monitors["form-competition"] = competition
+    exp.env = edict({"symbols": edict({"name": lambda kind, form: ["wabo", "fika"][form]})})
+    exp.cfg.MONITOR_FORMATS = "npy"
+    exp.monitors.write_competition(tmp_path)
+
+    loaded = read_npy_monitors(tmp_path, mmap_mode=None)["form-competition-1-2"]
+    assert list(loaded) == ["fika", "wabo"]
+    assert np.isnan(loaded["wabo"][0]) and loaded["wabo"][1] == 0.5
+    assert loaded["fika"][0] == 0.25 and np.isnan(loaded["fika"][1])
+    assert not (tmp_path / "monitors" / "form-competition-1-2.lisp").exists()
+
+
+def test_invalid_monitor_format(exp, tmp_path):
+    exp.cfg.MONITOR_FORMATS = ["csv"]
+    with pytest.raises(ValueError):
+        exp.monitors.write(tmp_path)
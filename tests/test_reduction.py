@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from easydict import EasyDict as edict
+
+from marl_language_games.experiment.reduction import QuantileSketch, Reduction, select_reduction
+
+
+def test_reduction_of_trials_of_different_lengths():
+    trials = [np.array([1.0, 2, 3]), np.array([3.0, 2]), np.array([5.0, 8, 1, 4])]
+    reduction = Reduction()
+    for events in trials:
+        reduction.add(events)
+
+    statistics = reduction.statistics()
+    assert statistics["count"].tolist() == [3, 3, 2, 1]
+    assert np.allclose(statistics["mean"], [3, 4, 2, 4])
+    assert np.allclose(statistics["variance"][:3], [4, 12, 2])
+    assert np.isnan(statistics["variance"][3])
+
+
+def test_quantile_sketch_is_exact_for_few_trials():
+    sketch = QuantileSketch(0.5)
+    for events in ([4.0, 1], [2.0], [9.0]):
+        sketch.add(events)
+    assert sketch.estimate().tolist() == [4, 1]
+
+
+@pytest.mark.parametrize("quantile", [0.1, 0.5, 0.9])
+def test_quantile_sketch_estimates_quantiles(quantile):
+    trials = np.random.default_rng(3).normal(size=(2000, 4)) * [1, 2, 5, 10]
+    reduction = Reduction([quantile])
+    for events in trials:
+        reduction.add(events)
+
+    estimate = reduction.statistics()[f"quantile-{quantile}"]
+    exact = np.quantile(trials, quantile, axis=0)
+    assert np.allclose(estimate, exact, atol=0.1 * trials.std(axis=0))
+
+
+@pytest.mark.parametrize(
+    "settings", [{"MONITOR_QUANTILES": [0.5, 1]}, {"MONITOR_QUANTILES": [0]}, {"FLUSH_EVERY": 10}]
+)
+def test_invalid_reduction(settings):
+    with pytest.raises(ValueError):
+        select_reduction(edict(MONITOR_REDUCTION=True, **settings))
+    assert select_reduction(edict(settings)) is None
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from marl_language_games.environment.environment import BasicNamingGameEnv
+from marl_language_games.environment.schedule import Schedule, Scheduler
+from marl_language_games.experiment.experiment import Experiment
+
+
+@pytest.fixture
+def cfg(basic_cfg):
+    basic_cfg.update(TRIALS=2, EPISODES=50, POPULATION_SIZE=4, CONTEXT_MAX_SIZE=5, SCHEDULE_BLOCK_SIZE=16)
+    return basic_cfg
+
+
+@pytest.mark.parametrize("world_size, min_size, max_size", [(10, 2, 5), (5, 5, 5), (100, 1, 3)])
+def test_sample(world_size, min_size, max_size):
+    schedule = Schedule.sample(np.random.default_rng(0), 500, 4, world_size, min_size, max_size)
+    assert len(schedule) == 500
+    assert (schedule.speakers != schedule.hearers).all()
+    assert set(schedule.speakers.tolist()) == set(schedule.hearers.tolist()) == {0, 1, 2, 3}
+    for i in range(len(schedule)):
+        _, _, context, topic = schedule.episode(i)
+        assert min_size <= len(context) <= max_size
+        assert len(set(context)) == len(context)
+        assert all(0 <= obj < world_size for obj in context)
+        assert topic in context
+        assert (schedule.contexts[i, len(context) :] == -1).all()
+
+
+def test_sample_is_uniform():
+    schedule = Schedule.sample(np.random.default_rng(0), 20000, 4, 10, 3, 3)
+    counts = np.bincount(schedule.contexts.ravel(), minlength=10)
+    assert np.allclose(counts / counts.sum(), 0.1, atol=0.01)
+    assert np.allclose(np.bincount(schedule.topics) / 20000, 0.1, atol=0.01)
+
+
+def test_save_load(tmp_path):
+    schedule = Schedule.sample(np.random.default_rng(0), 20, 4, 10, 2, 5)
+    schedule.save(tmp_path / "schedule.npz")
+    loaded = Schedule.load(tmp_path / "schedule.npz")
+    assert [loaded.episode(i) for i in range(20)] == [schedule.episode(i) for i in range(20)]
+
+
+def test_scheduler_blocks(cfg):
+    scheduler = Scheduler(cfg, np.random.default_rng(0), block_size=16)
+    episodes = [scheduler.next() for _ in range(40)]
+    assert len(scheduler.blocks) == 3
+    played = scheduler.played()
+    assert len(played) == 40
+    assert [played.episode(i) for i in range(40)] == episodes
+
+
+def test_scheduler_without_keep_holds_current_block(cfg):
+    kept = Scheduler(cfg, np.random.default_rng(0), block_size=16)
+    scheduler = Scheduler(cfg, np.random.default_rng(0), block_size=16, keep=False)
+    assert [scheduler.next() for _ in range(40)] == [kept.next() for _ in range(40)]
+    assert scheduler.blocks == []
+    with pytest.raises(ValueError):
+        scheduler.played()
+
+
+def test_scheduler_replay(cfg):
+    schedule = Schedule.sample(np.random.default_rng(0), 5, 4, 10, 2, 5)
+    scheduler = Scheduler(cfg, schedule=schedule)
+    assert [scheduler.next() for _ in range(5)] == [schedule.episode(i) for i in range(5)]
+    with pytest.raises(ValueError):
+        scheduler.next()
+    cfg.POPULATION_SIZE = 2
+    with pytest.raises(ValueError):
+        Scheduler(cfg, schedule=schedule)
+
+
+def test_env_replays_schedule(cfg):
+    cfg.SCHEDULE_SAVE = True
+    env = BasicNamingGameEnv(cfg, seed=0)
+    games = []
+    for i in range(30):
+        env.reset()
+        env.step(i)
+        games.append((env.speaker.id, env.hearer.id, env.context, env.topic))
+
+    cfg.UPDATE_RULE = "interpolated"
+    cfg.LEARNING_RATE = 0.5
+    replay = BasicNamingGameEnv(cfg, seed=1, schedule=env.scheduler.played())
+    for i in range(30):
+        replay.reset()
+        replay.step(i)
+        assert (replay.speaker.id, replay.hearer.id, replay.context, replay.topic) == games[i]
+
+
+def test_experiment_saves_and_replays_schedules(cfg, tmp_path):
+    experiment = Experiment(cfg, seed=0, logdir=tmp_path)
+    cfg.SCHEDULE_SAVE = True
+    experiment.run_experiment()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["schedule-trial-0.npz", "schedule-trial-1.npz"]
+
+    cfg.SCHEDULE_SAVE = False
+    cfg.SCHEDULE_REPLAY = str(tmp_path)
+    replay = Experiment(cfg, seed=1)
+    replay.initialize(trial=1)
+    saved = Schedule.load(tmp_path / "schedule-trial-1.npz")
+    assert len(saved) == cfg.EPISODES
+    assert [replay.env.scheduler.next() for _ in range(cfg.EPISODES)] == [
+        saved.episode(i) for i in range(cfg.EPISODES)
+    ]
+
+
+@pytest.mark.parametrize("population_size", [2, 7, 10])
+def test_sample_rounds(population_size):
+    schedule = Schedule.sample_rounds(np.random.default_rng(0), 50, population_size, 10, 2, 5)
+    games = population_size // 2
+    assert len(schedule) == 50 * games
+    for r in range(50):
+        agents = np.concatenate([schedule.speakers, schedule.hearers]).reshape(2, 50, games)[:, r].ravel()
+        assert len(set(agents.tolist())) == 2 * games  # disjoint games
+    assert (schedule.topics >= 0).all()
@@ -0,0 +1,31 @@
+import numpy as np
+
+from marl_language_games.utils.seeding import rand_index, seed_sequence, spawn_rngs, trial_seed
+
+
+def test_trial_seed():
+    assert trial_seed(42, 0).generate_state(4).tolist() == trial_seed(42, 0).generate_state(4).tolist()
+    assert trial_seed(42, 0).generate_state(4).tolist() != trial_seed(42, 1).generate_state(4).tolist()
+    assert trial_seed(42, 0).generate_state(4).tolist() != trial_seed(43, 0).generate_state(4).tolist()
+
+
+def test_seed_sequence():
+    seq = np.random.SeedSequence(5, spawn_key=(1,))
+    assert seed_sequence(seq).generate_state(2).tolist() == seq.generate_state(2).tolist()
+    assert seed_sequence(5).entropy == 5
+    # spawning from a copy does not change the children of the given seed
+    children = [child.generate_state(1)[0] for child in seed_sequence(seq).spawn(2)]
+    assert children == [child.generate_state(1)[0] for child in seed_sequence(seq).spawn(2)]
+
+
+def test_spawn_rngs():
+    rngs1, rngs2 = spawn_rngs(1, 3), spawn_rngs(1, 3)
+    draws = [rng.random() for rng in rngs1]
+    assert draws == [rng.random() for rng in rngs2]
+    assert len(set(draws)) == 3
+
+
+def test_rand_index():
+    rng = np.random.default_rng(0)
+    draws = [rand_index(rng, 3) for _ in range(1000)]
+    assert set(draws) == {0, 1, 2}
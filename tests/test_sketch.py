@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from marl_language_games.environment import sketch
+from marl_language_games.environment.sketch import EMPTY, error_bound, estimate_similarity, minhash, signatures
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0
+
+
+def test_minhash_of_empty_set():
+    assert (minhash([], size=16) == EMPTY).all()
+    assert minhash([3, -7], size=16).dtype == np.uint64
+
+
+@pytest.mark.parametrize("chunk_size", [2, 1 << 16])
+def test_signatures_match_minhash(monkeypatch, chunk_size):
+    monkeypatch.setattr(sketch, "CHUNK_SIZE", chunk_size)
+    owners, keys = [0, 0, 2, 2, 2], [5, 9, 9, -1, 2**40]
+    result = signatures(owners, keys, 3, size=32)
+    assert (signatures(owners[::-1], keys[::-1], 3, size=32) == result).all()
+    assert (result[0] == minhash([5, 9], size=32)).all()
+    assert (result[1] == EMPTY).all()
+    assert (result[2] == minhash([9, -1, 2**40], size=32)).all()
+
+
+def test_estimate_identical_and_disjoint_sets():
+    same = np.stack([minhash([1, 2, 3])] * 4)
+    assert estimate_similarity(same) == 1
+    empty = np.stack([minhash([])] * 4)
+    assert estimate_similarity(empty) == 0
+
+
+@pytest.mark.parametrize("size", [64, 256])
+def test_estimate_within_error_bound(size):
+    rng = np.random.default_rng(0)
+    sets = [set(rng.choice(12, size=rng.integers(1, 8), replace=False).tolist()) for _ in range(40)]
+    exact = np.mean([jaccard(a, b) for a, b in itertools.combinations(sets, 2)])
+    estimate = estimate_similarity(np.stack([minhash(list(keys), size) for keys in sets]))
+    assert abs(estimate - exact) <= error_bound(size, confidence=0.999)
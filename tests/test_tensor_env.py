@@ -0,0 +1,72 @@
+import pytest
+
+from marl_language_games.environment.environment import BasicNamingGameEnv
+from marl_language_games.environment.tensor_environment import TensorNamingGameEnv
+from marl_language_games.experiment.experiment import Experiment
+
+
+@pytest.fixture
+def cfg(basic_cfg):
+    return basic_cfg
+
+
+def run_env(env_cls, cfg, episodes):
+    env = env_cls(cfg, seed=42)
+    events = []
+    for i in range(episodes):
+        env.reset()
+        env.step(i)
+        events.append((env.speaker.communicative_success, env.lexicon_change, env.lexicon_coherence))
+    lexicons = [[(sa_pair.form, sa_pair.q_value) for sa_pair in agent.lexicon.q_table] for agent in env.population]
+    return events, lexicons
+
+
+@pytest.mark.parametrize("block_size", [0, 100])
+@pytest.mark.parametrize("update_rule", ["basic", "interpolated"])
+def test_same_run_as_object_engine(cfg, update_rule, block_size):
+    cfg.UPDATE_RULE = update_rule
+    cfg.SCHEDULE_BLOCK_SIZE = block_size
+    if update_rule == "interpolated":
+        cfg.LEARNING_RATE = 0.5
+        cfg.REWARD_SUCCESS = 1
+        cfg.REWARD_FAILURE = 0
+    events, lexicons = run_env(BasicNamingGameEnv, cfg, 2000)
+    tensor_events, tensor_lexicons = run_env(TensorNamingGameEnv, cfg, 2000)
+    assert events == tensor_events
+    assert lexicons == tensor_lexicons
+
+
+def test_grow_slots(cfg):
+    env = TensorNamingGameEnv(cfg, initial_slots=1)
+    for form in ["f1", "f2", "f3"]:
+        env.adopt(0, 0, env.symbols.intern("FORM", form))
+    assert env.q.shape[2] >= 3
+    assert len(env.population[0].lexicon) == 3
+    assert [sa_pair.form for sa_pair in env.population[0].lexicon.q_table] == [0, 1, 2]
+    assert "f3" in str(env.population[0].lexicon)
+
+
+def test_lateral_inhibition_deletion(cfg):
+    env = TensorNamingGameEnv(cfg)
+    env.reset()
+    forms = [env.symbols.intern("FORM", form) for form in ["f1", "f2", "f3"]]
+    for form in forms:
+        env.adopt(0, 0, form)
+    env.q[0, 0, :3] = [0.5, 0.1, 0.6]
+    env.population[0].reset(env.context)
+    env.population[0].applied_sa_pair = (0, forms[2])
+    env.align(0)
+
+    q_table = env.population[0].lexicon.q_table
+    assert [sa_pair.form for sa_pair in q_table] == [forms[0], forms[2]]
+    assert [sa_pair.q_value for sa_pair in q_table] == [0.4, 0.7]
+
+
+def test_select_env(cfg):
+    cfg.ENGINE = "tensor"
+    exp = Experiment(cfg)
+    exp.initialize()
+    assert isinstance(exp.env, TensorNamingGameEnv)
+    cfg.ENGINE = "gpu"
+    with pytest.raises(ValueError):
+        exp.initialize()
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from marl_language_games.environment.environment import World
@@ -29,3 +30,19 @@ def test_pick_topic(context):
     world = World(10)
     topic = world.pick_topic(context)
     assert topic in context
+
+
+def test_pick_context_distinct():
+    world = World(10)
+    for _ in range(100):
+        context = world.pick_context(1, 10)
+        assert len(context) == len(set(context))
+
+
+def test_seeded_world_is_reproducible():
+    world1 = World(10, rng=np.random.default_rng(3))
+    world2 = World(10, rng=np.random.default_rng(3))
+    for _ in range(10):
+        context = world1.pick_context(2, 8)
+        assert context == world2.pick_context(2, 8)
+        assert world1.pick_topic(context) == world2.pick_topic(context)